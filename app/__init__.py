@@ -7,6 +7,7 @@ from flask_migrate import Migrate
 
 from app.extensions import db, migrate, jwt, oauth
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # .env laden
 load_dotenv()
@@ -18,6 +19,12 @@ def create_app(config_class=Config) -> Flask:
     # Konfiguration laden
     app.config.from_object(config_class)
     
+    # Hinter Reverse-Proxy: Client-IP aus den vertrauenswürdigen X-Forwarded-For-Hops
+    # (sonst teilen sich alle anonymen Clients einen Rate-Limit-Bucket)
+    proxy_hops = app.config.get("PROXY_FIX_X_FOR", 0)
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
     # Erweiterungen initialisieren
     CORS(app)                           # CORS aktiviieren für Frontend-Zugriff (z.B. von Next.js / Postman und Mobile App)
     db.init_app(app)                    # SQLAlchemy binden/initialisieren
@@ -39,6 +46,10 @@ def create_app(config_class=Config) -> Flask:
     with app.app_context():
         from app import models
 
+    # Ausgehende Stripe-Calls über Pool + Timeouts + Circuit Breaker
+    from app.services.outbound import install_stripe_client
+    install_stripe_client()
+
     # ------ Mounting Blueprints --------- #
 
     # Blueprint für Events registrieren
@@ -51,4 +62,20 @@ def create_app(config_class=Config) -> Flask:
     from app.routes.webhooks import webhook_bp
     app.register_blueprint(webhook_bp, url_prefix="/webhooks")
 
+    from app.routes.ops import ops_bp
+    app.register_blueprint(ops_bp)
+
+    # Async-Variante der Hot-Endpoints (braucht asyncpg / httpx / asgiref)
+    if os.getenv("ASYNC_API_ENABLED", "false").lower() == "true":
+        from app.routes.events_async import events_async_bp
+        app.register_blueprint(events_async_bp, url_prefix="/api/async/events")
+
+    # ------ CLI-Kommandos --------- #
+    from app.cli import register_cli
+    register_cli(app)
+
+    # Warmup startet NICHT hier (auch CLI-Kommandos und der Reloader-Prozess
+    # laufen über create_app), sondern im Server-Prozess: run.py bzw.
+    # post_worker_init – siehe app/services/warmup.py
+
     return app
@@ -0,0 +1,256 @@
+# app/cli.py
+"""Flask-CLI-Kommandos für Wartung / Hintergrundarbeiten (flask <gruppe> <kommando>)."""
+import click
+from flask import Flask
+from flask.cli import AppGroup
+
+from app.extensions import db
+
+media_cli = AppGroup("media", help="Media-Pipeline und Blob-Wartung")
+
+
+@media_cli.command("process")
+@click.option("--event-id", type=int, default=None, help="Nur Media dieses Events")
+@click.option("--missing-only/--all", default=True, help="Nur Media ohne Varianten")
+def process_media_command(event_id, missing_only):
+    """Erzeugt Varianten/Poster für bestehende Media-Items (Backfill)."""
+    from app.models.event_media import EventMedia, MediaType
+    from app.services.media_pipeline import process_media_sync
+
+    query = EventMedia.query.filter(
+        EventMedia.type.in_([MediaType.image, MediaType.video])
+    )
+    if event_id is not None:
+        query = query.filter(EventMedia.event_id == event_id)
+
+    processed = failed = 0
+    for media in query.order_by(EventMedia.id.asc()).all():
+        if missing_only and media.variants_json:
+            continue
+        try:
+            process_media_sync(media)
+            processed += 1
+        except Exception as e:
+            db.session.rollback()
+            failed += 1
+            click.echo(f"⚠️ Media {media.id}: {e}")
+
+    click.echo(f"✅ {processed} verarbeitet, {failed} fehlgeschlagen")
+
+
+@media_cli.command("gc")
+@click.option("--dry-run/--delete", default=True, help="Nur zählen (Default) oder wirklich löschen")
+@click.option("--grace-hours", type=float, default=24, help="Jüngere Blobs nie löschen")
+@click.option("--page-size", type=int, default=1000, help="Blobs pro Listing-Seite")
+def media_gc_command(dry_run, grace_hours, page_size):
+    """Löscht verwaiste Blobs unter events/ (ohne EventMedia-Referenz)."""
+    from app.services.media_gc import run_media_gc
+
+    stats = run_media_gc(dry_run=dry_run, grace_hours=grace_hours, page_size=page_size)
+    for key, value in stats.items():
+        click.echo(f"{key}: {value}")
+
+
+stats_cli = AppGroup("stats", help="Vorberechnete Event-Statistiken")
+
+
+@stats_cli.command("refresh")
+@click.option("--event-id", type=int, multiple=True, help="Nur diese Events (mehrfach möglich)")
+def refresh_stats_command(event_id):
+    """Berechnet event_stats / event_option_stats komplett neu."""
+    from app.services.event_stats import refresh_event_stats
+
+    try:
+        refresh_event_stats(event_id or None)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    click.echo("✅ Event-Statistiken neu berechnet")
+
+
+jobs_cli = AppGroup("jobs", help="Hintergrund-Jobs (Postgres-Queue)")
+
+
+@jobs_cli.command("worker")
+@click.option("--queue", "queues", multiple=True, default=["default"], help="Queue(s), mehrfach möglich")
+@click.option("--concurrency", type=int, default=4, help="Parallele Jobs in diesem Worker")
+@click.option("--poll-interval", type=float, default=1.0, help="Sekunden zwischen Polls bei leerer Queue")
+@click.option("--burst", is_flag=True, help="Beenden, sobald die Queue leer ist")
+def jobs_worker_command(queues, concurrency, poll_interval, burst):
+    """Startet einen Job-Worker."""
+    from flask import current_app
+    from app.services.jobs import run_worker
+
+    run_worker(
+        current_app._get_current_object(),
+        queues=queues,
+        concurrency=concurrency,
+        poll_interval=poll_interval,
+        burst=burst,
+    )
+
+
+@jobs_cli.command("stats")
+def jobs_stats_command():
+    """Zeigt Queue-Größen und Wartezeiten."""
+    from app.services.jobs import queue_stats
+
+    stats = queue_stats()
+    for queue, counts in stats["counts"].items():
+        click.echo(f"{queue}: {counts}")
+    click.echo(f"oldest_due_age_secs: {stats['oldest_due_age_secs']:.1f}")
+    click.echo(f"latency_last_hour_avg_secs: {stats['latency_last_hour_avg_secs']}")
+    click.echo(f"latency_last_hour_max_secs: {stats['latency_last_hour_max_secs']}")
+
+
+stripe_cli = AppGroup("stripe", help="Stripe-Wartung")
+
+
+@stripe_cli.command("reconcile")
+@click.option("--stale-minutes", type=int, default=30, help="Nur PENDING-Buchungen älter als das")
+@click.option("--batch-size", type=int, default=100, help="Buchungen pro Transaktion")
+@click.option("--limit", type=int, default=None, help="Max. Buchungen pro Lauf")
+@click.option("--abandon-hours", type=int, default=24, help="Offene PaymentIntents älter als das → CANCELED")
+@click.option("--dry-run", is_flag=True, help="Nur berichten, nichts ändern")
+def stripe_reconcile_command(stale_minutes, batch_size, limit, abandon_hours, dry_run):
+    """Gleicht hängengebliebene PENDING-Buchungen mit Stripe ab."""
+    from app.services.reconciliation import reconcile_pending_bookings
+
+    report = reconcile_pending_bookings(
+        stale_after_minutes=stale_minutes,
+        batch_size=batch_size,
+        limit=limit,
+        dry_run=dry_run,
+        abandon_after_hours=abandon_hours,
+    )
+    for key, value in report.items():
+        click.echo(f"{key}: {value}")
+
+
+idempotency_cli = AppGroup("idempotency", help="Gespeicherte Idempotency-Keys")
+
+
+@idempotency_cli.command("prune")
+@click.option("--hours", type=float, default=24, help="Keys älter als das löschen")
+def idempotency_prune_command(hours):
+    """Löscht alte Idempotency-Keys."""
+    from datetime import timedelta
+    from app.utils.idempotency import prune_idempotency_keys
+
+    deleted = prune_idempotency_keys(timedelta(hours=hours))
+    click.echo(f"🧹 {deleted} Idempotency-Keys gelöscht")
+
+
+sync_cli = AppGroup("sync", help="Delta-Sync (Tombstones)")
+
+
+@sync_cli.command("prune")
+@click.option("--days", type=float, default=30, help="Tombstones älter als das löschen")
+def sync_prune_command(days):
+    """Löscht alte Tombstones (nicht unter TOMBSTONE_RETENTION gehen, sonst fehlen Clients Löschungen)."""
+    from datetime import timedelta
+    from app.services.sync import prune_tombstones
+
+    deleted = prune_tombstones(timedelta(days=days))
+    click.echo(f"🧹 {deleted} Tombstones gelöscht")
+
+
+refunds_cli = AppGroup("refunds", help="Erstattungen (Storno-Refunds, Massen-Erstattungen)")
+
+
+@refunds_cli.command("event")
+@click.argument("event_id", type=int)
+@click.option("--concurrency", type=int, default=8, help="Parallele Stripe-Refunds")
+@click.option("--batch-size", type=int, default=200, help="Buchungen pro Transaktion")
+@click.option("--now", "run_now", is_flag=True, help="Direkt hier ausführen statt über den Job-Worker")
+def refunds_event_command(event_id, concurrency, batch_size, run_now):
+    """Erstattet alle PAID-Buchungen eines Events (setzt einen offenen Lauf fort)."""
+    from app.services.bulk_refund import run_event_refund, serialize_refund_run, start_event_refund
+
+    run = start_event_refund(event_id, concurrency=concurrency, batch_size=batch_size)
+    db.session.commit()
+    if run_now:
+        run_event_refund(run.id, time_budget_secs=float("inf"))
+    for key, value in serialize_refund_run(run).items():
+        click.echo(f"{key}: {value}")
+
+
+@refunds_cli.command("status")
+@click.argument("run_id", type=int)
+def refunds_status_command(run_id):
+    """Zeigt den Fortschritt eines Erstattungs-Laufs."""
+    from app.models.event_refund_run import EventRefundRun
+    from app.services.bulk_refund import serialize_refund_run
+
+    run = db.session.get(EventRefundRun, run_id)
+    if run is None:
+        raise click.ClickException(f"Lauf {run_id} nicht gefunden")
+    for key, value in serialize_refund_run(run).items():
+        click.echo(f"{key}: {value}")
+
+
+@refunds_cli.command("pending")
+@click.option("--limit", type=int, default=None, help="Höchstens so viele Buchungen")
+def refunds_pending_command(limit):
+    """Listet stornierte Buchungen, deren Refund noch nicht bestätigt ist."""
+    from app.services.payments import pending_refunds
+
+    bookings = pending_refunds(limit)
+    for ue in bookings:
+        click.echo(
+            f"{ue.id}: event={ue.event_id} user={ue.user_id} amount={ue.refund_amount} "
+            f"pi={ue.stripe_payment_intent_id} since={ue.updated_at.isoformat()} "
+            f"error={ue.refund_error or '-'}"
+        )
+    click.echo(f"💸 {len(bookings)} Refunds offen")
+
+
+@refunds_cli.command("retry")
+@click.option("--user-event-id", type=int, default=None, help="Nur diese Buchung (sonst alle mit Fehler)")
+def refunds_retry_command(user_event_id):
+    """Reiht fehlgeschlagene Storno-Refunds erneut ein (gleicher Idempotency-Key)."""
+    from app.models.user_event import UserEvent
+    from app.services.payments import pending_refunds, retry_booking_refund
+
+    if user_event_id:
+        bookings = [b for b in [db.session.get(UserEvent, user_event_id)] if b is not None]
+    else:
+        bookings = [ue for ue in pending_refunds() if ue.refund_error]
+    queued = sum(1 for ue in bookings if retry_booking_refund(ue))
+    db.session.commit()
+    click.echo(f"🔁 {queued} Refunds erneut eingereiht")
+
+
+events_cli = AppGroup("events", help="Event-Verwaltung")
+
+
+@events_cli.command("purge")
+@click.option("--event-id", type=int, default=None, help="Nur dieses Event (sonst alle soft-gelöschten)")
+@click.option("--chunk-size", type=int, default=500, help="Zeilen pro DELETE")
+@click.option("--now", "run_now", is_flag=True, help="Direkt hier ausführen statt über den Job-Worker")
+def events_purge_command(event_id, chunk_size, run_now):
+    """Räumt soft-gelöschte Events ab (z.B. nach verlorenem Purge-Job)."""
+    from app.services.event_purge import pending_purges, purge_event
+    from app.services.jobs import enqueue
+
+    event_ids = [event_id] if event_id else pending_purges()
+    for eid in event_ids:
+        if run_now:
+            purge_event(eid, chunk_size=chunk_size, time_budget_secs=float("inf"))
+        else:
+            enqueue("event.purge", {"event_id": eid})
+    db.session.commit()
+    click.echo(f"🗑️ {len(event_ids)} Events {'gelöscht' if run_now else 'zum Purge eingereiht'}")
+
+
+def register_cli(app: Flask) -> None:
+    app.cli.add_command(media_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(stripe_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(sync_cli)
+    app.cli.add_command(refunds_cli)
+    app.cli.add_command(events_cli)
@@ -1,4 +1,13 @@
 from .user import User
 from .event import Event
 from .user_event import UserEvent
-from .event_media import EventMedia, MediaType
\ No newline at end of file
+from .event_media import EventMedia, MediaType
+from .event_stats import EventStats, EventOptionStats
+from .job import Job, JobStatus
+from .idempotency_key import IdempotencyKey
+from .rate_limit_bucket import RateLimitBucket
+from .tombstone import Tombstone
+from .waitlist_entry import WaitlistEntry, WaitlistStatus
+from .booking_attendee import BookingAttendee
+from .checkout import Checkout, CheckoutStatus
+from .event_refund_run import EventRefundRun, RefundRunStatus
\ No newline at end of file
@@ -0,0 +1,41 @@
+# app/models/booking_attendee.py
+from __future__ import annotations
+
+from typing import Optional, TYPE_CHECKING
+
+from app.extensions import db
+from sqlalchemy import ForeignKey, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+if TYPE_CHECKING:
+    from .user_event import UserEvent
+
+
+class BookingAttendee(db.Model):
+    """Namentlicher Teilnehmer einer Gruppenbuchung (ein Eintrag pro Platz)."""
+
+    __tablename__ = "booking_attendee"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    user_event_id: Mapped[int] = mapped_column(
+        ForeignKey("user_event.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    email: Mapped[Optional[str]] = mapped_column(String(255))
+    # Reihenfolge wie beim Buchen angegeben
+    position: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+
+    user_event: Mapped["UserEvent"] = relationship(
+        "UserEvent",
+        back_populates="attendees",
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<BookingAttendee user_event={self.user_event_id} "
+            f"position={self.position} name={self.name!r}>"
+        )
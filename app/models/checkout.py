@@ -0,0 +1,70 @@
+# app/models/checkout.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional, TYPE_CHECKING
+import enum
+
+from sqlalchemy import Index, String, Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.extensions import db
+
+if TYPE_CHECKING:
+    from .user_event import UserEvent
+
+
+class CheckoutStatus(enum.Enum):
+    PENDING = "pending"
+    PAID = "paid"
+    CANCELED = "canceled"
+    FAILED = "failed"
+
+
+def _checkout_status_values(enum_cls: type[CheckoutStatus]) -> list[str]:
+    """Sagt SQLAlchemy, welche Strings in der DB erlaubt sind."""
+    return [e.value for e in enum_cls]
+
+
+class Checkout(db.Model):
+    """
+    Warenkorb über mehrere Events: eine Buchung (UserEvent) pro Event,
+    EIN gemeinsamer Stripe PaymentIntent. Siehe app/services/checkout.py.
+    """
+
+    __tablename__ = "checkout"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    status = mapped_column(
+        SAEnum(
+            CheckoutStatus,
+            name="checkout_status_enum",
+            values_callable=_checkout_status_values,
+        ),
+        nullable=False,
+        default=CheckoutStatus.PENDING,
+    )
+
+    amount_cents: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False, default="chf")
+    stripe_payment_intent_id: Mapped[Optional[str]] = mapped_column(String, index=True)
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    paid_at: Mapped[Optional[datetime]] = mapped_column()
+
+    bookings: Mapped[list["UserEvent"]] = relationship(
+        "UserEvent",
+        back_populates="checkout",
+        order_by="UserEvent.id",
+    )
+
+    __table_args__ = (
+        Index("ix_checkout_user_created_at", "user_id", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Checkout id={self.id} user={self.user_id} "
+            f"status={self.status.value} amount_cents={self.amount_cents}>"
+        )
@@ -5,12 +5,16 @@ from datetime import datetime
 from typing import List, Optional
 
 from app.extensions import db
-from sqlalchemy import ForeignKey
+from sqlalchemy import Computed, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .event_media import EventMedia
 from .event_option import EventOption
 
+# Postgres Text-Search-Konfiguration für die Event-Suche
+EVENT_SEARCH_CONFIG = "german"
+
 
 class Event(db.Model):
     __tablename__ = "event"
@@ -25,6 +29,29 @@ class Event(db.Model):
     start_time:         Mapped[datetime] = mapped_column()
     end_time:           Mapped[Optional[datetime]] = mapped_column()
     max_participants:   Mapped[Optional[int]] = mapped_column()
+    # Delta-Sync: jede Änderung setzt updated_at (siehe app/services/sync.py)
+    updated_at:         Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=text("(now() at time zone 'utc')"),
+        index=True,
+    )
+    # Soft-Delete: gesetzt → Event ist weg (API, Sync), die Zeilen räumt der
+    # Job "event.purge" in Chunks ab (siehe app/services/event_purge.py)
+    deleted_at:         Mapped[Optional[datetime]] = mapped_column()
+
+    # 🔎 Volltext-Index: von Postgres gepflegt (GENERATED ... STORED), nie selbst setzen.
+    # deferred → wird bei normalen Event-Queries nicht mitgeladen.
+    search_vector:      Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{EVENT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{EVENT_SEARCH_CONFIG}', coalesce(location, '')), 'B') || "
+            f"setweight(to_tsvector('{EVENT_SEARCH_CONFIG}', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     media_items: Mapped[List["EventMedia"]] = relationship(
         back_populates="event",
@@ -40,5 +67,17 @@ class Event(db.Model):
         order_by="EventOption.sort_order.asc(), EventOption.id.asc()",
     )
 
+    __table_args__ = (
+        Index("ix_event_search_vector", "search_vector", postgresql_using="gin"),
+        # Zeitfenster-Filter (from / to / upcoming) + Sortierung der Listings
+        Index("ix_event_start_time", "start_time"),
+        # Purge-Sweep findet gelöschte Events ohne Scan über alle Events
+        Index(
+            "ix_event_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<Event id={self.id} title={self.title!r}>"
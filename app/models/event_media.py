@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Enum
+from sqlalchemy import ForeignKey, Enum, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.extensions import db
@@ -41,6 +41,12 @@ class EventMedia(db.Model):
 
     sort_order:     Mapped[Optional[int]]
     created_at:     Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    updated_at:     Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=text("(now() at time zone 'utc')"),
+        index=True,
+    )
 
     # Rückbeziehung zum Event (passend zu Event.media back_populates)
     event: Mapped["Event"] = relationship("Event", back_populates="media_items")
@@ -1,10 +1,11 @@
 # app/models/event_option.py
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, TYPE_CHECKING
 
 from app.extensions import db
-from sqlalchemy import ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import ForeignKey, Enum, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
@@ -44,6 +45,13 @@ class EventOption(db.Model):
     is_active: Mapped[bool] = mapped_column(default=True, nullable=False)
     sort_order: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
 
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=text("(now() at time zone 'utc')"),
+        index=True,
+    )
+
     # Beziehungen
     event: Mapped["Event"] = relationship(
         "Event",
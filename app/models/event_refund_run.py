@@ -0,0 +1,77 @@
+# app/models/event_refund_run.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+import enum
+
+from sqlalchemy import ForeignKey, Index, Text, Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class RefundRunStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+
+
+def _refund_run_status_values(enum_cls: type[RefundRunStatus]) -> list[str]:
+    """Sagt SQLAlchemy, welche Strings in der DB erlaubt sind."""
+    return [e.value for e in enum_cls]
+
+
+class EventRefundRun(db.Model):
+    """
+    Fortschritt einer Massen-Erstattung aller PAID-Buchungen eines Events
+    (siehe app/services/bulk_refund.py).
+
+    cursor_user_event_id: höchste bisher übernommene Buchung (Fortschritt).
+    Übernommene Buchungen tragen refund_run_id – ein abgebrochener Lauf
+    erstattet sie beim Retry zuerst. Fehlgeschlagene Buchungen bleiben
+    REFUND_PENDING mit refund_error (`flask refunds retry`).
+    """
+
+    __tablename__ = "event_refund_run"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    event_id: Mapped[int] = mapped_column(
+        ForeignKey("event.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    status = mapped_column(
+        SAEnum(
+            RefundRunStatus,
+            name="refund_run_status_enum",
+            values_callable=_refund_run_status_values,
+        ),
+        nullable=False,
+        default=RefundRunStatus.QUEUED,
+    )
+
+    concurrency: Mapped[int] = mapped_column(db.Integer, nullable=False, default=8)
+    batch_size: Mapped[int] = mapped_column(db.Integer, nullable=False, default=200)
+
+    cursor_user_event_id: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    refunded_count: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    refunded_cents: Mapped[int] = mapped_column(db.BigInteger, nullable=False, default=0)
+    failed_count: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    # user_event_id → Fehlermeldung (gekappt, siehe MAX_RECORDED_FAILURES)
+    failures: Mapped[Optional[dict]] = mapped_column(db.JSON)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column()
+    finished_at: Mapped[Optional[datetime]] = mapped_column()
+
+    __table_args__ = (
+        Index("ix_event_refund_run_event_status", "event_id", "status"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<EventRefundRun id={self.id} event={self.event_id} "
+            f"status={self.status.value} refunded={self.refunded_count} "
+            f"failed={self.failed_count}>"
+        )
@@ -0,0 +1,79 @@
+# app/models/event_stats.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from app.extensions import db
+from sqlalchemy import ForeignKey, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class EventStats(db.Model):
+    """
+    Vorberechnete Buchungs-Kennzahlen pro Event (Admin-Cockpit).
+
+    Wird bei jedem Status-Übergang einer Buchung inkrementell gepflegt
+    (siehe app/services/event_stats.py) und kann per
+    `flask stats refresh` komplett neu berechnet werden.
+    """
+
+    __tablename__ = "event_stats"
+
+    event_id: Mapped[int] = mapped_column(
+        ForeignKey("event.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    # Anzahl Buchungen pro BookingStatus
+    pending_count: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    paid_count: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    canceled_count: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    refund_pending_count: Mapped[int] = mapped_column(
+        db.Integer, default=0, server_default=text("0"), nullable=False
+    )
+    refunded_count: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    failed_count: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+
+    # Summe seats aller PAID-Buchungen (belegte Plätze, Gruppenbuchungen zählen mehrfach)
+    paid_seats: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+
+    # Summe amount_paid aller PAID-Buchungen (in Rappen)
+    revenue_cents: Mapped[int] = mapped_column(db.BigInteger, default=0, nullable=False)
+
+    # Die ersten PAID-Teilnehmer (max. PARTICIPANT_PREVIEW_SIZE) für Detail / Listings:
+    # [{"user_id": ..., "url": ..., "registered_at": ..., "seats": ...}]
+    participant_preview: Mapped[Optional[list]] = mapped_column(db.JSON)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<EventStats event={self.event_id} paid={self.paid_count} seats={self.paid_seats} "
+            f"pending={self.pending_count} revenue_cents={self.revenue_cents}>"
+        )
+
+
+class EventOptionStats(db.Model):
+    """Wie oft eine EventOption in PAID-Buchungen enthalten ist (gezählt in Plätzen)."""
+
+    __tablename__ = "event_option_stats"
+
+    event_option_id: Mapped[int] = mapped_column(
+        ForeignKey("event_option.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    event_id: Mapped[int] = mapped_column(
+        ForeignKey("event.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    selected_count: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<EventOptionStats option={self.event_option_id} "
+            f"event={self.event_id} selected={self.selected_count}>"
+        )
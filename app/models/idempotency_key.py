@@ -0,0 +1,45 @@
+# app/models/idempotency_key.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class IdempotencyKey(db.Model):
+    """
+    Gespeicherte Antwort pro (User, Idempotency-Key).
+
+    status_code IS NULL → Request läuft noch (Platzhalter).
+    Siehe app/utils/idempotency.py.
+    """
+
+    __tablename__ = "idempotency_key"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    endpoint: Mapped[str] = mapped_column(String(200), nullable=False)
+    # SHA-256 über Methode, Pfad und Body – gleicher Key mit anderem Request → 422
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    status_code: Mapped[Optional[int]] = mapped_column()
+    response_body: Mapped[Optional[str]] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    completed_at: Mapped[Optional[datetime]] = mapped_column()
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uix_idempotency_key_user_key"),
+        Index("ix_idempotency_key_created_at", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<IdempotencyKey user={self.user_id} key={self.key!r} "
+            f"status={self.status_code}>"
+        )
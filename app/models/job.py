@@ -0,0 +1,72 @@
+# app/models/job.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+import enum
+
+from sqlalchemy import BigInteger, Index, String, Text, Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+def _job_status_values(enum_cls: type[JobStatus]) -> list[str]:
+    """Sagt SQLAlchemy, welche Strings in der DB erlaubt sind."""
+    return [e.value for e in enum_cls]
+
+
+class Job(db.Model):
+    """
+    Eintrag der Postgres-Job-Queue (siehe app/services/jobs.py).
+
+    Worker holen sich fällige Jobs per SELECT ... FOR UPDATE SKIP LOCKED,
+    fehlgeschlagene Jobs werden mit Backoff erneut eingeplant.
+    """
+
+    __tablename__ = "job"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    queue: Mapped[str] = mapped_column(String(50), nullable=False, default="default")
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[Optional[dict]] = mapped_column(db.JSON)
+
+    status = mapped_column(
+        SAEnum(
+            JobStatus,
+            name="job_status_enum",
+            values_callable=_job_status_values,
+        ),
+        nullable=False,
+        default=JobStatus.QUEUED,
+    )
+
+    attempts: Mapped[int] = mapped_column(db.Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(db.Integer, default=5, nullable=False)
+
+    # frühester Ausführungszeitpunkt (Backoff setzt ihn bei Retries nach hinten)
+    run_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+
+    locked_by: Mapped[Optional[str]] = mapped_column(String(100))
+    locked_at: Mapped[Optional[datetime]] = mapped_column()
+    started_at: Mapped[Optional[datetime]] = mapped_column()
+    finished_at: Mapped[Optional[datetime]] = mapped_column()
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_job_claim", "queue", "status", "run_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Job id={self.id} name={self.name} "
+            f"status={self.status.value} attempts={self.attempts}>"
+        )
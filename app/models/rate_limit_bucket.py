@@ -0,0 +1,25 @@
+# app/models/rate_limit_bucket.py
+from __future__ import annotations
+
+from sqlalchemy import Double, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class RateLimitBucket(db.Model):
+    """
+    Token-Bucket pro (Route, User) für RATE_LIMIT_STORE=postgres.
+    Siehe app/utils/rate_limit.py.
+    """
+
+    __tablename__ = "rate_limit_bucket"
+
+    key: Mapped[str] = mapped_column(String(300), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Double, nullable=False)
+    # Unix-Zeit (Sekunden) der letzten Berechnung
+    updated_at: Mapped[float] = mapped_column(Double, nullable=False)
+    # Ergebnis des letzten consume() – wird per RETURNING zurückgegeben
+    allowed: Mapped[bool] = mapped_column(default=True, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RateLimitBucket key={self.key!r} tokens={self.tokens:.2f}>"
@@ -0,0 +1,37 @@
+# app/models/tombstone.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class Tombstone(db.Model):
+    """
+    Merkt sich gelöschte Zeilen für den Delta-Sync (GET /api/events/sync).
+
+    entity: "event" | "event_option" | "event_media" | "user_event"
+    Kein FK auf event – die Zeile existiert ja nicht mehr.
+    Siehe app/services/sync.py.
+    """
+
+    __tablename__ = "tombstone"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    entity: Mapped[str] = mapped_column(String(30), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    event_id: Mapped[Optional[int]] = mapped_column()
+    # nur bei user_event: Buchungen anderer User gehen den Client nichts an
+    user_id: Mapped[Optional[str]] = mapped_column(String(255))
+
+    deleted_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstone_deleted_at", "deleted_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<Tombstone {self.entity}:{self.entity_id} at={self.deleted_at}>"
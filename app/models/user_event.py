@@ -5,12 +5,14 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 import enum
 
-from sqlalchemy import ForeignKey, Index, String, Enum as SAEnum
+from sqlalchemy import ForeignKey, Index, String, Enum as SAEnum, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.extensions import db
 
 if TYPE_CHECKING:
     from .user_event_option import UserEventOption
+    from .booking_attendee import BookingAttendee
+    from .checkout import Checkout
     from .event import Event
 
 
@@ -19,6 +21,8 @@ class BookingStatus(enum.Enum):
     PENDING = "pending"
     PAID = "paid"
     CANCELED = "canceled"
+    # storniert, Stripe-Refund eingereiht aber noch nicht bestätigt
+    REFUND_PENDING = "refund_pending"
     REFUNDED = "refunded"
     FAILED = "failed"
 
@@ -60,22 +64,67 @@ class UserEvent(db.Model):
 
     paid_at = mapped_column(db.DateTime, nullable=True)
 
+    # PENDING hält seine Plätze bis hierhin (Kapazität), danach gilt die Zahlung als abgebrochen
+    hold_expires_at = mapped_column(db.DateTime, nullable=True)
+
+    # Storno-Erstattung (Job "stripe.refund"): Betrag in Rappen + letzter Fehler
+    refund_amount = mapped_column(db.Integer, nullable=True)
+    refund_error = mapped_column(db.Text, nullable=True)
+    # Massen-Erstattung (event_refund_run), die diese Buchung übernommen hat
+    refund_run_id: Mapped[int | None] = mapped_column(
+        ForeignKey("event_refund_run.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+
+    # Warenkorb-Buchung: gemeinsamer PaymentIntent mit den anderen Buchungen des Checkouts
+    checkout_id: Mapped[int | None] = mapped_column(
+        ForeignKey("checkout.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+
+    # Gruppenbuchung: Anzahl Plätze (Preis und Kapazität × seats)
+    seats: Mapped[int] = mapped_column(
+        db.Integer, nullable=False, default=1, server_default=text("1")
+    )
+
+    # Delta-Sync ("meine Buchungen seit Cursor X")
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
+
     # Beziehungen
     event: Mapped["Event"] = relationship("Event", backref="user_events")
 
+    checkout: Mapped["Checkout | None"] = relationship("Checkout", back_populates="bookings")
+
     options: Mapped[list["UserEventOption"]] = relationship(
         "UserEventOption",
         back_populates="user_event",
         cascade="all, delete-orphan",
     )
 
+    attendees: Mapped[list["BookingAttendee"]] = relationship(
+        "BookingAttendee",
+        back_populates="user_event",
+        cascade="all, delete-orphan",
+        order_by="BookingAttendee.position",
+    )
+
     __table_args__ = (
         Index("idx_user_event", "user_id", "event_id", unique=True),
+        Index("ix_user_event_user_updated_at", "user_id", "updated_at"),
+        # Teilnehmerliste / -Vorschau: PAID-Buchungen eines Events nach Zeitpunkt
+        Index("ix_user_event_event_status_ts", "event_id", "status", "timestamp", "id"),
     )
 
     def __repr__(self) -> str:
         return (
             f"<UserEvent id={self.id} "
             f"status={self.status.value} "
-            f"user={self.user_id} event={self.event_id}>"
+            f"user={self.user_id} event={self.event_id} seats={self.seats}>"
         )
@@ -0,0 +1,69 @@
+# app/models/waitlist_entry.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+import enum
+
+from sqlalchemy import ForeignKey, Index, String, Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class WaitlistStatus(enum.Enum):
+    WAITING = "waiting"
+    # Platz angeboten, bis offer_expires_at buchbar
+    OFFERED = "offered"
+    CLAIMED = "claimed"
+    EXPIRED = "expired"
+    LEFT = "left"
+
+
+def _waitlist_status_values(enum_cls: type[WaitlistStatus]) -> list[str]:
+    """Sagt SQLAlchemy, welche Strings in der DB erlaubt sind."""
+    return [e.value for e in enum_cls]
+
+
+class WaitlistEntry(db.Model):
+    """
+    Eintrag auf der Warteliste eines ausgebuchten Events.
+
+    Die Reihenfolge ist die id (Sequenz) – wer zuerst kommt, rückt zuerst nach.
+    Wird ein Platz frei, bekommen die nächsten WAITING-Einträge ein Angebot
+    (OFFERED) mit Ablaufzeit. Siehe app/services/waitlist.py.
+    """
+
+    __tablename__ = "waitlist_entry"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    event_id: Mapped[int] = mapped_column(
+        ForeignKey("event.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    user_id: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    status = mapped_column(
+        SAEnum(
+            WaitlistStatus,
+            name="waitlist_status_enum",
+            values_callable=_waitlist_status_values,
+        ),
+        nullable=False,
+        default=WaitlistStatus.WAITING,
+    )
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    offered_at: Mapped[Optional[datetime]] = mapped_column()
+    offer_expires_at: Mapped[Optional[datetime]] = mapped_column()
+
+    __table_args__ = (
+        Index("uix_waitlist_entry_event_user", "event_id", "user_id", unique=True),
+        # Nachrücken / offene Angebote: nur der Anfang der Liste pro Event + Status
+        Index("ix_waitlist_entry_event_status_id", "event_id", "status", "id"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<WaitlistEntry id={self.id} event={self.event_id} "
+            f"user={self.user_id} status={self.status.value}>"
+        )
@@ -1,26 +1,98 @@
 # app/routes/events.py
 
-from flask import Blueprint, request, jsonify, abort
-from app.models.event import Event
+from flask import Blueprint, Response, request, jsonify, abort, current_app, stream_with_context
+from app.models.event import Event, EVENT_SEARCH_CONFIG
 from app.models.event_media import EventMedia, MediaType
 from app.models.user_event import UserEvent, BookingStatus
+from app.models.waitlist_entry import WaitlistStatus
 from app.models.event_option import EventOption
 from app.models.user_event_option import UserEventOption
-from app.services.pricing import calculate_event_price
+from app.models.checkout import Checkout, CheckoutStatus
+from app.models.event_refund_run import EventRefundRun
+from app.models.event_stats import EventStats
+from app.services.pricing import calculate_event_price, audit_price_snapshots
 
 from app import db
-from datetime import datetime
-from app.utils.auth import clerk_auth_required
-from app.services.blob import make_read_sas, make_write_sas
+from sqlalchemy import case, func, literal, or_, select, update
+from datetime import datetime, timezone
+from app.utils.auth import admin_required, clerk_auth_required
+from app.utils.idempotency import idempotent, stripe_idempotency_key
+from app.utils.rate_limit import rate_limit
+from app.services.blob import make_read_sas, make_write_sas, make_write_sas_batch
+from app.services.media_pipeline import enqueue_media_processing
+from app.services.jobs import enqueue
+from app.services.payments import (
+    PaymentInProgressError,
+    cancel_open_payment_intent,
+    discard_payment_intent,
+    queue_booking_refund,
+)
+from app.services.booking import (
+    BookingError,
+    attach_payment_intent,
+    pending_payment_intent,
+    prepare_booking,
+    release_booking_hold,
+    upsert_pending_booking,
+)
+from app.services.event_stats import booking_state, track_booking_transition, get_event_stats
+from app.services.bulk_refund import (
+    DEFAULT_BATCH_SIZE as DEFAULT_REFUND_BATCH_SIZE,
+    DEFAULT_CONCURRENCY as DEFAULT_REFUND_CONCURRENCY,
+    event_refund_started,
+    serialize_refund_run,
+    start_event_refund,
+)
+from app.services.event_purge import soft_delete_event
+from app.services.outbound import stripe_error_response
+from app.services.checkout import (
+    MAX_CHECKOUT_ITEMS,
+    attach_checkout_payment_intent,
+    booking_amounts,
+    cancel_checkout,
+)
+from app.services.sync import collect_changes, decode_cursor, record_deletion
+from app.services.read_models import (
+    EVENT_COLUMNS,
+    EventRow,
+    attach_media,
+    event_select,
+    fetch_event,
+    fetch_events,
+    get_live_event,
+    iter_events,
+    ParticipantPreview,
+    decode_participant_cursor,
+    participant_previews,
+    participants_page,
+)
+from app.services.waitlist import (
+    get_entry as get_waitlist_entry,
+    join_waitlist,
+    leave_waitlist,
+    open_offer_count,
+    reserved_seats_select,
+    schedule_promotion,
+    taken_seats_select,
+    unpaid_reserved_seats,
+    waitlist_position,
+)
+from app.services.availability import (
+    availability_snapshots,
+    broker,
+    ensure_listener,
+    publish_availability,
+)
 import uuid
 import mimetypes
 import json
+import queue
+from collections import defaultdict
 from typing import List
 
 # ⭐ Stripe-Integration
 import os
 import stripe
-import requests
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 if not stripe.api_key:
@@ -32,60 +104,85 @@ events_bp = Blueprint("events", __name__)
 
 
 # ---------------------- HELPER FUNCTIONS ----------------------
-def fetch_clerk_user_image(clerk_user_id: str) -> str | None:
+MEDIA_FIELDS = frozenset({"original", "poster", "variants"})
+
+
+def _media_selection_from_request() -> tuple[str | None, frozenset[str]]:
     """
-    Holt das Profilbild eines Clerk-Users über die Clerk Backend API.
-    Wir verwenden direkt die Clerk-User-ID (z.B. 'user_363zYC2Ve5HZwsS7cwJY8AS9txk'),
-    die in UserEvent.user_id gespeichert ist.
-    Es wird NICHTS in der DB gespeichert – reiner Runtime-Lookup.
+    Liest die Media-Auswahl aus dem Query-String:
+
+    - ?media_variant=thumb|medium|webp|...  → sasUrl zeigt auf diese Variante
+    - ?media_fields=original,poster,variants → welche URLs signiert werden
+
+    Ohne media_fields werden alle URLs geliefert – mit media_variant aber nur
+    original + poster, da sasUrl dann bereits die gewünschte Variante ist.
     """
-    secret = os.getenv("CLERK_SECRET_KEY")
-    if not secret:
-        print("⚠️ CLERK_SECRET_KEY ist nicht gesetzt – kann Clerk-User nicht laden.")
-        return None
+    variant = request.args.get("media_variant") or None
+    raw_fields = request.args.get("media_fields")
 
-    if not clerk_user_id:
-        print("⚠️ fetch_clerk_user_image: clerk_user_id ist leer.")
-        return None
+    if raw_fields:
+        fields = frozenset(f.strip() for f in raw_fields.split(",")) & MEDIA_FIELDS
+    elif variant:
+        fields = frozenset({"original", "poster"})
+    else:
+        fields = MEDIA_FIELDS
 
-    try:
-        url = f"https://api.clerk.com/v1/users/{clerk_user_id}"
-        print(f"🔎 Hole Clerk-User von {url}")
-        resp = requests.get(
-            url,
-            headers={
-                "Authorization": f"Bearer {secret}",
-            },
-            timeout=5,
-        )
-        print(f"🔎 Clerk-Response {resp.status_code} für user_id={clerk_user_id}")
+    return variant, fields
 
-        if resp.status_code != 200:
-            text_preview = resp.text[:300].replace("\n", " ")
-            print(f"⚠️ Clerk API Fehler {resp.status_code}: {text_preview}")
-            return None
 
-        data = resp.json()
-        image_url = data.get("image_url")
-        print(f"✅ Clerk image_url für {clerk_user_id}: {image_url}")
-        return image_url
-    except Exception as e:
-        print(f"⚠️ Fehler beim Laden des Clerk-Users {clerk_user_id}: {e}")
-        return None
+MAX_GROUP_SEATS = 50
 
 
-def _serialize_media(media: EventMedia) -> dict:
-    """Serialisiert ein Media-Objekt mit SAS-URLs"""
-    return {
+def _group_booking_from_request(data: dict) -> tuple[int, list[dict]]:
+    """
+    Liest Plätze und Teilnehmer einer (Gruppen-)Buchung aus dem Body:
+
+        "seats": 3,
+        "attendees": [{"name": "Anna", "email": "anna@example.com"}, ...]
+
+    Ab 2 Plätzen braucht jeder Platz einen namentlichen Teilnehmer (email optional).
+    ValueError bei ungültigen Angaben.
+    """
+    seats = data.get("seats", 1)
+    if isinstance(seats, bool) or not isinstance(seats, int) or not 1 <= seats <= MAX_GROUP_SEATS:
+        raise ValueError(f"'seats' muss eine Zahl zwischen 1 und {MAX_GROUP_SEATS} sein.")
+
+    raw_attendees = data.get("attendees") or []
+    if not isinstance(raw_attendees, list):
+        raise ValueError("'attendees' muss eine Liste sein.")
+    if (raw_attendees or seats > 1) and len(raw_attendees) != seats:
+        raise ValueError(f"Für {seats} Plätze werden {seats} 'attendees' erwartet.")
+
+    attendees = []
+    for a in raw_attendees:
+        name = (a.get("name") or "").strip() if isinstance(a, dict) else ""
+        if not name:
+            raise ValueError("Jeder Eintrag in 'attendees' braucht einen 'name'.")
+        attendees.append({"name": name[:200], "email": (a.get("email") or None)})
+    return seats, attendees
+
+
+def _serialize_media(
+    media: EventMedia,
+    variant: str | None = None,
+    fields: frozenset[str] = MEDIA_FIELDS,
+) -> dict:
+    """
+    Serialisiert ein Media-Objekt mit SAS-URLs.
+
+    Mit variant zeigt sasUrl auf diese Variante (falls vorhanden, sonst Original).
+    Es werden nur die URLs aus fields signiert, die übrigen Keys fehlen.
+    """
+    variants = media.variants_json or {}
+    served_variant = variant if variant in variants else None
+    served_blob = variants[served_variant] if served_variant else media.blob_name
+
+    result = {
         "id": media.id,
         "type": media.type.value,
         "mime": media.mime,
         "blobName": media.blob_name,
-        "sasUrl": make_read_sas(media.blob_name),
-        "posterSasUrl": make_read_sas(media.poster_blob) if media.poster_blob else None,
-        "variants": {
-            k: make_read_sas(v) for k, v in (media.variants_json or {}).items()
-        },
+        "variant": served_variant,
         "sortOrder": media.sort_order,
         "width": media.width,
         "height": media.height,
@@ -94,13 +191,33 @@ def _serialize_media(media: EventMedia) -> dict:
         "createdAt": media.created_at.isoformat(),
     }
 
+    if "original" in fields:
+        result["sasUrl"] = make_read_sas(served_blob)
+    if "poster" in fields:
+        result["posterSasUrl"] = (
+            make_read_sas(media.poster_blob) if media.poster_blob else None
+        )
+    if "variants" in fields:
+        result["variants"] = {k: make_read_sas(v) for k, v in variants.items()}
+
+    return result
+
 
 def _serialize_event(
-    event: Event, include_media: bool = False, include_participants: bool = False
+    event: Event,
+    include_media: bool = False,
+    include_participants: bool = False,
+    media_variant: str | None = None,
+    media_fields: frozenset[str] = MEDIA_FIELDS,
+    participants: ParticipantPreview | None = None,
 ) -> dict:
     """
-    Serialisiert ein Event-Objekt mit optionalen Media-Informationen
-    und Teilnehmer-Daten (nur PAID-Teilnehmer).
+    Serialisiert ein Event (Modell oder EventRow aus read_models) mit optionalen
+    Media-Informationen und Teilnehmer-Daten (nur PAID-Teilnehmer).
+    participants: Anzahl + Vorschau aus read_models.participant_previews –
+    "participants" enthält dann nur die ersten Teilnehmer
+    (participants_truncated=true, komplette Liste unter /<id>/participants).
+    Ohne participants werden alle Teilnehmer des Events nachgeladen.
     """
     result = {
         "id": event.id,
@@ -120,19 +237,29 @@ def _serialize_event(
         result["is_online"] = event.is_online
 
     if include_participants:
-        # Nur PAID-Buchungen zählen als Teilnehmer
-        paid_events: List[UserEvent] = (
-            UserEvent.query.filter_by(event_id=event.id, status=BookingStatus.PAID)
-            .order_by(UserEvent.timestamp.asc())
-            .all()
-        )
+        # Nur PAID-Buchungen zählen als Teilnehmer, Gruppenbuchungen mit ihren Plätzen
+        if participants is not None:
+            paid_events = participants.participants
+            booking_count = participants.count
+            participant_count = participants.seats
+            reserved_seats = participants.reserved_seats
+        else:
+            paid_events = (
+                UserEvent.query.filter_by(event_id=event.id, status=BookingStatus.PAID)
+                .order_by(UserEvent.timestamp.asc())
+                .all()
+            )
+            booking_count = len(paid_events)
+            participant_count = sum(ue.seats for ue in paid_events)
+            reserved_seats = db.session.scalar(select(unpaid_reserved_seats(event.id)))
 
-        participant_count = len(paid_events)
         result["participant_count"] = participant_count
+        result["participants_truncated"] = booking_count > len(paid_events)
 
         if event.max_participants:
+            # gehaltene Plätze (Holds, Wartelisten-Angebote) sind nicht frei – wie bei /book
             result["available_spots"] = max(
-                0, event.max_participants - participant_count
+                0, event.max_participants - participant_count - reserved_seats
             )
         else:
             result["available_spots"] = None  # unlimited
@@ -141,6 +268,7 @@ def _serialize_event(
             {
                 "user_id": ue.user_id,
                 "registered_at": ue.timestamp.isoformat(),
+                "seats": ue.seats,
             }
             for ue in paid_events
         ]
@@ -150,27 +278,113 @@ def _serialize_event(
         ]
 
     if include_media:
-        result["media"] = [_serialize_media(m) for m in event.media_items]
+        result["media"] = [
+            _serialize_media(m, media_variant, media_fields)
+            for m in event.media_items
+        ]
 
     return result
 
 
+def _parse_datetime_arg(name: str) -> datetime | None:
+    """
+    Liest einen ISO-Zeitstempel aus dem Query-String (ValueError bei ungültigem Wert).
+    Mit Zeitzone (…Z, +02:00) → nach UTC umgerechnet und naiv, wie start_time in der DB.
+    """
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' muss ein ISO-Zeitstempel sein")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _parse_bool_arg(name: str) -> bool | None:
+    """true/false aus dem Query-String, None wenn nicht gesetzt."""
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return None
+    return raw.lower() == "true"
+
+
+def _time_window_from_request() -> tuple[datetime | None, datetime | None]:
+    """
+    Zeitfenster auf start_time aus ?from=, ?to= und ?upcoming=true.
+    upcoming=true setzt die Untergrenze auf "jetzt" (bzw. später, falls from später ist).
+    """
+    start_from = _parse_datetime_arg("from")
+    start_to = _parse_datetime_arg("to")
+
+    if _parse_bool_arg("upcoming"):
+        now = datetime.utcnow()
+        start_from = max(start_from, now) if start_from else now
+
+    return start_from, start_to
+
+
+def _apply_time_window(query, start_from: datetime | None, start_to: datetime | None):
+    """Filtert eine Event-Query auf start_time in [start_from, start_to)."""
+    if start_from:
+        query = query.filter(Event.start_time >= start_from)
+    if start_to:
+        query = query.filter(Event.start_time < start_to)
+    return query
+
+
+def _load_event_rows(stmt, include_media: bool, include_participants: bool):
+    """
+    Listing über die Read-Models: EventRows plus Media / Teilnehmer mit je
+    einer Query für alle Events (statt ORM-Instanzen und N+1).
+    → (events, {event_id: ParticipantPreview})
+    """
+    events = fetch_events(stmt)
+    if include_media:
+        attach_media(events)
+    participants = (
+        participant_previews(e.id for e in events) if include_participants else {}
+    )
+    return events, participants
+
+
 # ---------------------- EVENT LISTINGS ----------------------
 
 
+def _listing_cost() -> int:
+    """Rate-Limit-Kosten von Listen-Requests: Medien (SAS pro Item) sind teurer."""
+    cost = 1
+    if request.args.get("include_media", "false").lower() == "true":
+        cost += 4
+    if request.args.get("include_participants", "false").lower() == "true":
+        cost += 1
+    return cost
+
+
 @events_bp.route("/", methods=["GET"])
 @clerk_auth_required
+@rate_limit(120, 60, cost=_listing_cost)
 def get_unregistered_events():
     """
     Gibt alle Events zurück, für die der User KEINE AKTIVE Buchung hat.
 
     Aktiv sind: PENDING, PAID
+    Optional: ?from= / ?to= / ?upcoming=true (Filter auf start_time).
+    Sortiert nach start_time aufsteigend.
     """
     user_id = request.clerk_user_id
     include_media = request.args.get("include_media", "false").lower() == "true"
     include_participants = (
         request.args.get("include_participants", "false").lower() == "true"
     )
+    media_variant, media_fields = _media_selection_from_request()
+
+    try:
+        start_from, start_to = _time_window_from_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     active_statuses = [BookingStatus.PENDING, BookingStatus.PAID]
 
@@ -182,11 +396,25 @@ def get_unregistered_events():
         )
     )
 
-    unregistered_events = Event.query.filter(~Event.id.in_(subquery)).all()
+    stmt = _apply_time_window(
+        event_select(~Event.id.in_(subquery)), start_from, start_to
+    )
+    unregistered_events, participants = _load_event_rows(
+        stmt.order_by(Event.start_time.asc(), Event.id.asc()),
+        include_media,
+        include_participants,
+    )
 
     return jsonify(
         [
-            _serialize_event(e, include_media, include_participants)
+            _serialize_event(
+                e,
+                include_media,
+                include_participants,
+                media_variant,
+                media_fields,
+                participants.get(e.id),
+            )
             for e in unregistered_events
         ]
     )
@@ -194,17 +422,26 @@ def get_unregistered_events():
 
 @events_bp.route("/my-events", methods=["GET"])
 @clerk_auth_required
+@rate_limit(120, 60, cost=_listing_cost)
 def get_registered_events():
     """
     Gibt alle Events zurück, für die der User eine AKTIVE Buchung hat.
 
     Aktiv sind: PENDING, PAID
+    Optional: ?from= / ?to= / ?upcoming=true (Filter auf start_time).
+    Sortiert nach start_time aufsteigend.
     """
     user_id = request.clerk_user_id
     include_media = request.args.get("include_media", "false").lower() == "true"
     include_participants = (
         request.args.get("include_participants", "false").lower() == "true"
     )
+    media_variant, media_fields = _media_selection_from_request()
+
+    try:
+        start_from, start_to = _time_window_from_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     active_statuses = [BookingStatus.PENDING, BookingStatus.PAID]
 
@@ -216,45 +453,443 @@ def get_registered_events():
         )
     )
 
-    registered_events = Event.query.filter(Event.id.in_(subquery)).all()
+    stmt = _apply_time_window(
+        event_select(Event.id.in_(subquery)), start_from, start_to
+    )
+    registered_events, participants = _load_event_rows(
+        stmt.order_by(Event.start_time.asc(), Event.id.asc()),
+        include_media,
+        include_participants,
+    )
 
     return jsonify(
         [
-            _serialize_event(e, include_media, include_participants)
+            _serialize_event(
+                e,
+                include_media,
+                include_participants,
+                media_variant,
+                media_fields,
+                participants.get(e.id),
+            )
             for e in registered_events
         ]
     )
 
 
 @events_bp.route("/all", methods=["GET"])
+@rate_limit(120, 60, cost=_listing_cost)
 def get_all_events():
-    """Gibt alle Events zurück (Admin-Funktion)"""
+    """
+    Gibt alle Events zurück (Admin-Funktion)
+
+    Optional: ?from= / ?to= / ?upcoming=true (Filter auf start_time).
+    Sortiert nach start_time aufsteigend.
+    """
     include_media = request.args.get("include_media", "false").lower() == "true"
     include_participants = (
         request.args.get("include_participants", "false").lower() == "true"
     )
-    events = Event.query.all()
+    media_variant, media_fields = _media_selection_from_request()
+
+    try:
+        start_from, start_to = _time_window_from_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    events, participants = _load_event_rows(
+        _apply_time_window(event_select(), start_from, start_to).order_by(
+            Event.start_time.asc(), Event.id.asc()
+        ),
+        include_media,
+        include_participants,
+    )
 
     return jsonify(
-        [_serialize_event(e, include_media, include_participants) for e in events]
+        [
+            _serialize_event(
+                e,
+                include_media,
+                include_participants,
+                media_variant,
+                media_fields,
+                participants.get(e.id),
+            )
+            for e in events
+        ]
+    )
+
+
+@events_bp.route("/export", methods=["GET"])
+@clerk_auth_required
+@admin_required
+@rate_limit(10, 60)
+def export_events():
+    """
+    Exportiert alle Events als NDJSON (eine JSON-Zeile pro Event, Admin-Funktion)
+    inkl. participant_count / pending_count / available_spots aus event_stats.
+
+    Optional: ?from= / ?to= / ?upcoming=true (Filter auf start_time).
+    Gestreamt in Batches über einen Server-Side-Cursor – Speicher bleibt konstant.
+    """
+    try:
+        start_from, start_to = _time_window_from_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stmt = _apply_time_window(event_select(), start_from, start_to).order_by(
+        Event.start_time.asc(), Event.id.asc()
+    )
+
+    def generate():
+        for batch in iter_events(stmt):
+            snapshots = {
+                s["event_id"]: s for s in availability_snapshots(e.id for e in batch)
+            }
+            for event in batch:
+                item = _serialize_event(event)
+                snapshot = snapshots.get(event.id, {})
+                item["participant_count"] = snapshot.get("participant_count", 0)
+                item["pending_count"] = snapshot.get("pending_count", 0)
+                item["available_spots"] = snapshot.get("available_spots")
+                yield json.dumps(item) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=events.ndjson"},
+    )
+
+
+# ---------------------- EVENT SEARCH ----------------------
+
+SEARCH_MAX_PER_PAGE = 100
+
+
+@events_bp.route("/search", methods=["GET"])
+@rate_limit(60, 60)
+def search_events():
+    """
+    Volltextsuche über title / description / location (Postgres tsvector + GIN).
+
+    Query-Parameter (alle optional):
+    - q: Suchbegriffe (websearch-Syntax: "a b", "a OR b", -c, "exakte phrase")
+    - from / to: ISO-Zeitstempel, Filter auf start_time; upcoming=true → ab jetzt
+    - is_online: true | false
+    - available: true → nur Events mit freien Plätzen
+    - page (Default 1), per_page (Default 20, max. 100)
+
+    Sortierung: Relevanz (bei q), dann start_time aufsteigend.
+    facets.is_online zählt Treffer ohne den is_online-Filter.
+    """
+    q = (request.args.get("q") or "").strip()
+
+    try:
+        start_from, start_to = _time_window_from_request()
+        page = max(1, int(request.args.get("page", 1)))
+        per_page = min(
+            SEARCH_MAX_PER_PAGE, max(1, int(request.args.get("per_page", 20)))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    is_online = _parse_bool_arg("is_online")
+    only_available = _parse_bool_arg("available")
+
+    # belegte Plätze wie bei /book: PAID-Plätze aus event_stats (kein GROUP BY über
+    # user_event) + laufende Holds + offene Wartelisten-Angebote
+    paid_seats = func.coalesce(EventStats.paid_seats, 0)
+    taken_seats = paid_seats + unpaid_reserved_seats(Event.id)
+
+    if q:
+        ts_query = func.websearch_to_tsquery(EVENT_SEARCH_CONFIG, q)
+        rank = func.ts_rank_cd(Event.search_vector, ts_query)
+    else:
+        ts_query = None
+        rank = literal(0.0)
+
+    base = (
+        db.session.query(Event)
+        .outerjoin(EventStats, EventStats.event_id == Event.id)
+        .filter(Event.deleted_at.is_(None))
+    )
+    if ts_query is not None:
+        base = base.filter(Event.search_vector.op("@@")(ts_query))
+    base = _apply_time_window(base, start_from, start_to)
+    if only_available:
+        base = base.filter(
+            or_(Event.max_participants.is_(None), taken_seats < Event.max_participants)
+        )
+
+    online_facet = {"true": 0, "false": 0}
+    for online, count in (
+        base.with_entities(Event.is_online, func.count(Event.id))
+        .group_by(Event.is_online)
+        .all()
+    ):
+        online_facet["true" if online else "false"] += count
+
+    if is_online is not None:
+        base = base.filter(Event.is_online.is_(is_online))
+
+    total = base.with_entities(func.count(Event.id)).scalar()
+
+    rows = (
+        base.with_entities(
+            *EVENT_COLUMNS,
+            rank.label("rank"),
+            paid_seats.label("paid_seats"),
+            taken_seats.label("taken_seats"),
+        )
+        .order_by(rank.desc(), Event.start_time.asc(), Event.id.asc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+        .all()
     )
 
+    results = []
+    for row in rows:
+        event = EventRow(*row[: len(EVENT_COLUMNS)])
+        event_rank, event_paid_seats, event_taken_seats = row[len(EVENT_COLUMNS) :]
+        item = _serialize_event(event)
+        item["rank"] = float(event_rank)
+        item["participant_count"] = event_paid_seats
+        item["available_spots"] = (
+            max(0, event.max_participants - event_taken_seats)
+            if event.max_participants
+            else None
+        )
+        results.append(item)
+
+    return jsonify(
+        {
+            "results": results,
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "facets": {"is_online": online_facet},
+        }
+    ), 200
+
+
+# ---------------------- DELTA SYNC ----------------------
+
+
+def _serialize_option(opt: EventOption) -> dict:
+    return {
+        "id": opt.id,
+        "event_id": opt.event_id,
+        "type": opt.type,
+        "label": opt.label,
+        "price_cents": opt.price_cents,
+        "is_required": opt.is_required,
+        "is_selectable": opt.is_selectable,
+        "is_active": opt.is_active,
+        "sort_order": opt.sort_order,
+    }
+
+
+def _serialize_booking(user_event: UserEvent, option_ids: List[int]) -> dict:
+    return {
+        "id": user_event.id,
+        "event_id": user_event.event_id,
+        "status": user_event.status.value,
+        "amount_paid": user_event.amount_paid,
+        "currency": user_event.currency,
+        "paid_at": user_event.paid_at.isoformat() if user_event.paid_at else None,
+        "registered_at": user_event.timestamp.isoformat(),
+        "seats": user_event.seats,
+        "option_ids": option_ids,
+    }
+
+
+@events_bp.route("/sync", methods=["GET"])
+@clerk_auth_required
+@rate_limit(60, 60)
+def sync_events():
+    """
+    Delta-Sync für Clients mit lokalem Cache.
+
+    - ohne ?cursor= (oder Cursor zu alt): kompletter Stand, "full": true
+      → Client verwirft seinen Cache und übernimmt alles
+    - mit ?cursor=: nur Events, Optionen, Media und eigene Buchungen, die sich
+      seitdem geändert haben, plus gelöschte IDs unter "deleted"
+      (gelöschtes Event → Client entfernt auch dessen Optionen/Media/Buchungen)
+
+    Änderungen als Upsert anwenden (Fenster überlappen, Duplikate sind möglich),
+    danach den gelieferten "cursor" für den nächsten Aufruf speichern.
+    Media-Auswahl wie bei den Listings (?media_variant=, ?media_fields=).
+    """
+    user_id = request.clerk_user_id
+    media_variant, media_fields = _media_selection_from_request()
+
+    since = None
+    raw_cursor = request.args.get("cursor")
+    if raw_cursor:
+        try:
+            since = decode_cursor(raw_cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    changes = collect_changes(user_id, since)
+
+    return jsonify(
+        {
+            "cursor": changes.cursor,
+            "full": changes.full,
+            "events": [_serialize_event(e) for e in changes.events],
+            "options": [_serialize_option(o) for o in changes.options],
+            "media": [
+                {**_serialize_media(m, media_variant, media_fields), "eventId": m.event_id}
+                for m in changes.media
+            ],
+            "my_bookings": [
+                _serialize_booking(ue, changes.booking_option_ids.get(ue.id, []))
+                for ue in changes.bookings
+            ],
+            "deleted": changes.deleted,
+        }
+    ), 200
+
 
 # ---------------------- EVENT DETAIL ----------------------
 
 
 @events_bp.route("/<int:event_id>", methods=["GET"])
 def get_event_detail(event_id: int):
-    """Gibt Details zu einem einzelnen Event inkl. Media und Teilnehmer-Info zurück"""
-    event = db.session.get(Event, event_id)
+    """
+    Gibt Details zu einem einzelnen Event inkl. Media und Teilnehmer-Info zurück.
+    Teilnehmer: Anzahl + die ersten (Vorschau), komplette Liste unter /<id>/participants.
+    """
+    event = fetch_event(event_id)
     if not event:
         abort(404)
 
+    attach_media([event])
+    media_variant, media_fields = _media_selection_from_request()
+
     return jsonify(
-        _serialize_event(event, include_media=True, include_participants=True)
+        _serialize_event(
+            event,
+            include_media=True,
+            include_participants=True,
+            media_variant=media_variant,
+            media_fields=media_fields,
+            participants=participant_previews([event.id])[event.id],
+        )
+    )
+
+
+PARTICIPANTS_DEFAULT_LIMIT = 50
+PARTICIPANTS_MAX_LIMIT = 200
+
+
+@events_bp.route("/<int:event_id>/participants", methods=["GET"])
+def list_event_participants(event_id: int):
+    """
+    Komplette Liste der PAID-Teilnehmer, seitenweise (Anmeldezeitpunkt aufsteigend).
+
+    - limit: Default 50, max. 200
+    - cursor: next_cursor der vorherigen Seite (None → letzte Seite)
+    """
+    if not fetch_event(event_id):
+        abort(404)
+
+    try:
+        limit = min(
+            PARTICIPANTS_MAX_LIMIT,
+            max(1, int(request.args.get("limit", PARTICIPANTS_DEFAULT_LIMIT))),
+        )
+        raw_cursor = request.args.get("cursor")
+        after = decode_participant_cursor(raw_cursor) if raw_cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    participants, next_cursor = participants_page(event_id, after, limit)
+
+    return jsonify(
+        {
+            "participants": [
+                {
+                    "user_id": p.user_id,
+                    "registered_at": p.timestamp.isoformat(),
+                    "avatar_url": p.avatar_url,
+                    "seats": p.seats,
+                }
+                for p in participants
+            ],
+            "next_cursor": next_cursor,
+        }
+    ), 200
+
+
+# ---------------------- LIVE AVAILABILITY (SSE) ----------------------
+
+SSE_HEARTBEAT_SECS = 15
+SSE_MAX_EVENTS = 50
+
+
+def _availability_stream(event_ids: list[int]) -> Response:
+    """
+    SSE-Stream: zuerst der aktuelle Stand, danach jede Änderung als
+    "event: availability". Heartbeat-Kommentare halten Proxies offen.
+    Die DB-Session wird vor dem Streamen freigegeben (Snapshots vorab geladen).
+    """
+    initial = availability_snapshots(event_ids)
+    if not initial:
+        abort(404)
+
+    ensure_listener(current_app._get_current_object())
+    subscription = broker.subscribe(event_ids)
+
+    def generate():
+        try:
+            for snapshot in initial:
+                yield f"event: availability\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                try:
+                    message = subscription.get(timeout=SSE_HEARTBEAT_SECS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: availability\ndata: {json.dumps(message)}\n\n"
+        finally:
+            broker.unsubscribe(subscription, event_ids)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@events_bp.route("/<int:event_id>/availability/stream", methods=["GET"])
+def stream_event_availability(event_id: int):
+    """Live-Updates zu participant_count / available_spots eines Events (SSE)"""
+    return _availability_stream([event_id])
+
+
+@events_bp.route("/availability/stream", methods=["GET"])
+def stream_events_availability():
+    """
+    Live-Updates für mehrere Events (SSE).
+    Query: ?event_ids=1,2,3 (max. 50)
+    """
+    try:
+        event_ids = sorted(
+            {int(e) for e in request.args.get("event_ids", "").split(",") if e.strip()}
+        )
+    except ValueError:
+        return jsonify({"error": "'event_ids' muss eine Komma-Liste von IDs sein"}), 400
+
+    if not event_ids:
+        return jsonify({"error": "'event_ids' fehlt"}), 400
+    if len(event_ids) > SSE_MAX_EVENTS:
+        return jsonify({"error": f"maximal {SSE_MAX_EVENTS} Events pro Stream"}), 400
+
+    return _availability_stream(event_ids)
+
+
 # ---------------------- EVENT OPTIONS (PRICING) ----------------------
 
 
@@ -266,7 +901,7 @@ def get_event_options(event_id: int):
     Wird von der Mobile App und dem Cockpit verwendet,
     um Travel/Ticket/Club Fee inkl. Preis anzuzeigen.
     """
-    event = db.session.get(Event, event_id)
+    event = get_live_event(event_id)
     if not event:
         abort(404)
 
@@ -318,7 +953,7 @@ def update_event_options(event_id: int):
     - CLUB_FEE: is_required=True, is_selectable=False, is_active=True.
     - Optionen, die nicht im Payload vorkommen, werden deaktiviert (is_active=False).
     """
-    event = db.session.get(Event, event_id)
+    event = get_live_event(event_id)
     if not event:
         abort(404)
 
@@ -420,19 +1055,81 @@ def update_event_options(event_id: int):
         return jsonify({"error": str(e)}), 500
 
 
+@events_bp.route("/<int:event_id>/pricing-audit", methods=["GET"])
+def get_pricing_audit(event_id: int):
+    """
+    Vergleicht die Preis-Snapshots aller Buchungen eines Events mit den
+    aktuellen Options-Preisen (Admin-Funktion).
+
+    Gibt nur Buchungen mit Abweichung zurück, plus eine Zusammenfassung.
+    """
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+
+    result = audit_price_snapshots(event_id=event.id)
+    mismatched = (result.diff_cents != 0).nonzero()[0]
+
+    return jsonify(
+        {
+            "event_id": event.id,
+            "booking_count": int(len(result.booking_ids)),
+            "mismatch_count": int(len(mismatched)),
+            "total_current_cents": int(result.totals_cents.sum()),
+            "total_snapshot_cents": int(result.snapshot_totals_cents.sum()),
+            "mismatches": [
+                {
+                    "user_event_id": int(result.booking_ids[i]),
+                    "current_cents": int(result.totals_cents[i]),
+                    "snapshot_cents": int(result.snapshot_totals_cents[i]),
+                    "diff_cents": int(result.diff_cents[i]),
+                }
+                for i in mismatched
+            ],
+        }
+    ), 200
+
+
+@events_bp.route("/<int:event_id>/stats", methods=["GET"])
+def get_event_stats_endpoint(event_id: int):
+    """
+    Vorberechnete Buchungs-Kennzahlen eines Events (Admin-Cockpit):
+    Anzahl pro BookingStatus, Umsatz (PAID) und Auswahl-Zähler pro Option.
+    Liest nur event_stats / event_option_stats – kein Scan von user_event.
+    """
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+
+    return jsonify(get_event_stats(event.id)), 200
+
+
 # ---------------------- CREATE BOOKING WITH OPTIONS + STRIPE ----------------------
 
 
 @events_bp.route("/<int:event_id>/book", methods=["POST"])
 @clerk_auth_required
+@rate_limit(10, 60)
+@idempotent
 def book_event(event_id: int):
     """
     Erzeugt oder aktualisiert eine Buchung (UserEvent) mit Preisberechnung
-    und Stripe PaymentIntent.
+    und Stripe PaymentIntent (State Machine in app/services/booking.py,
+    geteilt mit der async Variante).
 
     State Machine:
-    - Neu oder Re-Try → status = PENDING
+    - Neu oder Re-Try → status = PENDING (alter PaymentIntent wird vorher gecancelt)
     - PAID           → 409 (bereits gebucht und bezahlt)
+
+    Die PENDING-Buchung hält ihre Plätze BOOKING_HOLD_MINUTES lang. Die
+    Event-Zeile ist nur für Prüfung + Hold gesperrt, nicht während des
+    Stripe-Calls; scheitert er, werden die Plätze wieder frei.
+
+    Gruppenbuchung: "seats" (Default 1) + "attendees" – eine Buchung, ein
+    PaymentIntent über Preis × seats, belegt seats Plätze.
+
+    Mit Header Idempotency-Key liefern Wiederholungen die gespeicherte Antwort,
+    der Key wird auch an Stripe weitergereicht.
     """
     if not stripe.api_key:
         return jsonify({"error": "Stripe is not configured on the server"}), 500
@@ -442,168 +1139,429 @@ def book_event(event_id: int):
     selected_option_ids = data.get("selected_option_ids", [])
 
     if not isinstance(selected_option_ids, list):
-        abort(400, description="'selected_option_ids' muss eine Liste von IDs sein.")
+        return jsonify({"error": "'selected_option_ids' muss eine Liste von IDs sein."}), 400
 
-    event = db.session.get(Event, event_id)
-    if not event:
-        abort(404)
+    try:
+        seats, attendees = _group_booking_from_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    all_options: List[EventOption] = EventOption.query.filter_by(
-        event_id=event.id, is_active=True
-    ).all()
+    try:
+        old_payment_intent_id = pending_payment_intent(db.session, event_id, user_id)
+        if old_payment_intent_id:
+            # alten PaymentIntent canceln, BEVOR es einen neuen gibt → nie zwei bezahlbare
+            cancel_open_payment_intent(old_payment_intent_id)
+
+        # sperrt die Event-Zeile; der Commit gibt sie frei, der Hold hält die Plätze
+        booking = prepare_booking(
+            db.session,
+            event_id,
+            user_id,
+            selected_option_ids,
+            seats,
+            attendees,
+            old_payment_intent_id,
+        )
+        db.session.commit()
 
-    if not all_options:
-        abort(400, description="Für dieses Event sind keine Preis-Optionen konfiguriert.")
+        # Stripe außerhalb des Locks
+        try:
+            payment_intent = stripe.PaymentIntent.create(
+                **booking.payment_intent_params(),
+                idempotency_key=stripe_idempotency_key(f"book-{event_id}-{booking.attempt}"),
+            )
+        except Exception:
+            db.session.rollback()
+            release_booking_hold(db.session, booking)
+            db.session.commit()
+            raise
 
-    if not any(o.is_required for o in all_options):
-        abort(
-            400,
-            description=(
-                "Event ist nicht korrekt konfiguriert: es gibt keine Pflicht-Gebühr (is_required=True)."
-            ),
-        )
+        try:
+            attach_payment_intent(db.session, booking, payment_intent.id)
+            db.session.commit()
+        except Exception:
+            # Buchung inzwischen neu aufgesetzt → dieser PaymentIntent darf nicht offen bleiben
+            db.session.rollback()
+            discard_payment_intent(payment_intent.id)
+            db.session.commit()
+            raise
 
-    valid_option_ids = {opt.id for opt in all_options}
-    invalid_ids = {int(o_id) for o_id in selected_option_ids} - valid_option_ids
-    if invalid_ids:
-        abort(
-            400,
-            description=f"Ungültige selected_option_ids für dieses Event: {sorted(invalid_ids)}",
-        )
+    except BookingError as e:
+        db.session.rollback()
+        return jsonify(e.body), e.status
+    except PaymentInProgressError as e:
+        db.session.rollback()
+        return jsonify(
+            {
+                "error": "Previous payment for this booking is already being processed",
+                "stripe_payment_intent_id": e.payment_intent_id,
+                "payment_status": e.status,
+            }
+        ), 409
+    except stripe.error.StripeError as e:
+        db.session.rollback()
+        body, status, headers = stripe_error_response(e)
+        return jsonify(body), status, headers
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-    # Kapazität nur anhand PAID-Buchungen
-    if event.max_participants:
-        paid_count = UserEvent.query.filter_by(
-            event_id=event.id,
-            status=BookingStatus.PAID,
-        ).count()
-        if paid_count >= event.max_participants:
-            abort(400, description="Event ist bereits voll.")
-
-    total_price_cents, charged_options = calculate_event_price(
-        all_options=all_options,
-        selected_option_ids=selected_option_ids,
-    )
+    publish_availability(event_id)
+    return jsonify(booking.response(payment_intent)), 201
+
+
+# ---------------------- CART CHECKOUT (MEHRERE EVENTS) ----------------------
 
-    if total_price_cents <= 0:
-        abort(
-            400,
-            description="Berechneter Preis ist 0 oder negativ. Bitte Event-Optionen prüfen.",
+
+def _serialize_checkout(checkout: Checkout, bookings: List[UserEvent]) -> dict:
+    amounts = booking_amounts(ue.id for ue in bookings)
+    return {
+        "checkout_id": checkout.id,
+        "status": checkout.status.value,
+        "amount_cents": checkout.amount_cents,
+        "currency": checkout.currency,
+        "stripe_payment_intent_id": checkout.stripe_payment_intent_id,
+        "created_at": checkout.created_at.isoformat(),
+        "paid_at": checkout.paid_at.isoformat() if checkout.paid_at else None,
+        "items": [
+            {
+                "user_event_id": ue.id,
+                "event_id": ue.event_id,
+                "status": ue.status.value,
+                "seats": ue.seats,
+                "amount_cents": amounts.get(ue.id, 0),
+            }
+            for ue in bookings
+        ],
+    }
+
+
+@events_bp.route("/checkout", methods=["POST"])
+@clerk_auth_required
+@rate_limit(10, 60)
+@idempotent
+def checkout_events():
+    """
+    Bucht mehrere Events auf einmal mit EINEM Stripe PaymentIntent.
+
+    Erwartet JSON:
+    {
+        "items": [
+            {"event_id": 1, "selected_option_ids": [3], "seats": 1},
+            {"event_id": 2, "selected_option_ids": [], "seats": 2, "attendees": [...]}
+        ]
+    }
+
+    Alle Events werden in einem Durchgang geprüft und bepreist; die Event-Zeilen
+    sind dabei gesperrt, Kapazität und Buchungen (mit Hold, siehe /book)
+    entstehen also für alle oder keines. Der PaymentIntent entsteht erst nach
+    dem Commit, ohne Lock; scheitert er, wird der Checkout abgebrochen.
+    Fehler einzelner Positionen kommen gesammelt unter "items" zurück.
+    Bezahlt wird über stripe_client_secret, der Webhook verbucht alle Buchungen
+    gemeinsam.
+    """
+    if not stripe.api_key:
+        return jsonify({"error": "Stripe is not configured on the server"}), 500
+
+    user_id = request.clerk_user_id
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'items' muss eine nicht-leere Liste sein."}), 400
+    if len(items) > MAX_CHECKOUT_ITEMS:
+        return jsonify({"error": f"Maximal {MAX_CHECKOUT_ITEMS} Events pro Checkout."}), 400
+
+    requested = {}
+    for item in items:
+        try:
+            event_id = int(item.get("event_id"))
+        except (AttributeError, TypeError, ValueError):
+            return jsonify({"error": "Jede Position braucht eine 'event_id'."}), 400
+        if event_id in requested:
+            return jsonify({"error": f"Event {event_id} ist doppelt im Warenkorb."}), 400
+
+        selected_option_ids = item.get("selected_option_ids", [])
+        if not isinstance(selected_option_ids, list):
+            return jsonify(
+                {"error": "'selected_option_ids' muss eine Liste von IDs sein.", "event_id": event_id}
+            ), 400
+        try:
+            seats, attendees = _group_booking_from_request(item)
+            selected_option_ids = [int(o_id) for o_id in selected_option_ids]
+        except ValueError as e:
+            return jsonify({"error": str(e), "event_id": event_id}), 400
+        requested[event_id] = (selected_option_ids, seats, attendees)
+
+    event_ids = sorted(requested)
+
+    try:
+        # alte PaymentIntents einzeln gebuchter Events canceln, BEVOR es den neuen
+        # gibt – vor dem Lock, Stripe-Calls halten keine Event-Zeilen fest
+        canceled_payment_intent_ids = set()
+        for ue in UserEvent.query.filter(
+            UserEvent.user_id == user_id,
+            UserEvent.event_id.in_(event_ids),
+            UserEvent.status == BookingStatus.PENDING,
+            UserEvent.checkout_id.is_(None),
+            UserEvent.stripe_payment_intent_id.is_not(None),
+        ):
+            cancel_open_payment_intent(ue.stripe_payment_intent_id)
+            canceled_payment_intent_ids.add(ue.stripe_payment_intent_id)
+
+        # Event-Zeilen in fester Reihenfolge sperren (keine Deadlocks zwischen
+        # parallelen Checkouts) → Kapazitätsprüfung und Holds sind atomar
+        events = {
+            e.id: e
+            for e in db.session.scalars(
+                select(Event)
+                .where(Event.id.in_(event_ids), Event.deleted_at.is_(None))
+                .order_by(Event.id)
+                .with_for_update()
+            )
+        }
+        missing = [event_id for event_id in event_ids if event_id not in events]
+        if missing:
+            db.session.rollback()
+            return jsonify({"error": "Event not found", "event_ids": missing}), 404
+
+        # abgesagt: Massen-Erstattung gestartet → keine neuen Buchungen
+        refunded_events = set(
+            db.session.scalars(
+                select(EventRefundRun.event_id).where(EventRefundRun.event_id.in_(event_ids))
+            )
         )
 
-    try:
-        existing = UserEvent.query.filter_by(
-            user_id=user_id,
-            event_id=event.id,
-        ).first()
-
-        if existing:
-            # Bereits bezahlte Buchung → kein Re-Booking
-            if existing.status == BookingStatus.PAID:
-                abort(409, description="Dieser User hat dieses Event bereits gebucht und bezahlt.")
-
-            # alten PaymentIntent ggf. canceln
-            if existing.stripe_payment_intent_id:
-                try:
-                    pi = stripe.PaymentIntent.retrieve(existing.stripe_payment_intent_id)
-                    if pi.status in [
-                        "requires_payment_method",
-                        "requires_confirmation",
-                        "requires_action",
-                        "processing",
-                    ]:
-                        stripe.PaymentIntent.cancel(existing.stripe_payment_intent_id)
-                        print(f"✅ Alter PaymentIntent {existing.stripe_payment_intent_id} gecancelt")
-                except stripe.error.StripeError as e:
-                    print(f"⚠️ Konnte alten PaymentIntent nicht canceln: {str(e)}")
-
-            # verknüpfte Optionen löschen
-            UserEventOption.query.filter_by(user_event_id=existing.id).delete()
-
-            existing.status = BookingStatus.PENDING
-            existing.amount_paid = None
-            existing.paid_at = None
-            existing.currency = "chf"
-            existing.stripe_payment_intent_id = None
-
-            user_event = existing
+        options_by_event = defaultdict(list)
+        for opt in EventOption.query.filter(
+            EventOption.event_id.in_(event_ids), EventOption.is_active.is_(True)
+        ):
+            options_by_event[opt.event_id].append(opt)
+
+        existing_by_event = {
+            ue.event_id: ue
+            for ue in db.session.scalars(
+                select(UserEvent)
+                .where(UserEvent.user_id == user_id, UserEvent.event_id.in_(event_ids))
+                .order_by(UserEvent.event_id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+        }
 
-        else:
-            avatar_url = fetch_clerk_user_image(user_id)
-            user_event = UserEvent(
-                user_id=user_id,
-                event_id=event.id,
-                currency="chf",
-                amount_paid=None,
-                status=BookingStatus.PENDING,
-                avatar_url=avatar_url,
+        now = datetime.utcnow()
+        errors = []
+        priced = []
+        for event_id in event_ids:
+            event = events[event_id]
+            selected_option_ids, seats, attendees = requested[event_id]
+            all_options = options_by_event[event_id]
+            existing = existing_by_event.get(event_id)
+
+            def fail(message: str, **extra):
+                errors.append({"event_id": event_id, "error": message, **extra})
+
+            if event.start_time and event.start_time <= now:
+                fail("Event already started or in the past")
+                continue
+            if event_id in refunded_events:
+                fail("Event was cancelled and is being refunded")
+                continue
+            if not all_options or not any(o.is_required for o in all_options):
+                fail("Für dieses Event sind keine Preis-Optionen (inkl. Pflicht-Gebühr) konfiguriert.")
+                continue
+            invalid_ids = set(selected_option_ids) - {opt.id for opt in all_options}
+            if invalid_ids:
+                fail(f"Ungültige selected_option_ids für dieses Event: {sorted(invalid_ids)}")
+                continue
+            if existing and existing.status == BookingStatus.PAID:
+                fail("Dieser User hat dieses Event bereits gebucht und bezahlt.")
+                continue
+            if existing and existing.checkout_id and existing.status == BookingStatus.PENDING:
+                fail("Booking is part of a pending checkout", checkout_id=existing.checkout_id)
+                continue
+            if existing and existing.status == BookingStatus.REFUND_PENDING:
+                fail("Refund for this booking is still in progress")
+                continue
+            if (
+                existing
+                and existing.status == BookingStatus.PENDING
+                and existing.stripe_payment_intent_id not in (None, *canceled_payment_intent_ids)
+            ):
+                fail("Booking was changed concurrently, please retry")
+                continue
+            if event.max_participants:
+                # PAID + laufende Holds anderer; offene Wartelisten-Angebote sind reserviert
+                taken = db.session.scalar(taken_seats_select(event_id, user_id))
+                reserved = db.session.scalar(reserved_seats_select(event_id, user_id))
+                if taken + reserved + seats > event.max_participants:
+                    fail("Event ist bereits voll.", waitlist=f"/api/events/{event_id}/waitlist")
+                    continue
+
+            seat_price_cents, charged_options = calculate_event_price(
+                all_options=all_options,
+                selected_option_ids=selected_option_ids,
             )
-            db.session.add(user_event)
-            db.session.flush()
-
-        # neue Optionen anhängen
-        for opt in charged_options:
-            ueo = UserEventOption(
-                user_event_id=user_event.id,
-                event_option_id=opt.id,
-                price_cents=opt.price_cents,
+            if seat_price_cents <= 0:
+                fail("Berechneter Preis ist 0 oder negativ. Bitte Event-Optionen prüfen.")
+                continue
+            priced.append((event_id, seats, attendees, charged_options, seat_price_cents))
+
+        if errors:
+            db.session.rollback()
+            return jsonify({"error": "Checkout nicht möglich", "items": errors}), 400
+
+        total_price_cents = sum(seat_price * seats for _, seats, _, _, seat_price in priced)
+        checkout = Checkout(user_id=user_id, amount_cents=total_price_cents, currency="chf")
+        db.session.add(checkout)
+        db.session.flush()
+
+        bookings = [
+            upsert_pending_booking(
+                db.session,
+                event_id,
+                user_id,
+                existing_by_event.get(event_id),
+                seats,
+                charged_options,
+                attendees,
+                checkout_id=checkout.id,
             )
-            db.session.add(ueo)
+            for event_id, seats, attendees, charged_options, _ in priced
+        ]
+        checkout_id = checkout.id
+        user_event_ids = [user_event.id for user_event in bookings]
+        # Holds stehen → Commit gibt die Event-Zeilen frei
+        db.session.commit()
 
-        payment_intent = stripe.PaymentIntent.create(
-            amount=total_price_cents,
-            currency=user_event.currency,
-            automatic_payment_methods={"enabled": True},
-            metadata={
-                "event_id": str(event.id),
-                "user_id": str(user_id),
-                "user_event_id": str(user_event.id),
-                "selected_option_ids": json.dumps(selected_option_ids),
-            },
-        )
+        # Stripe außerhalb des Locks
+        try:
+            payment_intent = stripe.PaymentIntent.create(
+                amount=total_price_cents,
+                currency="chf",
+                automatic_payment_methods={"enabled": True},
+                metadata={
+                    "checkout_id": str(checkout_id),
+                    "user_id": str(user_id),
+                    "event_ids": ",".join(str(event_id) for event_id in event_ids),
+                },
+                idempotency_key=stripe_idempotency_key(f"checkout-{checkout_id}"),
+            )
+        except Exception:
+            # Holds wieder freigeben
+            db.session.rollback()
+            cancel_checkout(db.session.get(Checkout, checkout_id))
+            db.session.commit()
+            raise
 
-        user_event.stripe_payment_intent_id = payment_intent.id
+        try:
+            if not attach_checkout_payment_intent(checkout_id, payment_intent.id):
+                raise BookingError(
+                    "Checkout was changed concurrently, please retry", 409, checkout_id=checkout_id
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            discard_payment_intent(payment_intent.id)
+            db.session.commit()
+            raise
 
-        db.session.commit()
+        publish_availability(*event_ids)
 
         return jsonify(
             {
-                "user_event_id": user_event.id,
-                "event_id": event.id,
+                "checkout_id": checkout_id,
                 "amount_to_pay_cents": total_price_cents,
-                "currency": user_event.currency,
+                "currency": "chf",
                 "stripe_payment_intent_id": payment_intent.id,
                 "stripe_client_secret": payment_intent.client_secret,
-                "charged_options": [
+                "items": [
                     {
-                        "id": opt.id,
-                        "type": opt.type,
-                        "label": opt.label,
-                        "price_cents": opt.price_cents,
+                        "user_event_id": user_event_id,
+                        "event_id": event_id,
+                        "seats": seats,
+                        "seat_price_cents": seat_price_cents,
+                        "amount_cents": seat_price_cents * seats,
+                        "charged_options": [
+                            {
+                                "id": opt.id,
+                                "type": opt.type,
+                                "label": opt.label,
+                                "price_cents": opt.price_cents,
+                            }
+                            for opt in charged_options
+                        ],
                     }
-                    for opt in charged_options
+                    for user_event_id, (event_id, seats, _, charged_options, seat_price_cents) in zip(
+                        user_event_ids, priced
+                    )
                 ],
             }
         ), 201
 
-    except stripe.error.StripeError as e:
+    except BookingError as e:
+        db.session.rollback()
+        return jsonify(e.body), e.status
+    except PaymentInProgressError as e:
         db.session.rollback()
         return jsonify(
             {
-                "error": str(e),
-                "type": getattr(e, "error", {}).get("type", "stripe_error"),
+                "error": "Previous payment for a booking is already being processed",
+                "stripe_payment_intent_id": e.payment_intent_id,
+                "payment_status": e.status,
             }
+        ), 409
+    except stripe.error.StripeError as e:
+        db.session.rollback()
+        body, status, headers = stripe_error_response(e)
+        return jsonify(body), status, headers
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@events_bp.route("/checkout/<int:checkout_id>", methods=["GET"])
+@clerk_auth_required
+def get_checkout(checkout_id: int):
+    """Status eines Checkouts inkl. Buchungen (nur für den eigenen User)."""
+    checkout = db.session.get(Checkout, checkout_id)
+    if not checkout or checkout.user_id != request.clerk_user_id:
+        return jsonify({"error": "Checkout not found"}), 404
+    return jsonify(_serialize_checkout(checkout, checkout.bookings)), 200
+
+
+@events_bp.route("/checkout/<int:checkout_id>/cancel", methods=["POST"])
+@clerk_auth_required
+@rate_limit(10, 60)
+@idempotent
+def cancel_checkout_route(checkout_id: int):
+    """Bricht einen noch nicht bezahlten Checkout ab (alle Buchungen → CANCELED)."""
+    checkout = db.session.get(Checkout, checkout_id)
+    if not checkout or checkout.user_id != request.clerk_user_id:
+        return jsonify({"error": "Checkout not found"}), 404
+    if checkout.status != CheckoutStatus.PENDING:
+        return jsonify(
+            {"error": f"Cannot cancel checkout in status {checkout.status.value}"}
         ), 400
+
+    try:
+        event_ids = cancel_checkout(checkout)
+        db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+    publish_availability(*event_ids)
+    return jsonify(_serialize_checkout(checkout, checkout.bookings)), 200
+
 
 # ---------------------- CANCEL WITH STATE MACHINE ----------------------
 
 
 @events_bp.route("/cancel-participation", methods=["POST"])
 @clerk_auth_required
+@rate_limit(10, 60)
+@idempotent
 def cancel_participation():
     """
     Storniert eine Buchung für den eingeloggten User per State Machine.
@@ -616,8 +1574,12 @@ def cancel_participation():
 
     Verhalten:
     - status == PENDING  → PaymentIntent ggf. canceln, status -> CANCELED (kein Refund)
-    - status == PAID     → optional Refund (cancellation_fee), status -> REFUNDED
-    - status in {CANCELED, REFUNDED, FAILED} → Fehler zurück
+    - status == PAID     → optional Refund (cancellation_fee), status -> REFUND_PENDING
+                           (REFUNDED, sobald der Refund-Job durch ist; ohne Refund sofort)
+    - status in {CANCELED, REFUND_PENDING, REFUNDED, FAILED} → Fehler zurück
+    - Event wird schon erstattet (Massen-Erstattung) → 409
+
+    Mit Header Idempotency-Key liefern Wiederholungen die gespeicherte Antwort.
     """
     if not stripe.api_key:
         return jsonify({"error": "Stripe is not configured on the server"}), 500
@@ -629,35 +1591,50 @@ def cancel_participation():
     if not event_id:
         return jsonify({"error": "Missing event_id"}), 400
 
-    user_event = UserEvent.query.filter_by(
-        user_id=user_id,
-        event_id=event_id,
-    ).first()
+    # Zeile sperren: ein parallel eintreffender Webhook (PAID) wartet bzw. wird
+    # hier gesehen, statt vom Storno überschrieben zu werden
+    user_event = db.session.scalar(
+        select(UserEvent)
+        .where(UserEvent.user_id == user_id, UserEvent.event_id == event_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
 
     if not user_event:
+        db.session.rollback()
         return jsonify({"error": "User was not registered for this event"}), 404
 
+    # Event abgesagt: die Massen-Erstattung erstattet alle Buchungen selbst
+    if event_refund_started(event_id):
+        db.session.rollback()
+        return jsonify({"error": "Event was cancelled and is being refunded"}), 409
+
     # Optional: Storno nach Eventstart verbieten
     event = Event.query.get(event_id)
     if event and event.start_time and event.start_time <= datetime.utcnow():
+        db.session.rollback()
         return jsonify({"error": "Event already started or in the past"}), 400
 
     try:
+        # Offener Checkout: gemeinsamer PaymentIntent → nur komplett abbrechbar
+        if user_event.status == BookingStatus.PENDING and user_event.checkout_id:
+            db.session.rollback()
+            return jsonify(
+                {
+                    "error": "Booking is part of a pending checkout – cancel the checkout",
+                    "checkout_id": user_event.checkout_id,
+                }
+            ), 409
+
         # Fall 1: Noch nicht bezahlt → einfach canceln
         if user_event.status == BookingStatus.PENDING or user_event.amount_paid is None:
             if user_event.stripe_payment_intent_id:
-                try:
-                    pi = stripe.PaymentIntent.retrieve(user_event.stripe_payment_intent_id)
-                    if pi.status in [
-                        "requires_payment_method",
-                        "requires_confirmation",
-                        "requires_action",
-                        "processing",
-                    ]:
-                        stripe.PaymentIntent.cancel(user_event.stripe_payment_intent_id)
-                        print(f"✅ PaymentIntent {user_event.stripe_payment_intent_id} gecancelt")
-                except stripe.error.StripeError as e:
-                    print(f"⚠️ Stripe Fehler beim Canceln des PaymentIntents: {str(e)}")
+                enqueue(
+                    "stripe.cancel_payment_intent",
+                    {"payment_intent_id": user_event.stripe_payment_intent_id},
+                )
+
+            before = booking_state(user_event)
 
             UserEventOption.query.filter_by(user_event_id=user_event.id).delete()
 
@@ -666,7 +1643,16 @@ def cancel_participation():
             user_event.paid_at = None
             user_event.stripe_payment_intent_id = None
 
+            track_booking_transition(user_event.event_id, before, booking_state(user_event))
+            # gehaltener bzw. (Legacy ohne amount_paid) bezahlter Platz frei → Warteliste rückt nach (Job)
+            if (
+                before.status in (BookingStatus.PENDING, BookingStatus.PAID)
+                and event
+                and event.max_participants
+            ):
+                schedule_promotion(user_event.event_id)
             db.session.commit()
+            publish_availability(user_event.event_id)
 
             return jsonify(
                 {
@@ -686,35 +1672,35 @@ def cancel_participation():
                 cancellation_fee = int(amount_paid * 0.1)  # z.B. 10% Fee
 
             if cancellation_fee < 0 or cancellation_fee > amount_paid:
+                db.session.rollback()
                 return jsonify({"error": "Invalid cancellation fee"}), 400
 
             refund_amount = amount_paid - cancellation_fee
 
-            if refund_amount > 0 and user_event.stripe_payment_intent_id:
-                try:
-                    stripe.Refund.create(
-                        payment_intent=user_event.stripe_payment_intent_id,
-                        amount=refund_amount,
-                    )
-                except stripe.error.StripeError as e:
-                    return jsonify(
-                        {
-                            "error": str(e),
-                            "type": getattr(e, "error", {}).get("type", "stripe_error"),
-                        }
-                    ), 400
-
             UserEventOption.query.filter_by(user_event_id=user_event.id).delete()
 
-            user_event.status = BookingStatus.REFUNDED
+            # Refund läuft über den Job-Worker (Retries + Idempotency-Key),
+            # REFUNDED erst, wenn Stripe ihn angenommen hat
+            refund_queued = refund_amount > 0 and bool(user_event.stripe_payment_intent_id)
+            if refund_queued:
+                queue_booking_refund(user_event, refund_amount)
+            else:
+                before = booking_state(user_event)
+                user_event.status = BookingStatus.REFUNDED
+                track_booking_transition(user_event.event_id, before, booking_state(user_event))
             # optional: paid_at stehen lassen oder anpassen
+            # Platz frei → Warteliste rückt nach (Job)
+            if event and event.max_participants:
+                schedule_promotion(user_event.event_id)
             db.session.commit()
+            publish_availability(user_event.event_id)
 
             return jsonify(
                 {
                     "message": "Booking canceled with refund",
                     "event_id": event_id,
                     "refund_amount": refund_amount,
+                    "refund_status": "queued" if refund_queued else "none",
                     "cancellation_fee": cancellation_fee,
                     "currency": currency,
                     "status": user_event.status.value,
@@ -722,6 +1708,7 @@ def cancel_participation():
             ), 200
 
         # Alle anderen Status
+        db.session.rollback()
         return jsonify(
             {
                 "error": f"Cannot cancel booking in status {user_event.status.value}",
@@ -733,6 +1720,137 @@ def cancel_participation():
         return jsonify({"error": str(e)}), 500
 
 
+# ---------------------- EVENT-ABSAGE: MASSEN-ERSTATTUNG ----------------------
+
+
+@events_bp.route("/<int:event_id>/refund-all", methods=["POST"])
+@clerk_auth_required
+@admin_required
+@rate_limit(10, 60)
+@idempotent
+def refund_all_participants(event_id: int):
+    """
+    Erstattet alle PAID-Buchungen eines abgesagten Events im Hintergrund
+    (nur Admins, ADMIN_USER_IDS; sonst `flask refunds event`). Ab dem ersten
+    Lauf nimmt das Event keine Buchungen mehr an. Antwortet sofort mit dem Lauf, Fortschritt unter
+    GET /<id>/refund-runs/<run_id>. Ein erneuter Aufruf setzt einen offenen
+    Lauf fort.
+
+    Optional JSON: {"concurrency": 8, "batch_size": 200}
+    """
+    if not stripe.api_key:
+        return jsonify({"error": "Stripe is not configured on the server"}), 500
+
+    if not get_live_event(event_id):
+        abort(404)
+
+    data = request.get_json(silent=True) or {}
+    try:
+        concurrency = int(data.get("concurrency", DEFAULT_REFUND_CONCURRENCY))
+        batch_size = int(data.get("batch_size", DEFAULT_REFUND_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'concurrency' und 'batch_size' müssen Zahlen sein"}), 400
+
+    try:
+        run = start_event_refund(event_id, concurrency=concurrency, batch_size=batch_size)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(serialize_refund_run(run)), 202
+
+
+@events_bp.route("/<int:event_id>/refund-runs/<int:run_id>", methods=["GET"])
+@clerk_auth_required
+@admin_required
+def get_refund_run(event_id: int, run_id: int):
+    """Fortschritt einer Massen-Erstattung."""
+    run = db.session.get(EventRefundRun, run_id)
+    if not run or run.event_id != event_id:
+        abort(404)
+    return jsonify(serialize_refund_run(run)), 200
+
+
+# ---------------------- WAITLIST ----------------------
+
+
+def _serialize_waitlist_entry(entry) -> dict:
+    return {
+        "event_id": entry.event_id,
+        "status": entry.status.value,
+        "position": waitlist_position(entry),
+        "joined_at": entry.created_at.isoformat(),
+        "offer_expires_at": entry.offer_expires_at.isoformat()
+        if entry.offer_expires_at
+        else None,
+    }
+
+
+@events_bp.route("/<int:event_id>/waitlist", methods=["GET"])
+@clerk_auth_required
+def get_waitlist_status(event_id: int):
+    """
+    Eigener Wartelisten-Status. Bei status == "offered" ist bis offer_expires_at
+    ein Platz reserviert → normal über /book buchen.
+    """
+    entry = get_waitlist_entry(event_id, request.clerk_user_id)
+    if not entry:
+        return jsonify({"error": "Not on the waitlist for this event"}), 404
+    return jsonify(_serialize_waitlist_entry(entry)), 200
+
+
+@events_bp.route("/<int:event_id>/waitlist", methods=["POST"])
+@clerk_auth_required
+@rate_limit(10, 60)
+def join_event_waitlist(event_id: int):
+    """Trägt den User auf die Warteliste ein (nur wenn das Event voll ist)."""
+    user_id = request.clerk_user_id
+
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+    if event.start_time and event.start_time <= datetime.utcnow():
+        return jsonify({"error": "Event already started or in the past"}), 400
+
+    already_paid = UserEvent.query.filter_by(
+        user_id=user_id, event_id=event_id, status=BookingStatus.PAID
+    ).first()
+    if already_paid:
+        return jsonify({"error": "User has already booked this event"}), 409
+
+    if not event.max_participants:
+        return jsonify({"error": "Event has no participant limit"}), 400
+    if event_refund_started(event_id):
+        return jsonify({"error": "Event was cancelled and is being refunded"}), 409
+
+    taken = db.session.scalar(taken_seats_select(event_id, user_id))
+    if taken + open_offer_count(event_id) < event.max_participants:
+        return jsonify({"error": "Event still has free spots – book directly"}), 400
+
+    try:
+        entry = join_waitlist(event_id, user_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(_serialize_waitlist_entry(entry)), 201
+
+
+@events_bp.route("/<int:event_id>/waitlist", methods=["DELETE"])
+@clerk_auth_required
+def leave_event_waitlist(event_id: int):
+    """Verlässt die Warteliste; ein offenes Angebot geht an den Nächsten."""
+    entry = get_waitlist_entry(event_id, request.clerk_user_id)
+    if not entry or entry.status not in (WaitlistStatus.WAITING, WaitlistStatus.OFFERED):
+        return jsonify({"error": "Not on the waitlist for this event"}), 404
+
+    leave_waitlist(entry)
+    db.session.commit()
+    return jsonify({"message": "Left the waitlist", "event_id": event_id}), 200
+
+
 # ---------------------- CREATE & UPDATE EVENT ----------------------
 
 
@@ -779,7 +1897,7 @@ def create_event():
 @events_bp.route("/<int:event_id>", methods=["PUT"])
 def update_event(event_id: int):
     """Aktualisiert ein bestehendes Event"""
-    event = db.session.get(Event, event_id)
+    event = get_live_event(event_id)
     if not event:
         abort(404)
 
@@ -813,6 +1931,8 @@ def update_event(event_id: int):
             event.is_online = bool(data["is_online"])
 
         db.session.commit()
+        if "max_participants" in data:
+            publish_availability(event.id)
         return jsonify(_serialize_event(event)), 200
     except ValueError as e:
         db.session.rollback()
@@ -824,13 +1944,16 @@ def update_event(event_id: int):
 
 @events_bp.route("/<int:event_id>", methods=["DELETE"])
 def delete_event(event_id: int):
-    """Löscht ein Event"""
-    event = db.session.get(Event, event_id)
+    """
+    Löscht ein Event: sofort unsichtbar (Soft-Delete + Tombstone), die
+    abhängigen Zeilen räumt der Job "event.purge" im Hintergrund ab.
+    """
+    event = get_live_event(event_id)
     if not event:
         abort(404)
 
     try:
-        db.session.delete(event)
+        soft_delete_event(event)
         db.session.commit()
         return "", 204
     except Exception as e:
@@ -843,6 +1966,7 @@ def delete_event(event_id: int):
 
 @events_bp.route("/<int:event_id>/participate", methods=["POST"])
 @clerk_auth_required
+@rate_limit(10, 60)
 def participate_in_event(event_id: int):
     """
     Legacy-Endpoint: registriert den User ohne Payment-Flow.
@@ -850,33 +1974,40 @@ def participate_in_event(event_id: int):
     """
     user_id = request.clerk_user_id
 
-    event = db.session.get(Event, event_id)
+    # Event-Zeile sperren wie /book → Kapazitätsprüfung und Eintrag sind atomar
+    event = db.session.scalar(
+        select(Event).where(Event.id == event_id, Event.deleted_at.is_(None)).with_for_update()
+    )
     if not event:
+        db.session.rollback()
         abort(404)
 
     existing = UserEvent.query.filter_by(user_id=user_id, event_id=event.id).first()
     if existing:
+        db.session.rollback()
         return jsonify({"error": "Already registered"}), 409
 
+    # gleiche Kapazität wie /book: Plätze (seats) inkl. laufender Holds + offene Angebote
     if event.max_participants:
-        current_count = UserEvent.query.filter_by(
-            event_id=event.id, status=BookingStatus.PAID
-        ).count()
-        if current_count >= event.max_participants:
+        taken = db.session.scalar(taken_seats_select(event.id, user_id))
+        reserved = db.session.scalar(reserved_seats_select(event.id, user_id))
+        if taken + reserved + 1 > event.max_participants:
+            db.session.rollback()
             return jsonify({"error": "Event is full"}), 400
 
-    avatar_url = fetch_clerk_user_image(user_id)
-
     user_event = UserEvent(
         user_id=user_id,
         event_id=event.id,
-        avatar_url=avatar_url,
         status=BookingStatus.PAID,  # ohne Payment direkt als bezahlt markieren
     )
     db.session.add(user_event)
 
     try:
+        db.session.flush()
+        track_booking_transition(event.id, None, booking_state(user_event))
+        enqueue("clerk.fetch_avatar", {"user_event_id": user_event.id, "user_id": user_id})
         db.session.commit()
+        publish_availability(event.id)
         return jsonify(
             {
                 "message": "Successfully registered (legacy)",
@@ -904,8 +2035,17 @@ def leave_event(event_id: int):
         return jsonify({"error": "Not registered for this event"}), 404
 
     try:
+        before = booking_state(user_event)
+        record_deletion(
+            "user_event", user_event.id, event_id=user_event.event_id, user_id=user_id
+        )
         db.session.delete(user_event)
+        # nach dem Delete, damit die Teilnehmer-Vorschau ohne diese Buchung neu gebaut wird
+        track_booking_transition(event_id, before, None)
+        if before.status == BookingStatus.PAID:
+            schedule_promotion(event_id)
         db.session.commit()
+        publish_availability(event_id)
         return jsonify({"message": "Successfully left the event (legacy)"}), 200
     except Exception as e:
         db.session.rollback()
@@ -917,6 +2057,7 @@ def leave_event(event_id: int):
 
 @events_bp.route("/<int:event_id>/payment-intent", methods=["POST"])
 @clerk_auth_required
+@rate_limit(10, 60)
 def create_payment_intent(event_id: int):
     """Erstellt einen Stripe PaymentIntent für ein Event (TEST)"""
     if not stripe.api_key:
@@ -928,7 +2069,7 @@ def create_payment_intent(event_id: int):
     if not event_id:
         return jsonify({"error": "Missing event_id"}), 400
 
-    event = db.session.get(Event, event_id)
+    event = get_live_event(event_id)
     if not event:
         return jsonify({"error": "Event not found"}), 404
 
@@ -956,12 +2097,8 @@ def create_payment_intent(event_id: int):
         ), 200
 
     except stripe.error.StripeError as e:
-        return jsonify(
-            {
-                "error": str(e),
-                "type": getattr(e, "error", {}).get("type", "stripe_error"),
-            }
-        ), 400
+        body, status, headers = stripe_error_response(e)
+        return jsonify(body), status, headers
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -972,32 +2109,84 @@ def create_payment_intent(event_id: int):
 @events_bp.route("/<int:event_id>/media", methods=["GET"])
 def list_event_media(event_id: int):
     """Gibt alle Media-Items eines Events zurück"""
-    event = db.session.get(Event, event_id)
+    event = get_live_event(event_id)
     if not event:
         abort(404)
 
-    return jsonify([_serialize_media(m) for m in event.media_items])
+    variant, fields = _media_selection_from_request()
+    return jsonify([_serialize_media(m, variant, fields) for m in event.media_items])
 
 
-@events_bp.route("/<int:event_id>/media/sas-upload", methods=["POST"])
-def get_media_upload_sas(event_id: int):
-    """Generiert eine SAS-URL zum Upload eines Media-Files"""
-    event = db.session.get(Event, event_id)
-    if not event:
-        abort(404)
+MAX_MEDIA_BATCH = 100
 
-    data = request.get_json(force=True) or {}
+
+def _media_upload_target(event_id: int, data: dict) -> tuple[str, str]:
+    """
+    Prüft eine Upload-Anfrage und erzeugt (blob_name, content_type).
+    Wirft ValueError bei ungültigem Media-Typ oder wenn data kein Objekt ist.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Upload-Eintrag muss ein Objekt sein")
     ext = (data.get("ext") or "").lstrip(".").lower()
     media_type = data.get("type") or "image"
 
     if media_type not in [t.value for t in MediaType]:
-        return jsonify({"error": "invalid media type"}), 400
+        raise ValueError("invalid media type")
 
     content_type = data.get("contentType") or mimetypes.types_map.get(
         f".{ext}", "application/octet-stream"
     )
     now = datetime.utcnow()
     blob_name = f"events/{now:%Y/%m}/{event_id}/{uuid.uuid4()}.{ext or 'bin'}"
+    return blob_name, content_type
+
+
+def _media_from_payload(event_id: int, data: dict) -> EventMedia:
+    """
+    Baut ein EventMedia aus dem Request-Payload (ohne es der Session hinzuzufügen).
+    Wirft ValueError bei fehlenden Feldern, ungültigem Media-Typ oder wenn
+    data kein Objekt ist.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Media-Eintrag muss ein Objekt sein")
+    for field in ("type", "mime", "blobName"):
+        if field not in data:
+            raise ValueError(f"missing field: {field}")
+
+    try:
+        media_type = MediaType(data["type"])
+    except ValueError:
+        raise ValueError(f"invalid media type: {data.get('type')}")
+
+    return EventMedia(
+        event_id=event_id,
+        type=media_type,
+        mime=data["mime"],
+        blob_name=data["blobName"],
+        poster_blob=data.get("posterBlob"),
+        variants_json=data.get("variants"),
+        width=data.get("width"),
+        height=data.get("height"),
+        duration_secs=data.get("durationSecs"),
+        size_bytes=data.get("sizeBytes"),
+        sort_order=data.get("sortOrder", 0),
+    )
+
+
+@events_bp.route("/<int:event_id>/media/sas-upload", methods=["POST"])
+def get_media_upload_sas(event_id: int):
+    """Generiert eine SAS-URL zum Upload eines Media-Files"""
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+
+    data = request.get_json(force=True) or {}
+
+    try:
+        blob_name, content_type = _media_upload_target(event_id, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     upload_url = make_write_sas(blob_name, content_type=content_type)
 
     return jsonify(
@@ -1005,47 +2194,111 @@ def get_media_upload_sas(event_id: int):
     )
 
 
+@events_bp.route("/<int:event_id>/media/sas-upload/batch", methods=["POST"])
+def get_media_upload_sas_batch(event_id: int):
+    """
+    Generiert SAS-URLs für mehrere Uploads in einem Request (z.B. Galerie).
+
+    Erwartet JSON:
+    {
+      "files": [
+        {"ext": "jpg", "type": "image", "contentType": "image/jpeg"},
+        ...
+      ]
+    }
+    """
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+
+    data = request.get_json(force=True) or {}
+    files = data.get("files") if isinstance(data, dict) else None
+
+    if not isinstance(files, list) or not files:
+        return jsonify({"error": "'files' muss ein nicht-leeres Array sein"}), 400
+    if len(files) > MAX_MEDIA_BATCH:
+        return jsonify({"error": f"maximal {MAX_MEDIA_BATCH} Dateien pro Batch"}), 400
+
+    try:
+        targets = [_media_upload_target(event_id, f) for f in files]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    upload_urls = make_write_sas_batch(targets)
+
+    return jsonify(
+        {
+            "uploads": [
+                {"uploadUrl": url, "blobName": blob_name, "contentType": content_type}
+                for url, (blob_name, content_type) in zip(upload_urls, targets)
+            ]
+        }
+    )
+
+
 @events_bp.route("/<int:event_id>/media", methods=["POST"])
 def attach_media_after_upload(event_id: int):
     """Verknüpft ein hochgeladenes Media-File mit einem Event"""
     data = request.get_json(force=True) or {}
 
-    for field in ("type", "mime", "blobName"):
-        if field not in data:
-            return jsonify({"error": f"missing field: {field}"}), 400
-
     try:
-        media_type = MediaType(data["type"])
-    except ValueError:
-        return jsonify({"error": f"invalid media type: {data.get('type')}"}), 400
+        media = _media_from_payload(event_id, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    event = db.session.get(Event, event_id)
+    event = get_live_event(event_id)
     if not event:
         abort(404)
 
     try:
-        media = EventMedia(
-            event_id=event_id,
-            type=media_type,
-            mime=data["mime"],
-            blob_name=data["blobName"],
-            poster_blob=data.get("posterBlob"),
-            variants_json=data.get("variants"),
-            width=data.get("width"),
-            height=data.get("height"),
-            duration_secs=data.get("durationSecs"),
-            size_bytes=data.get("sizeBytes"),
-            sort_order=data.get("sortOrder", 0),
-        )
         db.session.add(media)
         db.session.commit()
 
+        enqueue_media_processing(current_app._get_current_object(), [media])
+
         return jsonify(_serialize_media(media)), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
 
+@events_bp.route("/<int:event_id>/media/batch", methods=["POST"])
+def attach_media_after_upload_batch(event_id: int):
+    """
+    Verknüpft mehrere hochgeladene Media-Files in EINER Transaktion mit einem Event.
+
+    Erwartet JSON: {"items": [<Payload wie bei POST /media>, ...]}
+    Entweder werden alle Items angelegt oder keines.
+    """
+    data = request.get_json(force=True) or {}
+    items = data.get("items") if isinstance(data, dict) else None
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'items' muss ein nicht-leeres Array sein"}), 400
+    if len(items) > MAX_MEDIA_BATCH:
+        return jsonify({"error": f"maximal {MAX_MEDIA_BATCH} Items pro Batch"}), 400
+
+    try:
+        media_items = [_media_from_payload(event_id, item) for item in items]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+
+    try:
+        db.session.add_all(media_items)
+        db.session.commit()
+
+        enqueue_media_processing(current_app._get_current_object(), media_items)
+
+        return jsonify([_serialize_media(m) for m in media_items]), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+
 @events_bp.route("/media/<int:media_id>", methods=["DELETE"])
 def delete_media(media_id: int):
     """Löscht ein Media-Item"""
@@ -1054,6 +2307,7 @@ def delete_media(media_id: int):
         abort(404)
 
     try:
+        record_deletion("event_media", media.id, event_id=media.event_id)
         db.session.delete(media)
         db.session.commit()
         return "", 204
@@ -1062,6 +2316,62 @@ def delete_media(media_id: int):
         return jsonify({"error": str(e)}), 400
 
 
+@events_bp.route("/<int:event_id>/media/order", methods=["PUT"])
+def reorder_media(event_id: int):
+    """
+    Setzt die Reihenfolge der ganzen Galerie in EINEM UPDATE-Statement.
+
+    Erwartet JSON: {"mediaIds": [12, 7, 9, ...]}  (alle Media-IDs des Events)
+    sortOrder = Position in der Liste. Gibt die sortierte Galerie zurück.
+    """
+    event = get_live_event(event_id)
+    if not event:
+        abort(404)
+
+    data = request.get_json(force=True) or {}
+    media_ids = data.get("mediaIds")
+
+    if not isinstance(media_ids, list) or not all(
+        isinstance(m, int) for m in media_ids
+    ):
+        return jsonify({"error": "'mediaIds' muss eine Liste von IDs sein"}), 400
+    if len(set(media_ids)) != len(media_ids):
+        return jsonify({"error": "'mediaIds' enthält Duplikate"}), 400
+
+    existing_ids = {
+        mid for (mid,) in db.session.query(EventMedia.id).filter_by(event_id=event_id)
+    }
+    if set(media_ids) != existing_ids:
+        return jsonify(
+            {
+                "error": "'mediaIds' muss genau alle Media-IDs des Events enthalten",
+                "unknown": sorted(set(media_ids) - existing_ids),
+                "missing": sorted(existing_ids - set(media_ids)),
+            }
+        ), 400
+
+    try:
+        if media_ids:
+            db.session.execute(
+                update(EventMedia)
+                .where(EventMedia.event_id == event_id, EventMedia.id.in_(media_ids))
+                .values(
+                    sort_order=case(
+                        {mid: pos for pos, mid in enumerate(media_ids)},
+                        value=EventMedia.id,
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    variant, fields = _media_selection_from_request()
+    return jsonify([_serialize_media(m, variant, fields) for m in event.media_items]), 200
+
+
 @events_bp.route("/<int:event_id>/media/<int:media_id>", methods=["PUT"])
 def update_media(event_id: int, media_id: int):
     """Aktualisiert ein Media-Item (z.B. sortOrder)"""
@@ -0,0 +1,311 @@
+# app/routes/events_async.py
+"""
+Async-Variante der meistgenutzten Event-Endpoints (ASYNC_API_ENABLED=true,
+gemountet unter /api/async/events). Gleiche Antworten wie events_bp, aber:
+
+- DB-Zugriffe über SQLAlchemy asyncio + asyncpg (app/services/async_db.py)
+- Stripe- und Clerk-Calls über httpx, unabhängige Calls parallel per asyncio.gather
+  (Buchung: neuer PaymentIntent und Clerk-Avatar gleichzeitig statt über die
+  Job-Queue; die State Machine selbst teilt sie mit dem sync Pfad)
+
+Flask führt async Views in einem eigenen Event-Loop pro Request aus – ein
+Worker-Thread bleibt also pro Request belegt. Der Gewinn liegt in der
+Überlappung der I/O-Wartezeiten innerhalb eines Requests.
+"""
+import asyncio
+import os
+from typing import Dict, List
+
+import httpx
+import stripe
+from flask import Blueprint, abort, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.models.event import Event
+from app.models.user_event import UserEvent, BookingStatus
+from app.routes.events import (
+    _apply_time_window,
+    _group_booking_from_request,
+    _listing_cost,
+    _media_selection_from_request,
+    _serialize_event,
+    _time_window_from_request,
+)
+from app.services.async_db import async_session
+from app.services.availability import publish_availability
+from app.services.clerk import fetch_clerk_user_image_async
+from app.services.outbound import httpx_timeout, stripe_error_response, stripe_httpx_client
+from app.services.booking import (
+    BookingError,
+    attach_payment_intent,
+    pending_payment_intent,
+    prepare_booking,
+    release_booking_hold,
+)
+from app.services.jobs import enqueue
+from app.services.payments import (
+    PaymentInProgressError,
+    cancel_open_payment_intent_async,
+    discard_payment_intent_async,
+)
+from app.services.read_models import (
+    ParticipantPreview,
+    build_participant_previews,
+    participant_previews_select,
+)
+from app.utils.auth import clerk_auth_required
+from app.utils.idempotency import idempotent, stripe_idempotency_key
+from app.utils.rate_limit import rate_limit
+
+events_async_bp = Blueprint("events_async", __name__)
+
+ACTIVE_STATUSES = [BookingStatus.PENDING, BookingStatus.PAID]
+
+
+# ---------------------- HELPER FUNCTIONS ----------------------
+
+
+def _stripe_client(http_client: stripe.HTTPXClient) -> stripe.StripeClient:
+    """
+    StripeClient mit eigenem httpx-Client pro Request: Stripes globaler
+    Async-Client hängt an dem Loop, in dem er erstellt wurde.
+    """
+    base_addresses = {}
+    if os.getenv("STRIPE_API_BASE"):
+        base_addresses["api"] = os.getenv("STRIPE_API_BASE")
+    return stripe.StripeClient(
+        stripe.api_key,
+        http_client=http_client,
+        base_addresses=base_addresses,
+    )
+
+
+async def _participant_previews(session, event_ids: List[int]) -> Dict[int, ParticipantPreview]:
+    """Anzahl + Vorschau aus event_stats für alle Events in EINER Query (wie der sync Pfad)."""
+    if not event_ids:
+        return {}
+    rows = (await session.execute(participant_previews_select(event_ids))).all()
+    return build_participant_previews(event_ids, rows)
+
+
+async def _list_events(registered: bool):
+    user_id = request.clerk_user_id
+    include_media = request.args.get("include_media", "false").lower() == "true"
+    include_participants = (
+        request.args.get("include_participants", "false").lower() == "true"
+    )
+    media_variant, media_fields = _media_selection_from_request()
+
+    try:
+        start_from, start_to = _time_window_from_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    booked = select(UserEvent.event_id).where(
+        UserEvent.user_id == user_id,
+        UserEvent.status.in_(ACTIVE_STATUSES),
+    )
+    condition = Event.id.in_(booked) if registered else ~Event.id.in_(booked)
+
+    stmt = _apply_time_window(
+        select(Event).where(condition, Event.deleted_at.is_(None)), start_from, start_to
+    )
+    stmt = stmt.order_by(Event.start_time.asc(), Event.id.asc())
+    if include_media:
+        stmt = stmt.options(selectinload(Event.media_items))
+
+    async with async_session() as session:
+        events = (await session.scalars(stmt)).all()
+        participants = (
+            await _participant_previews(session, [e.id for e in events])
+            if include_participants
+            else {}
+        )
+
+    payload = [
+        _serialize_event(
+            e,
+            include_media,
+            include_participants,
+            media_variant,
+            media_fields,
+            participants=participants.get(e.id),
+        )
+        for e in events
+    ]
+    return jsonify(payload)
+
+
+# ---------------------- EVENT LISTINGS ----------------------
+
+
+@events_async_bp.route("/", methods=["GET"])
+@clerk_auth_required
+@rate_limit(120, 60, scope="events.get_unregistered_events", cost=_listing_cost)
+async def get_unregistered_events():
+    """Async-Variante von GET /api/events/ (Events ohne aktive Buchung des Users)."""
+    return await _list_events(registered=False)
+
+
+@events_async_bp.route("/my-events", methods=["GET"])
+@clerk_auth_required
+@rate_limit(120, 60, scope="events.get_registered_events", cost=_listing_cost)
+async def get_registered_events():
+    """Async-Variante von GET /api/events/my-events (Events mit aktiver Buchung)."""
+    return await _list_events(registered=True)
+
+
+# ---------------------- EVENT DETAIL ----------------------
+
+
+@events_async_bp.route("/<int:event_id>", methods=["GET"])
+async def get_event_detail(event_id: int):
+    """
+    Async-Variante von GET /api/events/<id> inkl. Media und Teilnehmern
+    (Anzahl + Vorschau, komplette Liste unter /api/events/<id>/participants).
+    """
+    media_variant, media_fields = _media_selection_from_request()
+
+    async with async_session() as session:
+        # soft-gelöschte Events sind weg, auch wenn der Purge noch läuft (wie get_live_event)
+        event = await session.scalar(
+            select(Event)
+            .where(Event.id == event_id, Event.deleted_at.is_(None))
+            .options(selectinload(Event.media_items))
+        )
+        if not event:
+            abort(404)
+        participants = await _participant_previews(session, [event.id])
+
+    return jsonify(
+        _serialize_event(
+            event,
+            include_media=True,
+            include_participants=True,
+            media_variant=media_variant,
+            media_fields=media_fields,
+            participants=participants[event.id],
+        )
+    )
+
+
+# ---------------------- CREATE BOOKING WITH OPTIONS + STRIPE ----------------------
+
+
+@events_async_bp.route("/<int:event_id>/book", methods=["POST"])
+@clerk_auth_required
+@rate_limit(10, 60, scope="events.book_event")
+@idempotent
+async def book_event(event_id: int):
+    """
+    Async-Variante von POST /api/events/<id>/book: dieselbe State Machine
+    (app/services/booking.py, per AsyncSession.run_sync), gleiche Antworten.
+    Der alte PaymentIntent wird vorher gecancelt (nie parallel zum neuen),
+    danach laufen – ohne Event-Lock, der Hold hält die Plätze – neuer
+    PaymentIntent und Clerk-Avatar parallel; scheitert der Avatar, übernimmt
+    die Job-Queue.
+    """
+    if not stripe.api_key:
+        return jsonify({"error": "Stripe is not configured on the server"}), 500
+
+    user_id = request.clerk_user_id
+    data = request.get_json(silent=True) or {}
+    selected_option_ids = data.get("selected_option_ids", [])
+
+    if not isinstance(selected_option_ids, list):
+        return jsonify({"error": "'selected_option_ids' muss eine Liste von IDs sein."}), 400
+
+    try:
+        seats, attendees = _group_booking_from_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stripe_http = stripe_httpx_client()
+    stripe_client = _stripe_client(stripe_http)
+    try:
+        async with async_session() as session:
+            try:
+                old_payment_intent_id = await session.run_sync(
+                    pending_payment_intent, event_id, user_id
+                )
+                if old_payment_intent_id:
+                    # BEVOR es einen neuen gibt → nie zwei bezahlbare PaymentIntents
+                    await cancel_open_payment_intent_async(stripe_client, old_payment_intent_id)
+
+                # sperrt die Event-Zeile; der Commit gibt sie frei, der Hold hält die Plätze
+                booking = await session.run_sync(
+                    prepare_booking,
+                    event_id,
+                    user_id,
+                    selected_option_ids,
+                    seats,
+                    attendees,
+                    old_payment_intent_id,
+                    False,  # Avatar holt dieser Request selbst
+                )
+                await session.commit()
+
+                # Stripe außerhalb des Locks
+                async with httpx.AsyncClient(timeout=httpx_timeout("clerk")) as http:
+                    create_pi = stripe_client.v1.payment_intents.create_async(
+                        params=booking.payment_intent_params(),
+                        options={"idempotency_key": stripe_idempotency_key(f"book-{event_id}-{booking.attempt}")},
+                    )
+                    # Avatar nur bei neuen Buchungen (wie im sync Pfad)
+                    fetch_avatar = (
+                        fetch_clerk_user_image_async(user_id, http)
+                        if booking.is_new
+                        else asyncio.sleep(0)
+                    )
+                    payment_intent, avatar_url = await asyncio.gather(
+                        create_pi, fetch_avatar, return_exceptions=True
+                    )
+                if isinstance(payment_intent, BaseException):
+                    await session.run_sync(release_booking_hold, booking)
+                    await session.commit()
+                    raise payment_intent
+
+                avatar_url = avatar_url if isinstance(avatar_url, str) else None
+                try:
+                    await session.run_sync(
+                        attach_payment_intent, booking, payment_intent.id, avatar_url
+                    )
+                    if booking.is_new and not avatar_url:
+                        enqueue(
+                            "clerk.fetch_avatar",
+                            {"user_event_id": booking.user_event_id, "user_id": user_id},
+                            session=session,
+                        )
+                    await session.commit()
+                except Exception:
+                    # Buchung inzwischen neu aufgesetzt → dieser PaymentIntent darf nicht offen bleiben
+                    await session.rollback()
+                    await discard_payment_intent_async(stripe_client, payment_intent.id, session)
+                    await session.commit()
+                    raise
+
+            except BookingError as e:
+                await session.rollback()
+                return jsonify(e.body), e.status
+            except PaymentInProgressError as e:
+                await session.rollback()
+                return jsonify(
+                    {
+                        "error": "Previous payment for this booking is already being processed",
+                        "stripe_payment_intent_id": e.payment_intent_id,
+                        "payment_status": e.status,
+                    }
+                ), 409
+            except stripe.error.StripeError as e:
+                await session.rollback()
+                body, status, headers = stripe_error_response(e)
+                return jsonify(body), status, headers
+            except Exception as e:
+                await session.rollback()
+                return jsonify({"error": str(e)}), 500
+    finally:
+        await stripe_http.close_async()
+
+    publish_availability(event_id)
+    return jsonify(booking.response(payment_intent)), 201
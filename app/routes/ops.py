@@ -0,0 +1,41 @@
+# app/routes/ops.py
+"""
+Betriebs-Endpoints (ohne /api-Präfix, nicht hinter Auth – liefern keine Nutzerdaten).
+
+GET /healthz → Liveness: der Prozess antwortet (keine Abhängigkeiten geprüft)
+GET /readyz  → Readiness: 503 bis der Warmup durch ist (app/services/warmup.py)
+               bzw. solange die DB nicht erreichbar ist
+GET /ops/dependencies → Zustand der Circuit Breaker + Latenz/Fehler-Metriken
+für Clerk, Stripe und Azure (siehe app/services/outbound.py). Die Zahlen
+gelten pro Worker-Prozess.
+"""
+from flask import Blueprint, jsonify
+from sqlalchemy import text
+
+from app.extensions import db
+from app.services.outbound import dependencies_snapshot
+from app.services.warmup import is_ready, warmup_report
+
+ops_bp = Blueprint("ops", __name__)
+
+
+@ops_bp.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+
+@ops_bp.route("/readyz", methods=["GET"])
+def readyz():
+    if not is_ready():
+        return jsonify({"status": "warming_up", "warmup": warmup_report()}), 503
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "db_unavailable", "error": str(e)[:300]}), 503
+    return jsonify({"status": "ready", "warmup": warmup_report()}), 200
+
+
+@ops_bp.route("/ops/dependencies", methods=["GET"])
+def get_dependencies():
+    return jsonify({"dependencies": dependencies_snapshot()}), 200
@@ -4,10 +4,18 @@ import json
 import stripe
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from sqlalchemy import select
 
 from app import db
 from app.models.user_event import UserEvent, BookingStatus
 from app.models.event import Event
+from app.services.event_stats import booking_state, track_booking_transition
+from app.services.availability import publish_availability
+from app.services.booking import lock_booking, seat_lost
+from app.services.bulk_refund import refund_late_payment
+from app.services.checkout import checkout_accepts_payment, fail_checkout, settle_checkout
+from app.services.payments import queue_booking_refund, refund_orphaned_payment
+from app.services.waitlist import claim_offer, schedule_promotion
 
 webhook_bp = Blueprint("webhook_bp", __name__)
 
@@ -15,6 +23,16 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
 
+def _locked_booking(user_event_id) -> UserEvent | None:
+    """Buchung mit FOR UPDATE (frisch aus der DB, nicht aus der Identity-Map)."""
+    return db.session.scalar(
+        select(UserEvent)
+        .where(UserEvent.id == int(user_event_id))
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
 @webhook_bp.route("/stripe", methods=["POST"])
 def stripe_webhook():
     """
@@ -52,24 +70,74 @@ def stripe_webhook():
         metadata = data_object.get("metadata", {}) or {}
         user_event_id = metadata.get("user_event_id")
 
+        # Warenkorb: alle Buchungen des Checkouts in einer Transaktion
+        if metadata.get("checkout_id"):
+            checkout_id = int(metadata["checkout_id"])
+            # Checkout abgebrochen / fehlgeschlagen / anderer PaymentIntent → erstatten
+            if not checkout_accepts_payment(checkout_id, payment_intent_id):
+                refund_orphaned_payment(payment_intent_id)
+                db.session.commit()
+                print(f"↩️ Zahlung {payment_intent_id} passt zu keinem offenen Checkout → Refund")
+                return jsonify({"status": "refunded"}), 200
+
+            event_ids = settle_checkout(checkout_id, data_object.get("currency", "chf"))
+            db.session.commit()
+            if event_ids:
+                publish_availability(*event_ids)
+            print(f"💚 Checkout {checkout_id} bezahlt ({len(event_ids)} Buchungen)")
+            return jsonify({"status": "updated"}), 200
+
         if not user_event_id:
             print("⚠️ Kein user_event_id in metadata — breche ab.")
             return jsonify({"status": "ignored"}), 200
 
-        user_event = UserEvent.query.get(user_event_id)
-        if not user_event:
-            print(f"⚠️ UserEvent {user_event_id} nicht gefunden")
-            return jsonify({"status": "ignored"}), 200
+        # Zeile sperren (Event zuerst, wie /book): parallel zugestellte Duplikate
+        # laufen nacheinander und das zweite sieht den bereits verbuchten Status
+        user_event = lock_booking(db.session, UserEvent.id == int(user_event_id))
+        matches = (
+            user_event is not None
+            and user_event.stripe_payment_intent_id == payment_intent_id
+        )
+        if matches and user_event.status in (
+            BookingStatus.PAID,
+            BookingStatus.REFUND_PENDING,
+            BookingStatus.REFUNDED,
+        ):
+            db.session.commit()
+            return jsonify({"status": "already_processed"}), 200
+
+        # Nur die offene (bzw. gerade fehlgeschlagene) Buchung mit genau diesem
+        # PaymentIntent wird bezahlt. Storniert, neu gebucht oder unbekannt →
+        # Zahlung komplett erstatten, Buchung nicht anfassen.
+        if not matches or user_event.status not in (BookingStatus.PENDING, BookingStatus.FAILED):
+            refund_orphaned_payment(payment_intent_id)
+            db.session.commit()
+            print(f"↩️ Zahlung {payment_intent_id} passt zu keiner offenen Buchung → Refund")
+            return jsonify({"status": "refunded"}), 200
 
         amount = data_object.get("amount_received")
         currency = data_object.get("currency", "chf")
 
+        # Hold abgelaufen (oder FAILED) und Platz inzwischen vergeben → erstatten
+        lost = seat_lost(db.session, user_event)
+        before = booking_state(user_event)
+
         user_event.status = BookingStatus.PAID
         user_event.amount_paid = amount
         user_event.currency = currency
         user_event.paid_at = datetime.utcnow()
 
+        track_booking_transition(user_event.event_id, before, booking_state(user_event))
+        if lost:
+            queue_booking_refund(user_event, amount)
+            print(f"↩️ Buchung {user_event_id}: Hold abgelaufen, Platz vergeben → Refund")
+        else:
+            # Platz über die Warteliste bekommen → Angebot eingelöst
+            claim_offer(user_event.event_id, user_event.user_id)
+            # Event inzwischen abgesagt (Hold von vor der Massen-Erstattung) → sofort erstatten
+            refund_late_payment(user_event)
         db.session.commit()
+        publish_availability(user_event.event_id)
 
         print(f"💚 Buchung {user_event_id} erfolgreich bezahlt ({amount} {currency})")
         return jsonify({"status": "updated"}), 200
@@ -82,10 +150,29 @@ def stripe_webhook():
         metadata = data_object.get("metadata", {}) or {}
         user_event_id = metadata.get("user_event_id")
 
-        user_event = UserEvent.query.get(user_event_id) if user_event_id else None
-        if user_event:
+        if metadata.get("checkout_id"):
+            event_ids = fail_checkout(int(metadata["checkout_id"]))
+            db.session.commit()
+            if event_ids:
+                publish_availability(*event_ids)
+            print(f"❌ Zahlung fehlgeschlagen für Checkout {metadata['checkout_id']}")
+            return jsonify({"status": "updated"}), 200
+
+        user_event = _locked_booking(user_event_id) if user_event_id else None
+        # bereits bezahlt / erstattet / fehlgeschlagen oder inzwischen neu gebucht
+        # (anderer PaymentIntent) → nichts zurückstufen
+        if (
+            user_event
+            and user_event.status == BookingStatus.PENDING
+            and user_event.stripe_payment_intent_id in (None, payment_intent_id)
+        ):
+            before = booking_state(user_event)
             user_event.status = BookingStatus.FAILED
+            track_booking_transition(user_event.event_id, before, booking_state(user_event))
             db.session.commit()
+            publish_availability(user_event.event_id)
+        else:
+            db.session.rollback()
 
         print(f"❌ Zahlung fehlgeschlagen für {user_event_id}")
         return jsonify({"status": "updated"}), 200
@@ -97,15 +184,50 @@ def stripe_webhook():
         payment_intent_id = data_object.get("payment_intent")
         refund_amount = data_object.get("amount_refunded")
 
-        user_event = UserEvent.query.filter_by(
-            stripe_payment_intent_id=payment_intent_id
-        ).first()
+        fully_refunded = bool(data_object.get("refunded"))
+
+        # nur bezahlte bzw. in Erstattung befindliche Buchungen – FAILED /
+        # CANCELED mit altem PaymentIntent bleiben, wie sie sind
+        user_events = db.session.scalars(
+            select(UserEvent)
+            .where(
+                UserEvent.stripe_payment_intent_id == payment_intent_id,
+                UserEvent.status.in_((BookingStatus.PAID, BookingStatus.REFUND_PENDING)),
+            )
+            .order_by(UserEvent.id)
+            .with_for_update()
+        ).all()
+
+        # Checkout-PaymentIntent: Teil-Refunds einzelner Buchungen verbucht bereits
+        # /cancel-participation, nur ein Voll-Refund betrifft alle Buchungen
+        if len(user_events) > 1 and not fully_refunded:
+            return jsonify({"status": "ignored"}), 200
 
-        if user_event:
+        # PAID verliert seinen Platz nur bei voller Erstattung; ein Teil-Refund
+        # (z.B. Kulanz im Dashboard) lässt die Buchung bezahlt
+        user_events = [
+            ue
+            for ue in user_events
+            if ue.status == BookingStatus.REFUND_PENDING
+            or fully_refunded
+            or (ue.amount_paid and (refund_amount or 0) >= ue.amount_paid)
+        ]
+
+        for user_event in user_events:
+            before = booking_state(user_event)
             user_event.status = BookingStatus.REFUNDED
+            user_event.refund_error = None
+            track_booking_transition(user_event.event_id, before, booking_state(user_event))
+            # war ein belegter Platz → Warteliste rückt nach (Job)
+            if before.status == BookingStatus.PAID and user_event.event.max_participants:
+                schedule_promotion(user_event.event_id)
+
+        if user_events:
             db.session.commit()
+            publish_availability(*{ue.event_id for ue in user_events})
             print(
-                f"💸 Refund verarbeitet für Buchung {user_event.id} ({refund_amount} CHF-Rappen)"
+                f"💸 Refund verarbeitet für Buchungen {[ue.id for ue in user_events]} "
+                f"({refund_amount} CHF-Rappen)"
             )
 
         return jsonify({"status": "updated"}), 200
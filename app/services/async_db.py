@@ -0,0 +1,48 @@
+# app/services/async_db.py
+"""
+Async-Zugriff auf dieselbe Postgres-DB (SQLAlchemy asyncio + asyncpg) für die
+async Views in app/routes/events_async.py.
+
+Flask startet für jeden async View einen eigenen Event-Loop. asyncpg-Verbindungen
+hängen an ihrem Loop, deshalb NullPool: jede AsyncSession öffnet ihre Verbindung
+selbst und schließt sie wieder. Für Connection-Reuse pgbouncer davorschalten.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def async_database_url(url: str) -> str:
+    """postgresql(+psycopg2)://… → postgresql+asyncpg://…"""
+    scheme, rest = url.split("://", 1)
+    if scheme.split("+")[0] not in ("postgresql", "postgres"):
+        raise ValueError(f"Async-Modus braucht Postgres, nicht {scheme!r}")
+    return f"postgresql+asyncpg://{rest}"
+
+
+def get_async_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_async_engine(
+                    async_database_url(current_app.config["SQLALCHEMY_DATABASE_URI"]),
+                    poolclass=NullPool,
+                )
+    return _engine
+
+
+def async_session() -> AsyncSession:
+    """
+    Neue AsyncSession (mit `async with` verwenden, Commit macht der Aufrufer).
+    expire_on_commit=False: nach dem Commit wird nichts implizit nachgeladen.
+    """
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
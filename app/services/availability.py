@@ -0,0 +1,195 @@
+# app/services/availability.py
+"""
+Live-Verfügbarkeit pro Event (Server-Sent Events).
+
+Buchungs-, Storno- und Webhook-Übergänge rufen nach dem Commit
+publish_availability(event_id) auf. Die Nachricht geht an alle
+SSE-Abonnenten des Events:
+
+- AVAILABILITY_PUBSUB=local    → direkt an den In-Process-Broker (ein Worker)
+- AVAILABILITY_PUBSUB=postgres → per pg_notify an alle Worker; jeder Worker mit
+                                 Abonnenten hört per LISTEN mit und verteilt lokal
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import select as select_module
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from flask import Flask
+from sqlalchemy import select, text
+
+from app.extensions import db
+from app.models.event import Event
+from app.models.event_stats import EventStats
+from app.services.waitlist import unpaid_reserved_seats
+
+CHANNEL = "event_availability"
+
+# Pro Abonnent gepufferte Nachrichten; langsame Clients verlieren alte Updates
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def pubsub_backend() -> str:
+    return os.getenv("AVAILABILITY_PUBSUB", "local")
+
+
+class AvailabilityBroker:
+    """In-Process Pub/Sub: event_id → Queues der SSE-Verbindungen."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[queue.Queue]] = defaultdict(set)
+
+    def subscribe(self, event_ids: Iterable[int]) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            for event_id in event_ids:
+                self._subscribers[event_id].add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue, event_ids: Iterable[int]) -> None:
+        with self._lock:
+            for event_id in event_ids:
+                subs = self._subscribers.get(event_id)
+                if subs is None:
+                    continue
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[event_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({q for subs in self._subscribers.values() for q in subs})
+
+    def dispatch(self, message: dict) -> None:
+        with self._lock:
+            targets = list(self._subscribers.get(message["event_id"], ()))
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # ältestes Update verwerfen, neuestes zählt
+                try:
+                    q.get_nowait()
+                    q.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+broker = AvailabilityBroker()
+
+
+def availability_snapshots(event_ids: Iterable[int]) -> List[dict]:
+    """
+    Aktuelle Verfügbarkeit aus event_stats (kein Scan von user_event). Frei
+    ist, was weder bezahlt noch gehalten (Hold, Wartelisten-Angebot) ist –
+    wie bei der Suche und /book.
+    """
+    rows = db.session.execute(
+        select(
+            Event.id,
+            Event.max_participants,
+            EventStats.paid_seats,
+            EventStats.pending_count,
+            unpaid_reserved_seats(Event.id),
+        )
+        .outerjoin(EventStats, EventStats.event_id == Event.id)
+        .where(Event.id.in_(list(event_ids)))
+    ).all()
+
+    snapshots = []
+    for event_id, max_participants, paid_seats, pending_count, reserved_seats in rows:
+        # belegte Plätze (Gruppenbuchungen zählen mit seats)
+        paid_seats = paid_seats or 0
+        taken_seats = paid_seats + (reserved_seats or 0)
+        snapshots.append(
+            {
+                "event_id": event_id,
+                "participant_count": paid_seats,
+                "pending_count": pending_count or 0,
+                "max_participants": max_participants,
+                "available_spots": max(0, max_participants - taken_seats)
+                if max_participants
+                else None,
+            }
+        )
+    return snapshots
+
+
+def publish_availability(*event_ids: int) -> None:
+    """
+    Verteilt die aktuelle Verfügbarkeit der Events an alle Abonnenten.
+    NACH dem Commit der Buchungsänderung aufrufen. Fehler werden nur geloggt –
+    Live-Updates dürfen eine Buchung nie scheitern lassen.
+    """
+    try:
+        snapshots = availability_snapshots(event_ids)
+
+        if pubsub_backend() == "postgres":
+            for snapshot in snapshots:
+                db.session.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": CHANNEL, "payload": json.dumps(snapshot)},
+                )
+            db.session.commit()
+        else:
+            for snapshot in snapshots:
+                broker.dispatch(snapshot)
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Konnte Verfügbarkeit für Events {event_ids} nicht publizieren: {e}")
+
+
+# ---------------------- POSTGRES LISTEN ----------------------
+
+_listener_thread: Optional[threading.Thread] = None
+_listener_lock = threading.Lock()
+
+
+def _listen_forever(app: Flask) -> None:
+    backoff = 1
+    while True:
+        try:
+            with app.app_context():
+                conn = db.engine.raw_connection()
+            try:
+                dbapi_conn = conn.driver_connection
+                dbapi_conn.autocommit = True
+                with dbapi_conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                print(f"👂 LISTEN {CHANNEL} aktiv")
+                backoff = 1
+
+                while True:
+                    ready, _, _ = select_module.select([dbapi_conn], [], [], 30)
+                    if not ready:
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        notify = dbapi_conn.notifies.pop(0)
+                        broker.dispatch(json.loads(notify.payload))
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ LISTEN {CHANNEL} unterbrochen ({e}) – neuer Versuch in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+def ensure_listener(app: Flask) -> None:
+    """Startet (einmal pro Prozess) den LISTEN-Thread, falls Postgres-Pub/Sub aktiv ist."""
+    global _listener_thread
+    if pubsub_backend() != "postgres":
+        return
+    with _listener_lock:
+        if _listener_thread is None or not _listener_thread.is_alive():
+            _listener_thread = threading.Thread(
+                target=_listen_forever, args=(app,), name="availability-listen", daemon=True
+            )
+            _listener_thread.start()
@@ -1,12 +1,23 @@
 from datetime import datetime, timedelta
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import BlobServiceClient, generate_blob_sas, generate_container_sas, BlobSasPermissions, ContainerSasPermissions
 import os
 
+from app.services.outbound import azure_transport, dependency
+
 ACCOUNT_URL = os.environ["AZURE_BLOB_ACCOUNT_URL"]
 CONNECTION_STRING = os.environ["AZURE_BLOB_CONNECTION_STRING"]
 CONTAINER = os.environ.get("AZURE_BLOB_CONTAINER", "event-media")
+# "blob" = eine SAS pro Blob (Default), "container" = eine gemeinsame Write-SAS für den Batch
+BATCH_SAS_SCOPE = os.environ.get("AZURE_BLOB_BATCH_SAS_SCOPE", "blob")
 
-blob_service: BlobServiceClient = BlobServiceClient.from_connection_string(CONNECTION_STRING)
+# Geteilter Keep-Alive-Pool, Timeouts, Circuit Breaker + Metriken (app/services/outbound.py)
+_AZURE_CONNECT_TIMEOUT, _AZURE_READ_TIMEOUT = dependency("azure").timeout
+blob_service: BlobServiceClient = BlobServiceClient.from_connection_string(
+    CONNECTION_STRING,
+    transport=azure_transport(),
+    connection_timeout=_AZURE_CONNECT_TIMEOUT,
+    read_timeout=_AZURE_READ_TIMEOUT,
+)
 
 def blob_url(blob_name: str) -> str:
     return blob_service.get_blob_client(CONTAINER, blob_name).url
@@ -32,4 +43,29 @@ def make_write_sas(blob_name: str, minutes: int = 15, content_type: str | None =
         expiry=datetime.utcnow() + timedelta(minutes=minutes),
         content_type=content_type
     )
-    return f"{blob_url(blob_name)}?{sas}"
\ No newline at end of file
+    return f"{blob_url(blob_name)}?{sas}"
+
+def make_write_sas_batch(
+    uploads: list[tuple[str, str | None]], minutes: int = 15
+) -> list[str]:
+    """
+    Upload-URLs für mehrere Blobs auf einmal: uploads = [(blob_name, content_type), ...].
+
+    Mit AZURE_BLOB_BATCH_SAS_SCOPE=container wird nur EINE Container-SAS signiert
+    und an alle Blob-URLs gehängt (kein Content-Type-Binding, Schreibrecht auf den
+    ganzen Container) – sonst eine Blob-SAS pro Datei wie make_write_sas.
+    """
+    if BATCH_SAS_SCOPE != "container":
+        return [
+            make_write_sas(blob_name, minutes=minutes, content_type=content_type)
+            for blob_name, content_type in uploads
+        ]
+
+    sas = generate_container_sas(
+        account_name=blob_service.account_name,
+        container_name=CONTAINER,
+        account_key=blob_service.credential.account_key,
+        permission=ContainerSasPermissions(write=True, create=True),
+        expiry=datetime.utcnow() + timedelta(minutes=minutes),
+    )
+    return [f"{blob_url(blob_name)}?{sas}" for blob_name, _ in uploads]
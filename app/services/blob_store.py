@@ -0,0 +1,117 @@
+# app/services/blob_store.py
+"""
+Dünne Storage-Abstraktion für Hintergrund-Jobs (Media-Pipeline, GC).
+
+MEDIA_BLOB_BACKEND=azure  → Azure Blob Storage / Azurite (Default, via app.services.blob)
+MEDIA_BLOB_BACKEND=local  → lokales Verzeichnis MEDIA_LOCAL_BLOB_ROOT (Tests / Entwicklung)
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+
+class LocalBlobStore:
+    """Blob-Stand-in auf dem Dateisystem: Blob-Name = relativer Pfad unter root."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, blob_name: str) -> Path:
+        path = (self.root / blob_name).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Ungültiger Blob-Name: {blob_name!r}")
+        return path
+
+    def read(self, blob_name: str) -> bytes:
+        return self._path(blob_name).read_bytes()
+
+    def write(self, blob_name: str, data: bytes, content_type: str | None = None) -> None:
+        path = self._path(blob_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def list_pages(
+        self, prefix: str, page_size: int = 1000
+    ) -> Iterator[List[Tuple[str, datetime]]]:
+        """Liefert Seiten von (blob_name, last_modified) unterhalb von prefix."""
+        page: List[Tuple[str, datetime]] = []
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file():
+                continue
+            name = path.relative_to(self.root).as_posix()
+            if not name.startswith(prefix):
+                continue
+            modified = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+            page.append((name, modified))
+            if len(page) >= page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def delete_many(self, blob_names: List[str]) -> int:
+        deleted = 0
+        for name in blob_names:
+            try:
+                self._path(name).unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+
+class AzureBlobStore:
+    """Azure Blob Storage (oder Azurite) über den bestehenden blob_service."""
+
+    # Limit der Blob-Batch-API pro Request
+    DELETE_BATCH_SIZE = 256
+
+    def __init__(self):
+        from app.services.blob import blob_service, CONTAINER
+
+        self.container = blob_service.get_container_client(CONTAINER)
+
+    def read(self, blob_name: str) -> bytes:
+        return self.container.download_blob(blob_name).readall()
+
+    def write(self, blob_name: str, data: bytes, content_type: str | None = None) -> None:
+        from azure.storage.blob import ContentSettings
+
+        self.container.upload_blob(
+            blob_name,
+            data,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type)
+            if content_type
+            else None,
+        )
+
+    def list_pages(
+        self, prefix: str, page_size: int = 1000
+    ) -> Iterator[List[Tuple[str, datetime]]]:
+        pages = self.container.list_blobs(
+            name_starts_with=prefix, results_per_page=page_size
+        ).by_page()
+        for page in pages:
+            yield [(b.name, b.last_modified) for b in page]
+
+    def delete_many(self, blob_names: List[str]) -> int:
+        deleted = 0
+        for i in range(0, len(blob_names), self.DELETE_BATCH_SIZE):
+            chunk = blob_names[i : i + self.DELETE_BATCH_SIZE]
+            responses = self.container.delete_blobs(
+                *chunk, raise_on_any_failure=False
+            )
+            deleted += sum(1 for r in responses if r.status_code in (200, 202, 404))
+        return deleted
+
+
+def get_blob_store():
+    """Wählt das Storage-Backend anhand von MEDIA_BLOB_BACKEND."""
+    backend = os.getenv("MEDIA_BLOB_BACKEND", "azure")
+    if backend == "local":
+        return LocalBlobStore(os.getenv("MEDIA_LOCAL_BLOB_ROOT", "./blob-data"))
+    return AzureBlobStore()
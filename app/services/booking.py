@@ -0,0 +1,428 @@
+# app/services/booking.py
+"""
+State Machine von POST /<id>/book – eine Implementierung für den sync Pfad
+(events_bp, db.session) und den async Pfad (events_async_bp, über
+AsyncSession.run_sync). Nur die Stripe- und Clerk-Calls unterscheiden sich.
+
+    old_pi = pending_payment_intent(session, event_id, user_id)
+    if old_pi:
+        cancel_open_payment_intent(old_pi)       # BEVOR es einen neuen gibt
+    booking = prepare_booking(session, event_id, user_id, option_ids, seats, attendees, old_pi)
+    session.commit()                             # Hold steht, Event-Lock frei
+    payment_intent = stripe.PaymentIntent.create(**booking.payment_intent_params(), ...)
+    attach_payment_intent(session, booking, payment_intent.id)
+    session.commit()
+
+prepare_booking sperrt die Event-Zeile (wie der Checkout), prüft die
+Kapazität und legt die PENDING-Buchung mit einem Hold an: bis
+hold_expires_at (BOOKING_HOLD_MINUTES) zählen ihre Plätze als belegt. Der
+Stripe-Call läuft danach OHNE Lock. Kommt kein PaymentIntent zustande, gibt
+release_booking_hold die Plätze wieder frei.
+
+Lock-Reihenfolge überall (auch Webhook, Checkout, Reconciliation): Events
+(nach id) → Checkout → Buchungen, siehe lock_events / lock_booking.
+
+Validierungsfehler kommen als BookingError (HTTP-Status + Body). Commit macht
+der Aufrufer.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.models.booking_attendee import BookingAttendee
+from app.models.event import Event
+from app.models.event_option import EventOption
+from app.models.user_event import UserEvent, BookingStatus
+from app.models.user_event_option import UserEventOption
+from app.services.bulk_refund import refund_run_select
+from app.services.event_stats import booking_state, booking_transition_statements
+from app.services.jobs import enqueue
+from app.services.pricing import calculate_event_price
+from app.services.waitlist import reserved_seats_select, taken_seats_select
+
+# So lange hält eine unbezahlte Buchung ihre Plätze (PaymentIntent offen)
+BOOKING_HOLD = timedelta(minutes=int(os.getenv("BOOKING_HOLD_MINUTES", "30")))
+
+
+class BookingError(Exception):
+    """Buchung nicht möglich → HTTP-Status + JSON-Body für die Antwort."""
+
+    def __init__(self, message: str, status: int = 400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": message, **extra}
+
+
+@dataclass
+class PreparedBooking:
+    """PENDING-Buchung, die auf ihren PaymentIntent wartet."""
+
+    user_event_id: int
+    event_id: int
+    user_id: str
+    is_new: bool
+    seats: int
+    attendees: List[dict]
+    selected_option_ids: list
+    seat_price_cents: int
+    currency: str
+    hold_expires_at: datetime
+    charged_options: List[dict] = field(default_factory=list)
+
+    @property
+    def total_price_cents(self) -> int:
+        return self.seat_price_cents * self.seats
+
+    @property
+    def attempt(self) -> str:
+        """Kennung dieses Buchungsversuchs (jeder Re-Try setzt einen neuen Hold)."""
+        return f"{self.user_event_id}-{self.hold_expires_at.isoformat()}"
+
+    def payment_intent_params(self) -> dict:
+        return {
+            "amount": self.total_price_cents,
+            "currency": self.currency,
+            "automatic_payment_methods": {"enabled": True},
+            "metadata": {
+                "event_id": str(self.event_id),
+                "user_id": str(self.user_id),
+                "user_event_id": str(self.user_event_id),
+                "selected_option_ids": json.dumps(self.selected_option_ids),
+                "seats": str(self.seats),
+            },
+        }
+
+    def response(self, payment_intent) -> dict:
+        return {
+            "user_event_id": self.user_event_id,
+            "event_id": self.event_id,
+            "amount_to_pay_cents": self.total_price_cents,
+            "seat_price_cents": self.seat_price_cents,
+            "seats": self.seats,
+            "attendees": self.attendees,
+            "currency": self.currency,
+            "stripe_payment_intent_id": payment_intent.id,
+            "stripe_client_secret": payment_intent.client_secret,
+            "charged_options": self.charged_options,
+        }
+
+
+def _apply_transition(session: Session, event_id: int, before, after) -> None:
+    for stmt in booking_transition_statements(event_id, before, after):
+        session.execute(stmt)
+
+
+def _locked_user_event(session: Session, where) -> Optional[UserEvent]:
+    return session.scalar(
+        select(UserEvent)
+        .where(where)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+def lock_events(session: Session, event_ids: Iterable[int]) -> None:
+    """
+    Sperrt Event-Zeilen in id-Reihenfolge. Reihenfolge überall: Events →
+    Checkout → Buchungen (wie prepare_booking und der Checkout-Aufbau) –
+    wer eine Buchung vor ihrem Event sperrt, riskiert einen Deadlock mit
+    einem parallelen Re-Booking. Kein Commit.
+    """
+    ids = sorted(set(event_ids))
+    if ids:
+        session.execute(
+            select(Event.id).where(Event.id.in_(ids)).order_by(Event.id).with_for_update()
+        )
+
+
+def lock_booking(session: Session, where) -> Optional[UserEvent]:
+    """Sperrt eine Buchung samt ihrer Event-Zeile – das Event zuerst (siehe lock_events)."""
+    # event_id einer Buchung ändert sich nie → ohne Lock lesbar
+    event_id = session.scalar(select(UserEvent.event_id).where(where))
+    if event_id is None:
+        return None
+    lock_events(session, [event_id])
+    return _locked_user_event(session, where)
+
+
+def _holds(user_event: Optional[UserEvent], booking: PreparedBooking) -> bool:
+    """Buchung ist noch der Hold dieses Requests (nicht neu aufgesetzt, kein PaymentIntent)."""
+    return (
+        user_event is not None
+        and user_event.status == BookingStatus.PENDING
+        and user_event.stripe_payment_intent_id is None
+        and user_event.hold_expires_at == booking.hold_expires_at
+    )
+
+
+def upsert_pending_booking(
+    session: Session,
+    event_id: int,
+    user_id: str,
+    existing: UserEvent | None,
+    seats: int,
+    charged_options: List[EventOption],
+    attendees: list[dict],
+    checkout_id: int | None = None,
+    enqueue_avatar: bool = True,
+) -> UserEvent:
+    """
+    Neue Buchung oder Re-Try einer nicht bezahlten → status = PENDING, mit
+    Optionen (Preis-Snapshot), Teilnehmern und neuem Hold. Einen alten
+    PaymentIntent hat der Aufrufer vorher gecancelt; den neuen setzt er danach.
+    Kein Commit.
+    """
+    hold_expires_at = datetime.utcnow() + BOOKING_HOLD
+
+    if existing:
+        # nie PAID (Aufrufer prüft) → booking_state braucht keine DB
+        before = booking_state(existing)
+
+        # verknüpfte Optionen und Teilnehmer löschen
+        session.execute(delete(UserEventOption).where(UserEventOption.user_event_id == existing.id))
+        session.execute(delete(BookingAttendee).where(BookingAttendee.user_event_id == existing.id))
+
+        existing.status = BookingStatus.PENDING
+        existing.seats = seats
+        existing.checkout_id = checkout_id
+        existing.amount_paid = None
+        existing.paid_at = None
+        existing.currency = "chf"
+        existing.stripe_payment_intent_id = None
+        existing.hold_expires_at = hold_expires_at
+
+        user_event = existing
+        _apply_transition(session, event_id, before, booking_state(user_event))
+
+    else:
+        user_event = UserEvent(
+            user_id=user_id,
+            event_id=event_id,
+            currency="chf",
+            amount_paid=None,
+            status=BookingStatus.PENDING,
+            seats=seats,
+            checkout_id=checkout_id,
+            hold_expires_at=hold_expires_at,
+        )
+        session.add(user_event)
+        session.flush()
+        _apply_transition(session, event_id, None, booking_state(user_event))
+        if enqueue_avatar:
+            # Avatar wird vom Job-Worker nachgetragen
+            enqueue(
+                "clerk.fetch_avatar",
+                {"user_event_id": user_event.id, "user_id": user_id},
+                session=session,
+            )
+
+    # neue Optionen anhängen
+    for opt in charged_options:
+        session.add(
+            UserEventOption(
+                user_event_id=user_event.id,
+                event_option_id=opt.id,
+                price_cents=opt.price_cents,
+            )
+        )
+
+    for position, attendee in enumerate(attendees):
+        session.add(BookingAttendee(user_event_id=user_event.id, position=position, **attendee))
+
+    return user_event
+
+
+def pending_payment_intent(session: Session, event_id: int, user_id: str) -> Optional[str]:
+    """PaymentIntent einer offenen Einzel-Buchung (muss vor dem Re-Try gecancelt werden)."""
+    return session.scalar(
+        select(UserEvent.stripe_payment_intent_id).where(
+            UserEvent.user_id == user_id,
+            UserEvent.event_id == event_id,
+            UserEvent.status == BookingStatus.PENDING,
+            UserEvent.checkout_id.is_(None),
+        )
+    )
+
+
+def prepare_booking(
+    session: Session,
+    event_id: int,
+    user_id: str,
+    selected_option_ids: list,
+    seats: int,
+    attendees: list[dict],
+    canceled_payment_intent_id: Optional[str] = None,
+    enqueue_avatar: bool = True,
+) -> PreparedBooking:
+    """
+    Prüft Event, Optionen, Kapazität und bestehende Buchung, berechnet den
+    Preis und legt die PENDING-Buchung mit Hold an (bzw. setzt sie neu auf).
+    Event- und Buchungszeile bleiben bis zum Commit des Aufrufers gesperrt.
+    canceled_payment_intent_id: der vorher gecancelte PaymentIntent der
+    Buchung – hat sie inzwischen einen anderen, lief parallel ein Re-Try.
+    """
+    try:
+        selected_ids = {int(o_id) for o_id in selected_option_ids}
+    except (TypeError, ValueError):
+        raise BookingError("'selected_option_ids' muss eine Liste von IDs sein.")
+
+    # Event-Zeile sperren (wie der Checkout) → Kapazitätsprüfung und Hold sind atomar
+    event = session.scalar(
+        select(Event).where(Event.id == event_id, Event.deleted_at.is_(None)).with_for_update()
+    )
+    if event is None:
+        raise BookingError("Event not found", 404)
+    # abgesagt: Massen-Erstattung gestartet → keine neuen Buchungen
+    if session.scalar(refund_run_select(event.id)) is not None:
+        raise BookingError("Event was cancelled and is being refunded", 409)
+
+    all_options = session.scalars(
+        select(EventOption)
+        .where(EventOption.event_id == event.id, EventOption.is_active.is_(True))
+        .order_by(EventOption.sort_order.asc(), EventOption.id.asc())
+    ).all()
+
+    if not all_options:
+        raise BookingError("Für dieses Event sind keine Preis-Optionen konfiguriert.")
+    if not any(o.is_required for o in all_options):
+        raise BookingError(
+            "Event ist nicht korrekt konfiguriert: es gibt keine Pflicht-Gebühr (is_required=True)."
+        )
+
+    invalid_ids = selected_ids - {opt.id for opt in all_options}
+    if invalid_ids:
+        raise BookingError(f"Ungültige selected_option_ids für dieses Event: {sorted(invalid_ids)}")
+
+    # Kapazität: PAID + laufende Holds anderer; offene Wartelisten-Angebote sind reserviert
+    if event.max_participants:
+        taken = session.scalar(taken_seats_select(event.id, user_id))
+        reserved = session.scalar(reserved_seats_select(event.id, user_id))
+        if taken + reserved + seats > event.max_participants:
+            raise BookingError(
+                "Event ist bereits voll.", waitlist=f"/api/events/{event.id}/waitlist"
+            )
+
+    seat_price_cents, charged_options = calculate_event_price(
+        all_options=all_options,
+        selected_option_ids=selected_ids,
+    )
+    if seat_price_cents <= 0:
+        raise BookingError("Berechneter Preis ist 0 oder negativ. Bitte Event-Optionen prüfen.")
+
+    existing = _locked_user_event(
+        session, (UserEvent.user_id == user_id) & (UserEvent.event_id == event.id)
+    )
+    if existing:
+        # Bereits bezahlte Buchung → kein Re-Booking
+        if existing.status == BookingStatus.PAID:
+            raise BookingError("Dieser User hat dieses Event bereits gebucht und bezahlt.", 409)
+        if existing.status == BookingStatus.REFUND_PENDING:
+            raise BookingError("Refund for this booking is still in progress", 409)
+        if existing.status == BookingStatus.PENDING:
+            if existing.checkout_id:
+                raise BookingError(
+                    "Booking is part of a pending checkout",
+                    409,
+                    checkout_id=existing.checkout_id,
+                )
+            if existing.stripe_payment_intent_id not in (None, canceled_payment_intent_id):
+                raise BookingError("Booking was changed concurrently, please retry", 409)
+
+    user_event = upsert_pending_booking(
+        session,
+        event.id,
+        user_id,
+        existing,
+        seats,
+        charged_options,
+        attendees,
+        enqueue_avatar=enqueue_avatar,
+    )
+
+    return PreparedBooking(
+        user_event_id=user_event.id,
+        event_id=event.id,
+        user_id=user_id,
+        is_new=existing is None,
+        seats=seats,
+        attendees=attendees,
+        selected_option_ids=list(selected_option_ids),
+        seat_price_cents=seat_price_cents,
+        currency=user_event.currency,
+        hold_expires_at=user_event.hold_expires_at,
+        charged_options=[
+            {
+                "id": opt.id,
+                "type": opt.type,
+                "label": opt.label,
+                "price_cents": opt.price_cents,
+            }
+            for opt in charged_options
+        ],
+    )
+
+
+def attach_payment_intent(
+    session: Session,
+    booking: PreparedBooking,
+    payment_intent_id: str,
+    avatar_url: Optional[str] = None,
+) -> None:
+    """
+    Hängt den neuen PaymentIntent (und ggf. den schon geladenen Avatar) an die
+    committete Buchung. Wurde sie inzwischen neu aufgesetzt oder freigegeben →
+    BookingError 409, der Aufrufer cancelt dann den PaymentIntent. Kein Commit.
+    """
+    user_event = _locked_user_event(session, UserEvent.id == booking.user_event_id)
+    if not _holds(user_event, booking):
+        raise BookingError("Booking was changed concurrently, please retry", 409)
+    user_event.stripe_payment_intent_id = payment_intent_id
+    if avatar_url:
+        user_event.avatar_url = avatar_url
+
+
+def seat_lost(session: Session, user_event: UserEvent) -> bool:
+    """
+    Zahlung für eine Buchung ohne laufenden Hold (abgelaufen oder FAILED):
+    True, wenn ihre Plätze inzwischen vergeben sind – die Zahlung muss dann
+    erstattet werden. Die Event-Zeile muss der Aufrufer VOR der Buchung
+    gesperrt haben (lock_booking / lock_events). Kein Commit.
+    """
+    if user_event.status == BookingStatus.PENDING and (
+        user_event.hold_expires_at is None or user_event.hold_expires_at > datetime.utcnow()
+    ):
+        return False
+
+    max_participants = session.scalar(
+        select(Event.max_participants).where(Event.id == user_event.event_id)
+    )
+    if not max_participants:
+        return False
+    taken = session.scalar(taken_seats_select(user_event.event_id, user_event.user_id))
+    reserved = session.scalar(reserved_seats_select(user_event.event_id, user_event.user_id))
+    return taken + reserved + user_event.seats > max_participants
+
+
+def release_booking_hold(session: Session, booking: PreparedBooking) -> bool:
+    """
+    Kein PaymentIntent zustande gekommen → Buchung CANCELED, Plätze wieder frei.
+    False, wenn die Buchung inzwischen neu aufgesetzt wurde. Kein Commit.
+    """
+    user_event = _locked_user_event(session, UserEvent.id == booking.user_event_id)
+    if not _holds(user_event, booking):
+        return False
+
+    before = booking_state(user_event)
+    session.execute(delete(UserEventOption).where(UserEventOption.user_event_id == user_event.id))
+    session.execute(delete(BookingAttendee).where(BookingAttendee.user_event_id == user_event.id))
+    user_event.status = BookingStatus.CANCELED
+    user_event.hold_expires_at = None
+    _apply_transition(session, user_event.event_id, before, booking_state(user_event))
+    return True
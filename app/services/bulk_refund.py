@@ -0,0 +1,361 @@
+# app/services/bulk_refund.py
+"""
+Massen-Erstattung aller PAID-Buchungen eines abgesagten Events.
+
+    run = start_event_refund(event_id)   # legt den Lauf an + reiht den Job ein
+    db.session.commit()
+
+Der Job "event.bulk_refund" arbeitet die Buchungen in Batches nach id ab:
+
+- Batch übernehmen: PAID-Buchungen FOR UPDATE SKIP LOCKED → REFUND_PENDING
+  mit refund_run_id, committet VOR dem ersten Stripe-Call (ein paralleles
+  Storno sieht die Buchung nicht mehr als PAID und erstattet nicht ein
+  zweites Mal)
+- pro Batch laufen die Stripe-Refunds parallel (run.concurrency Threads),
+  429 → exponentieller Backoff mit Jitter
+- danach EIN Commit: erstattete Buchungen → REFUNDED (ein UPDATE), Statistik
+  des Events neu berechnet, Zähler des Laufs; Fehlschläge bleiben
+  REFUND_PENDING mit refund_error (`flask refunds retry`)
+- nach RUN_TIME_BUDGET_SECS reiht sich der Job selbst wieder ein, damit ein
+  Lauf mit tausenden Buchungen keinen Worker blockiert und nicht als
+  verwaist gilt; ein abgestürzter Job erstattet beim Retry zuerst die schon
+  übernommenen Buchungen
+
+Refunds tragen denselben Idempotency-Key pro Buchung wie der Job
+"stripe.refund" – ein wiederholter Batch erstattet also höchstens einmal.
+
+Ab dem ersten Lauf nimmt das Event keine Buchungen mehr an (/book und
+Checkout prüfen refund_run_select unter demselben Event-Lock) und
+/cancel-participation lehnt Stornos mit 409 ab. Zahlungen
+gehaltener Buchungen, die erst danach eingehen, erstattet
+refund_late_payment sofort wieder (Webhook, Checkout, Reconciliation).
+"""
+from __future__ import annotations
+
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import stripe
+from sqlalchemy import delete, func, select, update
+
+from app.extensions import db
+from app.models.event import Event
+from app.models.event_refund_run import EventRefundRun, RefundRunStatus
+from app.models.user_event import UserEvent, BookingStatus
+from app.models.user_event_option import UserEventOption
+from app.services.availability import publish_availability
+from app.services.event_stats import refresh_event_stats
+from app.services.jobs import enqueue
+from app.services.payments import queue_booking_refund
+
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+DEFAULT_CONCURRENCY = 8
+MAX_CONCURRENCY = 32
+DEFAULT_BATCH_SIZE = 200
+RUN_TIME_BUDGET_SECS = 240
+RATE_LIMIT_MAX_RETRIES = 6
+MAX_RECORDED_FAILURES = 500
+# nur gesperrte PAID-Buchungen übrig (paralleles Storno) → so viel später nochmal
+LOCKED_RETRY_SECS = 5
+# erster Schlüssel von pg_try_advisory_xact_lock(namespace, run_id)
+RUN_LOCK_NAMESPACE = 4701
+
+ACTIVE_STATUSES = (RefundRunStatus.QUEUED, RefundRunStatus.RUNNING)
+
+
+def refund_run_select(event_id: int):
+    """Irgendein Erstattungs-Lauf des Events (= abgesagt) – auch für AsyncSession."""
+    return select(EventRefundRun.id).where(EventRefundRun.event_id == event_id).limit(1)
+
+
+def event_refund_started(event_id: int) -> bool:
+    return db.session.scalar(refund_run_select(event_id)) is not None
+
+
+def refund_late_payment(user_event: UserEvent) -> bool:
+    """
+    Buchung gerade PAID geworden, das Event wird aber schon erstattet (Hold von
+    vor dem Start des Laufs) → Refund sofort einreihen. Commit macht der Aufrufer.
+    """
+    if (
+        user_event.status != BookingStatus.PAID
+        or not user_event.amount_paid
+        or not event_refund_started(user_event.event_id)
+    ):
+        return False
+    queue_booking_refund(user_event, user_event.amount_paid)
+    print(f"↩️ Zahlung für Buchung {user_event.id} nach Event-Absage → Refund eingereiht")
+    return True
+
+
+def active_refund_run(event_id: int) -> Optional[EventRefundRun]:
+    return db.session.scalar(
+        select(EventRefundRun).where(
+            EventRefundRun.event_id == event_id,
+            EventRefundRun.status.in_(ACTIVE_STATUSES),
+        )
+    )
+
+
+def start_event_refund(
+    event_id: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> EventRefundRun:
+    """
+    Legt einen Erstattungs-Lauf an und reiht den Job ein. Hat das Event schon
+    einen offenen Lauf, wird dieser ab seinem Cursor fortgesetzt statt einen
+    zweiten zu starten. Commit macht der Aufrufer.
+    """
+    # Event-Zeile sperren: /book und Checkout prüfen unter demselben Lock auf einen Lauf
+    db.session.scalar(select(Event.id).where(Event.id == event_id).with_for_update())
+
+    run = active_refund_run(event_id)
+    if run is not None:
+        enqueue("event.bulk_refund", {"run_id": run.id})
+        return run
+
+    run = EventRefundRun(
+        event_id=event_id,
+        status=RefundRunStatus.QUEUED,
+        concurrency=max(1, min(concurrency, MAX_CONCURRENCY)),
+        batch_size=max(1, batch_size),
+        cursor_user_event_id=0,
+        refunded_count=0,
+        refunded_cents=0,
+        failed_count=0,
+    )
+    db.session.add(run)
+    db.session.flush()
+    enqueue("event.bulk_refund", {"run_id": run.id})
+    return run
+
+
+def _create_refund(user_event_id: int, payment_intent_id: str, amount: int) -> None:
+    """Ein Refund mit Backoff bei 429; bereits erstattet zählt als Erfolg."""
+    delay = 1.0
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        try:
+            stripe.Refund.create(
+                payment_intent=payment_intent_id,
+                amount=amount,
+                # derselbe Key wie im Job "stripe.refund" (flask refunds retry)
+                idempotency_key=f"refund-{user_event_id}-{payment_intent_id}",
+            )
+            return
+        except stripe.error.RateLimitError:
+            if attempt == RATE_LIMIT_MAX_RETRIES:
+                raise
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 30)
+        except stripe.error.InvalidRequestError as e:
+            if getattr(e, "code", None) == "charge_already_refunded":
+                return
+            raise
+
+
+def _refund_batch(
+    pool: ThreadPoolExecutor, batch: List[Tuple[int, Optional[str], Optional[int]]]
+) -> Dict[int, Optional[str]]:
+    """user_event_id → None (erstattet) oder Fehlermeldung."""
+
+    def refund(row) -> Tuple[int, Optional[str]]:
+        user_event_id, payment_intent_id, amount = row
+        # ohne Zahlung (z.B. Legacy-Teilnahme) gibt es nichts zu erstatten
+        if not payment_intent_id or not amount:
+            return user_event_id, None
+        try:
+            _create_refund(user_event_id, payment_intent_id, amount)
+            return user_event_id, None
+        except Exception as e:
+            return user_event_id, f"{type(e).__name__}: {e}"[:300]
+
+    return dict(pool.map(refund, batch))
+
+
+def _claimed_batch(run: EventRefundRun) -> List[Tuple[int, Optional[str], Optional[int]]]:
+    """Vom Lauf übernommene, noch nicht erstattete Buchungen (nach Absturz / Zeitbudget)."""
+    return db.session.execute(
+        select(UserEvent.id, UserEvent.stripe_payment_intent_id, UserEvent.refund_amount)
+        .where(
+            UserEvent.refund_run_id == run.id,
+            UserEvent.status == BookingStatus.REFUND_PENDING,
+            UserEvent.refund_error.is_(None),
+        )
+        .order_by(UserEvent.id.asc())
+        .limit(run.batch_size)
+    ).all()
+
+
+def _claim_batch(run: EventRefundRun) -> List[Tuple[int, Optional[str], Optional[int]]]:
+    """
+    Sperrt den nächsten Batch PAID-Buchungen (SKIP LOCKED: ein paralleles
+    Storno hält die Zeile) und setzt ihn auf REFUND_PENDING mit diesem Lauf.
+    Committet – erst danach geht es zu Stripe, ein Storno sieht die Buchung
+    also nicht mehr als PAID.
+    """
+    rows = db.session.execute(
+        select(UserEvent.id, UserEvent.stripe_payment_intent_id, UserEvent.amount_paid)
+        .where(UserEvent.event_id == run.event_id, UserEvent.status == BookingStatus.PAID)
+        .order_by(UserEvent.id.asc())
+        .limit(run.batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return []
+
+    claimed_ids = [ue_id for ue_id, _, _ in rows]
+    db.session.execute(
+        delete(UserEventOption).where(UserEventOption.user_event_id.in_(claimed_ids))
+    )
+    db.session.execute(
+        update(UserEvent)
+        .where(UserEvent.id.in_(claimed_ids))
+        .values(
+            status=BookingStatus.REFUND_PENDING,
+            refund_amount=UserEvent.amount_paid,
+            refund_error=None,
+            refund_run_id=run.id,
+        )
+    )
+    refresh_event_stats([run.event_id])
+    run.cursor_user_event_id = max(run.cursor_user_event_id, claimed_ids[-1])
+    db.session.commit()
+    publish_availability(run.event_id)
+    return rows
+
+
+def _paid_bookings_left(event_id: int) -> bool:
+    return db.session.scalar(
+        select(UserEvent.id)
+        .where(UserEvent.event_id == event_id, UserEvent.status == BookingStatus.PAID)
+        .limit(1)
+    ) is not None
+
+
+def run_event_refund(run_id: int, time_budget_secs: float = RUN_TIME_BUDGET_SECS) -> None:
+    """
+    Arbeitet einen Lauf ab (Job-Handler, committet selbst). Läuft derselbe Lauf
+    schon in einem anderen Job, kehrt er sofort zurück.
+    """
+    # Advisory-Lock in einer eigenen Transaktion, solange der Lauf arbeitet:
+    # ein Zeilen-Lock auf event_refund_run würde die Zähler-Updates der
+    # Session blockieren. Ende der Verbindung (auch bei Absturz) gibt ihn frei.
+    with db.engine.connect() as lock_conn:
+        locked = lock_conn.scalar(
+            select(func.pg_try_advisory_xact_lock(RUN_LOCK_NAMESPACE, run_id))
+        )
+        if not locked:
+            print(f"⏭️ Erstattungs-Lauf {run_id} läuft bereits in einem anderen Job")
+            return
+        _process_run(run_id, time_budget_secs)
+
+
+def _process_run(run_id: int, time_budget_secs: float) -> None:
+    run = db.session.get(EventRefundRun, run_id)
+    if run is None or run.status not in ACTIVE_STATUSES:
+        return
+
+    run.status = RefundRunStatus.RUNNING
+    run.started_at = run.started_at or datetime.utcnow()
+    db.session.commit()
+
+    deadline = time.monotonic() + time_budget_secs
+    with ThreadPoolExecutor(max_workers=run.concurrency) as pool:
+        while True:
+            # erst Reste eines abgebrochenen Durchgangs, dann neue Buchungen
+            batch = _claimed_batch(run) or _claim_batch(run)
+
+            if not batch:
+                if _paid_bookings_left(run.event_id):
+                    # nur gesperrte Zeilen übrig (Storno läuft) → gleich nochmal
+                    enqueue(
+                        "event.bulk_refund",
+                        {"run_id": run.id},
+                        run_at=datetime.utcnow() + timedelta(seconds=LOCKED_RETRY_SECS),
+                    )
+                    db.session.commit()
+                    return
+                run.status = RefundRunStatus.DONE
+                run.finished_at = datetime.utcnow()
+                db.session.commit()
+                print(
+                    f"✅ Erstattung Event {run.event_id}: {run.refunded_count} erstattet, "
+                    f"{run.failed_count} fehlgeschlagen"
+                )
+                return
+
+            results = _refund_batch(pool, batch)
+            refunded_ids = [ue_id for ue_id, error in results.items() if error is None]
+            amounts = {ue_id: amount or 0 for ue_id, _, amount in batch}
+
+            # nur Zeilen zählen, die WIR auf REFUNDED setzen
+            if refunded_ids:
+                refunded_ids = list(
+                    db.session.scalars(
+                        update(UserEvent)
+                        .where(
+                            UserEvent.id.in_(refunded_ids),
+                            UserEvent.status == BookingStatus.REFUND_PENDING,
+                        )
+                        .values(status=BookingStatus.REFUNDED)
+                        .returning(UserEvent.id)
+                    )
+                )
+                refresh_event_stats([run.event_id])
+
+            failures = dict(run.failures or {})
+            failed = {ue_id: error for ue_id, error in results.items() if error is not None}
+            for ue_id, error in failed.items():
+                # bleibt REFUND_PENDING, `flask refunds retry` versucht es erneut
+                db.session.execute(
+                    update(UserEvent).where(UserEvent.id == ue_id).values(refund_error=error)
+                )
+                if len(failures) < MAX_RECORDED_FAILURES:
+                    failures[str(ue_id)] = error
+
+            run.refunded_count += len(refunded_ids)
+            run.refunded_cents += sum(amounts[ue_id] for ue_id in refunded_ids)
+            run.failed_count += len(failed)
+            run.failures = failures or None
+            db.session.commit()
+            publish_availability(run.event_id)
+
+            if time.monotonic() > deadline:
+                # Zeitbudget aufgebraucht → Fortsetzung als neuer Job
+                enqueue("event.bulk_refund", {"run_id": run.id})
+                db.session.commit()
+                return
+
+
+def record_refund_run_error(run_id: int, error: str) -> None:
+    """Merkt sich den letzten Fehler eines Laufs (der Job wird danach erneut versucht)."""
+    db.session.rollback()
+    db.session.execute(
+        update(EventRefundRun)
+        .where(EventRefundRun.id == run_id)
+        .values(last_error=error[:2000])
+    )
+    db.session.commit()
+
+
+def serialize_refund_run(run: EventRefundRun) -> dict:
+    return {
+        "run_id": run.id,
+        "event_id": run.event_id,
+        "status": run.status.value,
+        "refunded_count": run.refunded_count,
+        "refunded_cents": run.refunded_cents,
+        "failed_count": run.failed_count,
+        "failures": run.failures or {},
+        "last_error": run.last_error,
+        "cursor_user_event_id": run.cursor_user_event_id,
+        "created_at": run.created_at.isoformat(),
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+    }
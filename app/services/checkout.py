@@ -0,0 +1,198 @@
+# app/services/checkout.py
+"""
+Warenkorb-Checkout über mehrere Events (POST /api/events/checkout).
+
+Pro Event entsteht eine normale Buchung (UserEvent, PENDING) mit checkout_id,
+alle Buchungen teilen sich EINEN PaymentIntent über die Gesamtsumme.
+Der Webhook (bzw. die Reconciliation) verbucht alle Buchungen eines Checkouts
+in einer Transaktion:
+
+    event_ids = settle_checkout(checkout_id, currency)
+    db.session.commit()
+    publish_availability(*event_ids)
+
+amount_paid jeder Buchung ist ihr Anteil (Preis-Snapshots × seats), nicht
+der Betrag des gemeinsamen PaymentIntents. Buchungen, deren Hold abgelaufen
+und deren Platz inzwischen vergeben ist, werden nach der Zahlung sofort
+erstattet.
+
+Gesperrt wird wie bei /book zuerst das Event: Events des Checkouts (nach id)
+→ Checkout → Buchungen (lock_events).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.booking_attendee import BookingAttendee
+from app.models.checkout import Checkout, CheckoutStatus
+from app.models.user_event import UserEvent, BookingStatus
+from app.models.user_event_option import UserEventOption
+from app.services.booking import lock_events, seat_lost
+from app.services.bulk_refund import refund_late_payment
+from app.services.event_stats import booking_state, track_booking_transition
+from app.services.jobs import enqueue
+from app.services.payments import queue_booking_refund
+from app.services.waitlist import claim_offer
+
+MAX_CHECKOUT_ITEMS = 20
+
+
+def booking_amounts(user_event_ids: Iterable[int]) -> Dict[int, int]:
+    """Anteil jeder Buchung in Rappen: Summe der Preis-Snapshots × seats (eine Query)."""
+    user_event_ids = list(user_event_ids)
+    if not user_event_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            UserEventOption.user_event_id,
+            func.sum(UserEventOption.price_cents) * func.max(UserEvent.seats),
+        )
+        .join(UserEvent, UserEvent.id == UserEventOption.user_event_id)
+        .where(UserEventOption.user_event_id.in_(user_event_ids))
+        .group_by(UserEventOption.user_event_id)
+    )
+    return {user_event_id: int(amount) for user_event_id, amount in rows}
+
+
+def _locked_checkout(checkout_id: int) -> Optional[Checkout]:
+    return db.session.scalar(
+        select(Checkout).where(Checkout.id == checkout_id).with_for_update()
+    )
+
+
+def _lock_checkout_events(checkout_id: int) -> None:
+    """Events aller Buchungen des Checkouts sperren – vor Checkout und Buchungen (lock_events)."""
+    lock_events(
+        db.session,
+        db.session.scalars(select(UserEvent.event_id).where(UserEvent.checkout_id == checkout_id)),
+    )
+
+
+def _pending_bookings(checkout_id: int) -> List[UserEvent]:
+    return db.session.scalars(
+        select(UserEvent)
+        .where(
+            UserEvent.checkout_id == checkout_id,
+            UserEvent.status == BookingStatus.PENDING,
+        )
+        .order_by(UserEvent.id.asc())
+        .with_for_update()
+    ).all()
+
+
+def attach_checkout_payment_intent(checkout_id: int, payment_intent_id: str) -> bool:
+    """
+    Hängt den (ohne Lock erzeugten) PaymentIntent an Checkout und Buchungen.
+    False, wenn der Checkout inzwischen abgebrochen wurde oder schon einen hat
+    – der Aufrufer cancelt dann den PaymentIntent. Commit macht der Aufrufer.
+    """
+    _lock_checkout_events(checkout_id)
+    checkout = _locked_checkout(checkout_id)
+    if (
+        checkout is None
+        or checkout.status != CheckoutStatus.PENDING
+        or checkout.stripe_payment_intent_id
+    ):
+        return False
+
+    checkout.stripe_payment_intent_id = payment_intent_id
+    for user_event in _pending_bookings(checkout_id):
+        user_event.stripe_payment_intent_id = payment_intent_id
+    return True
+
+
+def checkout_accepts_payment(checkout_id: int, payment_intent_id: str) -> bool:
+    """
+    Gehört die Zahlung zu diesem Checkout? False, wenn er abgebrochen /
+    fehlgeschlagen ist oder inzwischen einen anderen PaymentIntent hat – der
+    Aufrufer erstattet die Zahlung dann (refund_orphaned_payment).
+    Bereits bezahlt (doppelter Webhook) zählt als True.
+    """
+    _lock_checkout_events(checkout_id)
+    checkout = _locked_checkout(checkout_id)
+    return (
+        checkout is not None
+        and checkout.stripe_payment_intent_id == payment_intent_id
+        and checkout.status in (CheckoutStatus.PENDING, CheckoutStatus.PAID)
+    )
+
+
+def settle_checkout(checkout_id: int, currency: str = "chf") -> List[int]:
+    """
+    Zahlung eingegangen: alle PENDING-Buchungen des Checkouts → PAID.
+    Idempotent (doppelter Webhook ändert nichts). Liefert die betroffenen
+    event_ids für publish_availability. Commit macht der Aufrufer.
+    """
+    _lock_checkout_events(checkout_id)
+    checkout = _locked_checkout(checkout_id)
+    if checkout is None or checkout.status != CheckoutStatus.PENDING:
+        return []
+
+    bookings = _pending_bookings(checkout_id)
+    amounts = booking_amounts(ue.id for ue in bookings)
+    now = datetime.utcnow()
+
+    for user_event in bookings:
+        # Hold abgelaufen und Platz vergeben → Zahlung dieser Buchung erstatten
+        lost = seat_lost(db.session, user_event)
+        before = booking_state(user_event)
+        user_event.status = BookingStatus.PAID
+        user_event.amount_paid = amounts.get(user_event.id, 0)
+        user_event.currency = currency
+        user_event.paid_at = now
+        track_booking_transition(user_event.event_id, before, booking_state(user_event))
+        if lost:
+            queue_booking_refund(user_event, user_event.amount_paid)
+            continue
+        # Platz über die Warteliste bekommen → Angebot eingelöst
+        claim_offer(user_event.event_id, user_event.user_id)
+        # Event inzwischen abgesagt → diese Buchung sofort erstatten
+        refund_late_payment(user_event)
+
+    checkout.status = CheckoutStatus.PAID
+    checkout.paid_at = now
+    return [ue.event_id for ue in bookings]
+
+
+def _close_checkout(checkout_id: int, booking_status: BookingStatus, status: CheckoutStatus) -> List[int]:
+    _lock_checkout_events(checkout_id)
+    checkout = _locked_checkout(checkout_id)
+    if checkout is None or checkout.status != CheckoutStatus.PENDING:
+        return []
+
+    bookings = _pending_bookings(checkout_id)
+    for user_event in bookings:
+        before = booking_state(user_event)
+        user_event.status = booking_status
+        if booking_status == BookingStatus.CANCELED:
+            UserEventOption.query.filter_by(user_event_id=user_event.id).delete()
+            BookingAttendee.query.filter_by(user_event_id=user_event.id).delete()
+            user_event.stripe_payment_intent_id = None
+        track_booking_transition(user_event.event_id, before, booking_state(user_event))
+
+    checkout.status = status
+    return [ue.event_id for ue in bookings]
+
+
+def fail_checkout(checkout_id: int) -> List[int]:
+    """Zahlung fehlgeschlagen: alle PENDING-Buchungen → FAILED. Commit macht der Aufrufer."""
+    return _close_checkout(checkout_id, BookingStatus.FAILED, CheckoutStatus.FAILED)
+
+
+def cancel_checkout(checkout: Checkout) -> List[int]:
+    """
+    Bricht einen offenen Checkout ab: PaymentIntent canceln (Job), alle
+    PENDING-Buchungen → CANCELED. Commit macht der Aufrufer.
+    """
+    if checkout.status != CheckoutStatus.PENDING:
+        return []
+    if checkout.stripe_payment_intent_id:
+        enqueue(
+            "stripe.cancel_payment_intent",
+            {"payment_intent_id": checkout.stripe_payment_intent_id},
+        )
+    return _close_checkout(checkout.id, BookingStatus.CANCELED, CheckoutStatus.CANCELED)
@@ -0,0 +1,90 @@
+# app/services/clerk.py
+import os
+
+from app.services.outbound import CircuitOpenError, dependency
+
+CLERK_API_BASE = "https://api.clerk.com/v1"
+
+
+def fetch_clerk_user_image(clerk_user_id: str) -> str | None:
+    """
+    Holt das Profilbild eines Clerk-Users über die Clerk Backend API.
+    Wir verwenden direkt die Clerk-User-ID (z.B. 'user_363zYC2Ve5HZwsS7cwJY8AS9txk'),
+    die in UserEvent.user_id gespeichert ist.
+    Es wird NICHTS in der DB gespeichert – reiner Runtime-Lookup.
+    Clerk gestört (Circuit offen) → None ohne Call, der Aufrufer macht ohne Avatar weiter.
+    """
+    secret = os.getenv("CLERK_SECRET_KEY")
+    if not secret:
+        print("⚠️ CLERK_SECRET_KEY ist nicht gesetzt – kann Clerk-User nicht laden.")
+        return None
+
+    if not clerk_user_id:
+        print("⚠️ fetch_clerk_user_image: clerk_user_id ist leer.")
+        return None
+
+    clerk = dependency("clerk")
+    try:
+        url = f"{CLERK_API_BASE}/users/{clerk_user_id}"
+        print(f"🔎 Hole Clerk-User von {url}")
+        # Keep-Alive-Pool + Timeouts + Circuit Breaker (app/services/outbound.py)
+        with clerk.track() as call:
+            resp = clerk.session.get(
+                url,
+                headers={
+                    "Authorization": f"Bearer {secret}",
+                },
+                timeout=clerk.timeout,
+            )
+            if resp.status_code >= 500:
+                call.failed(f"HTTP {resp.status_code}")
+        print(f"🔎 Clerk-Response {resp.status_code} für user_id={clerk_user_id}")
+
+        if resp.status_code != 200:
+            text_preview = resp.text[:300].replace("\n", " ")
+            print(f"⚠️ Clerk API Fehler {resp.status_code}: {text_preview}")
+            return None
+
+        data = resp.json()
+        image_url = data.get("image_url")
+        print(f"✅ Clerk image_url für {clerk_user_id}: {image_url}")
+        return image_url
+    except CircuitOpenError as e:
+        # Fallback: ohne Avatar weiter
+        print(f"⚠️ {e} – Avatar für {clerk_user_id} übersprungen")
+        return None
+    except Exception as e:
+        print(f"⚠️ Fehler beim Laden des Clerk-Users {clerk_user_id}: {e}")
+        return None
+
+
+async def fetch_clerk_user_image_async(clerk_user_id: str, client) -> str | None:
+    """
+    Async-Variante von fetch_clerk_user_image mit einem httpx.AsyncClient
+    des Aufrufers (damit mehrere Calls eines Requests parallel laufen können).
+    Timeouts kommen vom Client: httpx.AsyncClient(timeout=httpx_timeout("clerk")).
+    """
+    secret = os.getenv("CLERK_SECRET_KEY")
+    if not secret or not clerk_user_id:
+        return None
+
+    clerk = dependency("clerk")
+    try:
+        with clerk.track() as call:
+            resp = await client.get(
+                f"{CLERK_API_BASE}/users/{clerk_user_id}",
+                headers={"Authorization": f"Bearer {secret}"},
+            )
+            if resp.status_code >= 500:
+                call.failed(f"HTTP {resp.status_code}")
+        if resp.status_code != 200:
+            text_preview = resp.text[:300].replace("\n", " ")
+            print(f"⚠️ Clerk API Fehler {resp.status_code}: {text_preview}")
+            return None
+        return resp.json().get("image_url")
+    except CircuitOpenError as e:
+        print(f"⚠️ {e} – Avatar für {clerk_user_id} übersprungen")
+        return None
+    except Exception as e:
+        print(f"⚠️ Fehler beim Laden des Clerk-Users {clerk_user_id}: {e}")
+        return None
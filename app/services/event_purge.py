@@ -0,0 +1,143 @@
+# app/services/event_purge.py
+"""
+Löschen von Events in zwei Schritten.
+
+DELETE /api/events/<id> markiert das Event nur (deleted_at) und reiht den
+Purge-Job ein – ein einziges UPDATE auf der Event-Zeile, die Antwort kommt
+sofort:
+
+    soft_delete_event(event)
+    db.session.commit()
+
+Der Job "event.purge" räumt danach die abhängigen Zeilen in Chunks ab
+(je Chunk ein DELETE ... WHERE id IN (SELECT ... LIMIT n) + Commit).
+Kinder der Chunk-Zeilen (user_event_option, booking_attendee,
+event_option_stats) entfernt Postgres über ON DELETE CASCADE, die ORM lädt
+nichts davon. Gesperrte user_event-Zeilen (laufender Webhook o.ä.) werden
+per SKIP LOCKED übersprungen und im nächsten Chunk erwischt, der Purge
+wartet also nie auf fremde Locks. Zum Schluss wird die Event-Zeile selbst
+gelöscht.
+
+Nach PURGE_TIME_BUDGET_SECS reiht sich der Job selbst wieder ein; läuft
+für das Event noch eine Massen-Erstattung, wartet der Purge auf deren Ende.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, select
+
+from app.extensions import db
+from app.models.event import Event
+from app.models.event_media import EventMedia
+from app.models.event_option import EventOption
+from app.models.user_event import UserEvent
+from app.models.waitlist_entry import WaitlistEntry
+from app.services.jobs import enqueue
+from app.services.sync import record_deletion
+
+PURGE_CHUNK_SIZE = 500
+PURGE_TIME_BUDGET_SECS = 240
+# Wartezeit, wenn noch eine Massen-Erstattung für das Event läuft
+PURGE_RETRY_DELAY = timedelta(minutes=5)
+# Wartezeit, wenn Buchungen beim Durchlauf gesperrt waren
+PURGE_LOCKED_RETRY_DELAY = timedelta(seconds=30)
+
+# Reihenfolge: erst die großen Tabellen, Optionen nach den Buchungen
+# (user_event_option hängt an beiden)
+PURGE_MODELS = (UserEvent, WaitlistEntry, EventMedia, EventOption)
+
+
+def soft_delete_event(event: Event) -> None:
+    """Markiert das Event als gelöscht + Tombstone + Purge-Job. Commit macht der Aufrufer."""
+    event.deleted_at = datetime.utcnow()
+    record_deletion("event", event.id, event_id=event.id)
+    enqueue("event.purge", {"event_id": event.id})
+
+
+def _delete_chunk(model, event_id: int, chunk_size: int) -> int:
+    ids = (
+        select(model.id)
+        .where(model.event_id == event_id)
+        .order_by(model.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def purge_event(
+    event_id: int,
+    chunk_size: int = PURGE_CHUNK_SIZE,
+    time_budget_secs: float = PURGE_TIME_BUDGET_SECS,
+) -> bool:
+    """
+    Löscht ein soft-gelöschtes Event samt abhängiger Zeilen (Job-Handler,
+    committet selbst). True = fertig, False = als neuer Job fortgesetzt.
+    """
+    from app.services.bulk_refund import active_refund_run
+
+    deleted_at = db.session.scalar(select(Event.deleted_at).where(Event.id == event_id))
+    if deleted_at is None:
+        # existiert nicht mehr oder wurde nie gelöscht
+        return True
+
+    if active_refund_run(event_id) is not None:
+        enqueue(
+            "event.purge",
+            {"event_id": event_id},
+            run_at=datetime.utcnow() + PURGE_RETRY_DELAY,
+        )
+        db.session.commit()
+        print(f"⏳ Purge Event {event_id}: Erstattung läuft noch, später erneut")
+        return False
+
+    deadline = time.monotonic() + time_budget_secs
+    removed = 0
+    for model in PURGE_MODELS:
+        while True:
+            count = _delete_chunk(model, event_id, chunk_size)
+            removed += count
+            if time.monotonic() > deadline:
+                # Zeitbudget aufgebraucht → Fortsetzung als neuer Job
+                enqueue("event.purge", {"event_id": event_id})
+                db.session.commit()
+                print(f"🧹 Purge Event {event_id}: {removed} Zeilen, wird fortgesetzt")
+                return False
+            if count == 0:
+                break
+
+    # übersprungene (gesperrte) Buchungen? → nächster Durchlauf
+    if db.session.scalar(select(UserEvent.id).where(UserEvent.event_id == event_id).limit(1)):
+        enqueue(
+            "event.purge",
+            {"event_id": event_id},
+            run_at=datetime.utcnow() + PURGE_LOCKED_RETRY_DELAY,
+        )
+        db.session.commit()
+        return False
+
+    # Rest (event_stats, event_option_stats, event_refund_run) per Cascade
+    db.session.execute(
+        delete(Event)
+        .where(Event.id == event_id, Event.deleted_at.is_not(None))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    print(f"🗑️ Event {event_id} gelöscht ({removed} abhängige Zeilen)")
+    return True
+
+
+def pending_purges(limit: Optional[int] = None) -> List[int]:
+    """IDs aller soft-gelöschten Events, die noch auf den Purge warten."""
+    stmt = select(Event.id).where(Event.deleted_at.is_not(None)).order_by(Event.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    return list(db.session.scalars(stmt))
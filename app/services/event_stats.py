@@ -0,0 +1,302 @@
+# app/services/event_stats.py
+"""
+Inkrementelle Pflege von event_stats / event_option_stats.
+
+Verwendung an jedem Status-Übergang einer Buchung (in derselben Transaktion):
+
+    before = booking_state(user_event)
+    ... user_event mutieren ...
+    track_booking_transition(user_event.event_id, before, booking_state(user_event))
+
+Für gelöschte Buchungen ist der Zustand danach None (track_booking_transition
+NACH db.session.delete aufrufen, damit die Teilnehmer-Vorschau stimmt).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+
+from app.extensions import db
+from app.models.event_option import EventOption
+from app.models.event_stats import EventStats, EventOptionStats
+from app.models.user_event import UserEvent, BookingStatus
+from app.models.user_event_option import UserEventOption
+
+# So viele Teilnehmer stehen in event_stats.participant_preview
+PARTICIPANT_PREVIEW_SIZE = 12
+
+STATUS_COLUMNS = {
+    BookingStatus.PENDING: "pending_count",
+    BookingStatus.PAID: "paid_count",
+    BookingStatus.CANCELED: "canceled_count",
+    BookingStatus.REFUND_PENDING: "refund_pending_count",
+    BookingStatus.REFUNDED: "refunded_count",
+    BookingStatus.FAILED: "failed_count",
+}
+
+
+class BookingState(NamedTuple):
+    """Für die Statistik relevanter Zustand einer Buchung."""
+
+    status: BookingStatus
+    revenue_cents: int
+    option_ids: Tuple[int, ...]
+    seats: int = 0
+
+
+def booking_state(user_event: Optional[UserEvent]) -> Optional[BookingState]:
+    """
+    Momentaufnahme einer Buchung. Umsatz, Optionen und Plätze zählen nur bei
+    PAID, daher werden die Optionen auch nur dann geladen.
+    """
+    if user_event is None:
+        return None
+
+    if user_event.status != BookingStatus.PAID:
+        return BookingState(user_event.status, 0, ())
+
+    option_ids = tuple(
+        db.session.scalars(
+            select(UserEventOption.event_option_id).where(
+                UserEventOption.user_event_id == user_event.id
+            )
+        )
+    )
+    return BookingState(
+        BookingStatus.PAID, user_event.amount_paid or 0, option_ids, user_event.seats or 1
+    )
+
+
+def _upsert_event_stats(event_id: int, deltas: dict):
+    values = {
+        col: deltas.get(col, 0)
+        for col in (*STATUS_COLUMNS.values(), "paid_seats", "revenue_cents")
+    }
+    stmt = pg_insert(EventStats).values(
+        event_id=event_id, updated_at=datetime.utcnow(), **values
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EventStats.event_id],
+        set_={
+            **{
+                col: getattr(EventStats, col) + stmt.excluded[col]
+                for col in deltas
+            },
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    return stmt
+
+
+def _upsert_option_stats(event_id: int, option_deltas: dict) -> list:
+    statements = []
+    for option_id, delta in option_deltas.items():
+        stmt = pg_insert(EventOptionStats).values(
+            event_option_id=option_id, event_id=event_id, selected_count=delta
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EventOptionStats.event_option_id],
+            set_={"selected_count": EventOptionStats.selected_count + delta},
+        )
+        statements.append(stmt)
+    return statements
+
+
+def _participant_preview_select(event_id):
+    """JSON-Array der ersten PARTICIPANT_PREVIEW_SIZE PAID-Teilnehmer (LIMIT über Index)."""
+    top = (
+        select(
+            UserEvent.id,
+            UserEvent.user_id,
+            UserEvent.avatar_url,
+            UserEvent.timestamp,
+            UserEvent.seats,
+        )
+        .where(UserEvent.event_id == event_id, UserEvent.status == BookingStatus.PAID)
+        .order_by(UserEvent.timestamp.asc(), UserEvent.id.asc())
+        .limit(PARTICIPANT_PREVIEW_SIZE)
+        # event_id kann event_stats.event_id der äußeren UPDATE-Zeile sein (refresh_event_stats)
+        .correlate(EventStats)
+        .subquery()
+    )
+    entry = func.json_build_object(
+        "user_id",
+        top.c.user_id,
+        "url",
+        top.c.avatar_url,
+        "registered_at",
+        top.c.timestamp,
+        "seats",
+        top.c.seats,
+    )
+    return select(
+        func.coalesce(
+            func.json_agg(aggregate_order_by(entry, top.c.timestamp.asc(), top.c.id.asc())),
+            func.json_build_array(),
+        )
+    ).scalar_subquery()
+
+
+def _update_participant_preview(event_id: int):
+    return (
+        update(EventStats)
+        .where(EventStats.event_id == event_id)
+        .values(participant_preview=_participant_preview_select(event_id))
+    )
+
+
+def refresh_participant_preview(event_id: int) -> None:
+    """Baut die Teilnehmer-Vorschau eines Events neu (z.B. nach nachgeladenem Avatar)."""
+    db.session.execute(_update_participant_preview(event_id))
+
+
+def booking_transition_statements(
+    event_id: int,
+    before: Optional[BookingState],
+    after: Optional[BookingState],
+) -> list:
+    """
+    UPSERT-Statements für den Übergang before → after (leer bei gleichem Zustand).
+    Für Aufrufer mit eigener Session (z.B. AsyncSession), sonst
+    track_booking_transition verwenden.
+    """
+    if before == after:
+        return []
+
+    deltas: dict = {}
+    option_deltas: dict = {}
+
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        col = STATUS_COLUMNS[state.status]
+        deltas[col] = deltas.get(col, 0) + sign
+        if state.seats:
+            deltas["paid_seats"] = deltas.get("paid_seats", 0) + sign * state.seats
+        if state.revenue_cents:
+            deltas["revenue_cents"] = deltas.get("revenue_cents", 0) + sign * state.revenue_cents
+        # Optionen gelten pro Platz
+        for option_id in state.option_ids:
+            option_deltas[option_id] = option_deltas.get(option_id, 0) + sign * (state.seats or 1)
+
+    deltas = {k: v for k, v in deltas.items() if v}
+    option_deltas = {k: v for k, v in option_deltas.items() if v}
+
+    statements = []
+    if deltas:
+        statements.append(_upsert_event_stats(event_id, deltas))
+    if option_deltas:
+        statements.extend(_upsert_option_stats(event_id, option_deltas))
+    # Teilnehmer-Vorschau ändert sich nur bei Übergängen von / nach PAID
+    if BookingStatus.PAID in (getattr(before, "status", None), getattr(after, "status", None)):
+        statements.append(_update_participant_preview(event_id))
+    return statements
+
+
+def track_booking_transition(
+    event_id: int,
+    before: Optional[BookingState],
+    after: Optional[BookingState],
+) -> None:
+    """
+    Verbucht den Übergang before → after als Delta in event_stats.
+    Gleiche Zustände (z.B. doppelt zugestellter Webhook) erzeugen kein Delta.
+    Commit macht der Aufrufer.
+    """
+    for stmt in booking_transition_statements(event_id, before, after):
+        db.session.execute(stmt)
+
+
+def refresh_event_stats(event_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Berechnet event_stats / event_option_stats komplett neu aus user_event
+    (für alle Events oder nur die angegebenen). Commit macht der Aufrufer.
+    """
+    event_ids = list(event_ids) if event_ids is not None else None
+
+    delete_stats = delete(EventStats)
+    delete_option_stats = delete(EventOptionStats)
+    if event_ids is not None:
+        delete_stats = delete_stats.where(EventStats.event_id.in_(event_ids))
+        delete_option_stats = delete_option_stats.where(
+            EventOptionStats.event_id.in_(event_ids)
+        )
+    db.session.execute(delete_stats)
+    db.session.execute(delete_option_stats)
+
+    is_paid = UserEvent.status == BookingStatus.PAID
+    stats_select = select(
+        UserEvent.event_id,
+        *[
+            func.count(UserEvent.id).filter(UserEvent.status == status).label(col)
+            for status, col in STATUS_COLUMNS.items()
+        ],
+        func.coalesce(func.sum(UserEvent.seats).filter(is_paid), 0).label("paid_seats"),
+        func.coalesce(func.sum(UserEvent.amount_paid).filter(is_paid), 0).label(
+            "revenue_cents"
+        ),
+        func.now().label("updated_at"),
+    ).group_by(UserEvent.event_id)
+
+    option_select = (
+        select(
+            UserEventOption.event_option_id,
+            EventOption.event_id,
+            func.sum(UserEvent.seats).label("selected_count"),
+        )
+        .join(UserEvent, UserEvent.id == UserEventOption.user_event_id)
+        .join(EventOption, EventOption.id == UserEventOption.event_option_id)
+        .where(is_paid)
+        .group_by(UserEventOption.event_option_id, EventOption.event_id)
+    )
+
+    if event_ids is not None:
+        stats_select = stats_select.where(UserEvent.event_id.in_(event_ids))
+        option_select = option_select.where(EventOption.event_id.in_(event_ids))
+
+    db.session.execute(
+        insert(EventStats).from_select(
+            ["event_id", *STATUS_COLUMNS.values(), "paid_seats", "revenue_cents", "updated_at"],
+            stats_select,
+        )
+    )
+    db.session.execute(
+        insert(EventOptionStats).from_select(
+            ["event_option_id", "event_id", "selected_count"],
+            option_select,
+        )
+    )
+
+    preview_update = update(EventStats).values(
+        participant_preview=_participant_preview_select(EventStats.event_id)
+    )
+    if event_ids is not None:
+        preview_update = preview_update.where(EventStats.event_id.in_(event_ids))
+    db.session.execute(preview_update)
+
+
+def get_event_stats(event_id: int) -> dict:
+    """Liest die vorberechneten Kennzahlen eines Events (Primärschlüssel-Lookup)."""
+    stats = db.session.get(EventStats, event_id)
+    option_rows = db.session.execute(
+        select(EventOptionStats.event_option_id, EventOptionStats.selected_count).where(
+            EventOptionStats.event_id == event_id
+        )
+    ).all()
+
+    return {
+        "event_id": event_id,
+        "bookings": {
+            status.value: getattr(stats, col) if stats else 0
+            for status, col in STATUS_COLUMNS.items()
+        },
+        "paid_seats": stats.paid_seats if stats else 0,
+        "revenue_cents": stats.revenue_cents if stats else 0,
+        "option_selections": {
+            str(option_id): count for option_id, count in option_rows
+        },
+        "updated_at": stats.updated_at.isoformat() if stats else None,
+    }
@@ -0,0 +1,182 @@
+# app/services/job_handlers.py
+"""
+Handler für langsame / fehleranfällige Seiteneffekte, die nicht mehr im
+Request-Thread laufen (Stripe-Refunds und -Cancels, Massen-Erstattungen,
+Clerk-Avatare, Warteliste).
+
+Handler werfen bei vorübergehenden Fehlern eine Exception → Retry mit Backoff.
+"""
+import os
+
+import stripe
+
+from app.extensions import db
+from app.models.user_event import UserEvent, BookingStatus
+from app.services.clerk import fetch_clerk_user_image
+from app.services.event_stats import refresh_participant_preview
+from app.services.jobs import enqueue, job_handler
+from app.services.outbound import CircuitOpenError, dependency
+from app.services.payments import (
+    CANCELABLE_PI_STATUSES,
+    complete_booking_refund,
+    record_booking_refund_error,
+)
+from app.services import waitlist
+
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+
+@job_handler("stripe.cancel_payment_intent", max_concurrency=8)
+def cancel_payment_intent(payload: dict) -> None:
+    """payload: {"payment_intent_id": "pi_..."}"""
+    payment_intent_id = payload["payment_intent_id"]
+
+    pi = stripe.PaymentIntent.retrieve(payment_intent_id)
+    if pi.status not in CANCELABLE_PI_STATUSES:
+        print(f"ℹ️ PaymentIntent {payment_intent_id} ist {pi.status} – nichts zu canceln")
+        return
+
+    try:
+        stripe.PaymentIntent.cancel(payment_intent_id)
+        print(f"✅ PaymentIntent {payment_intent_id} gecancelt")
+    except stripe.error.InvalidRequestError as e:
+        # Status hat sich inzwischen geändert (z.B. schon gecancelt) → kein Retry
+        print(f"⚠️ PaymentIntent {payment_intent_id} nicht cancelbar: {e}")
+
+
+@job_handler("stripe.refund", max_concurrency=8)
+def refund_payment(payload: dict) -> None:
+    """
+    payload: {"user_event_id": 1, "payment_intent_id": "pi_...", "amount": 4500}
+
+    Erfolg → Buchung REFUND_PENDING → REFUNDED. Fehler bleiben an der Buchung
+    stehen (refund_error), auch wenn der Job endgültig scheitert.
+    """
+    try:
+        stripe.Refund.create(
+            payment_intent=payload["payment_intent_id"],
+            amount=payload["amount"],
+            # gleicher Key bei jedem Retry → Stripe erstattet höchstens einmal
+            idempotency_key=f"refund-{payload['user_event_id']}-{payload['payment_intent_id']}",
+        )
+    except Exception as e:
+        record_booking_refund_error(payload["user_event_id"], f"{type(e).__name__}: {e}")
+        raise
+
+    complete_booking_refund(payload["user_event_id"])
+    db.session.commit()
+    print(
+        f"💸 Refund über {payload['amount']} für Buchung {payload['user_event_id']} erstellt"
+    )
+
+
+@job_handler("stripe.refund_payment_intent", max_concurrency=8)
+def refund_orphaned_payment(payload: dict) -> None:
+    """
+    payload: {"payment_intent_id": "pi_..."}
+
+    Voller Refund einer Zahlung, die keiner Buchung zugeordnet wurde
+    (Buchung storniert / neu gebucht, bevor der Webhook kam).
+    """
+    payment_intent_id = payload["payment_intent_id"]
+    stripe.Refund.create(
+        payment_intent=payment_intent_id,
+        idempotency_key=f"refund-orphaned-{payment_intent_id}",
+    )
+    print(f"💸 Nicht zugeordnete Zahlung {payment_intent_id} erstattet")
+
+
+@job_handler("clerk.fetch_avatar", max_concurrency=4)
+def fetch_avatar(payload: dict) -> None:
+    """payload: {"user_event_id": 1, "user_id": "user_..."}"""
+    clerk = dependency("clerk")
+    if not clerk.available:
+        # Clerk gestört → Retry mit Backoff statt den Avatar zu verlieren
+        raise CircuitOpenError("clerk", clerk.breaker.reset_secs)
+
+    avatar_url = fetch_clerk_user_image(payload["user_id"])
+    if not avatar_url:
+        return
+
+    user_event = db.session.get(UserEvent, payload["user_event_id"])
+    if user_event and not user_event.avatar_url:
+        user_event.avatar_url = avatar_url
+        # Avatar kann nach der Zahlung kommen → Vorschau nachziehen
+        if user_event.status == BookingStatus.PAID:
+            refresh_participant_preview(user_event.event_id)
+        db.session.commit()
+
+
+@job_handler("waitlist.promote")
+def promote_waitlist(payload: dict) -> None:
+    """payload: {"event_id": 1}"""
+    offered = [e.user_id for e in waitlist.promote_waitlist(payload["event_id"])]
+    db.session.commit()
+    if offered:
+        print(f"🎟️ Warteliste Event {payload['event_id']}: Angebot an {', '.join(offered)}")
+
+
+@job_handler("waitlist.expire_offer")
+def expire_waitlist_offer(payload: dict) -> None:
+    """payload: {"entry_id": 1}"""
+    if waitlist.expire_offer(payload["entry_id"]):
+        print(f"⌛ Wartelisten-Angebot {payload['entry_id']} verfallen")
+    db.session.commit()
+
+
+@job_handler("event.bulk_refund", max_concurrency=1)
+def bulk_refund_event(payload: dict) -> None:
+    """payload: {"run_id": 1}"""
+    from app.services.bulk_refund import record_refund_run_error, run_event_refund
+
+    try:
+        run_event_refund(payload["run_id"])
+    except Exception as e:
+        record_refund_run_error(payload["run_id"], f"{type(e).__name__}: {e}")
+        raise
+
+
+@job_handler("event.purge", max_concurrency=2)
+def purge_deleted_event(payload: dict) -> None:
+    """payload: {"event_id": 1}"""
+    from app.services.event_purge import purge_event
+
+    purge_event(payload["event_id"])
+
+
+@job_handler("stripe.reconcile_pending", max_concurrency=1)
+def reconcile_pending(payload: dict) -> None:
+    """
+    payload: {"stale_after_minutes": 30, "batch_size": 100, "limit": null,
+              "abandon_after_hours": 24, "after_id": 0}
+
+    Nach RECONCILE_TIME_BUDGET_SECS reiht sich der Job ab after_id selbst
+    wieder ein (wie event.bulk_refund / event.purge).
+    """
+    from app.services.reconciliation import (
+        ABANDON_AFTER_HOURS,
+        RECONCILE_TIME_BUDGET_SECS,
+        reconcile_pending_bookings,
+    )
+
+    limit = payload.get("limit")
+    report = reconcile_pending_bookings(
+        stale_after_minutes=payload.get("stale_after_minutes", 30),
+        batch_size=payload.get("batch_size", 100),
+        limit=limit,
+        abandon_after_hours=payload.get("abandon_after_hours", ABANDON_AFTER_HOURS),
+        time_budget_secs=RECONCILE_TIME_BUDGET_SECS,
+        after_id=payload.get("after_id", 0),
+    )
+    print(f"🧾 Stripe-Reconciliation: {report}")
+
+    if report.get("next_after_id") is not None:
+        enqueue(
+            "stripe.reconcile_pending",
+            {
+                **payload,
+                "after_id": report["next_after_id"],
+                "limit": limit - report["stale_bookings"] if limit is not None else None,
+            },
+        )
+        db.session.commit()
@@ -0,0 +1,347 @@
+# app/services/jobs.py
+"""
+Leichtgewichtige Job-Queue auf Postgres (Tabelle job).
+
+Einreihen (im selben Commit wie die fachliche Änderung):
+
+    enqueue("stripe.refund", {"user_event_id": 1, ...})
+    db.session.commit()
+
+Handler registrieren:
+
+    @job_handler("stripe.refund", max_concurrency=4)
+    def refund(payload: dict) -> None: ...
+
+Worker starten: `flask jobs worker --concurrency 4`
+"""
+from __future__ import annotations
+
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from flask import Flask
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models.job import Job, JobStatus
+
+BACKOFF_BASE_SECS = 5
+BACKOFF_MAX_SECS = 3600
+# RUNNING-Jobs ohne Lebenszeichen gelten danach als verwaist (Worker abgestürzt)
+STALE_AFTER_SECS = 900
+# so oft frischt der Worker locked_at seiner laufenden Jobs auf (Lebenszeichen)
+HEARTBEAT_SECS = 60
+# Kandidaten pro freiem Slot beim Claimen – Jobs über max_concurrency bleiben liegen
+CLAIM_OVERFETCH = 4
+
+
+class _Handler:
+    def __init__(self, func: Callable[[dict], None], max_concurrency: Optional[int]):
+        self.func = func
+        self.max_concurrency = max_concurrency
+
+
+_handlers: Dict[str, _Handler] = {}
+
+
+def job_handler(name: str, max_concurrency: Optional[int] = None):
+    """
+    Registriert eine Funktion als Handler für Jobs mit diesem Namen.
+    max_concurrency begrenzt gleichzeitig laufende Jobs dieses Namens über
+    alle Worker hinweg (best effort, geprüft beim Claimen – zwei Worker, die
+    gleichzeitig claimen, können die Grenze überschreiten).
+    """
+
+    def decorator(func: Callable[[dict], None]):
+        _handlers[name] = _Handler(func, max_concurrency)
+        return func
+
+    return decorator
+
+
+def enqueue(
+    name: str,
+    payload: Optional[dict] = None,
+    *,
+    queue: str = "default",
+    run_at: Optional[datetime] = None,
+    max_attempts: int = 5,
+    session=None,
+) -> Job:
+    """
+    Reiht einen Job ein. Es wird NICHT committet – der Job wird zusammen mit
+    der fachlichen Änderung des Aufrufers sichtbar (oder gar nicht).
+    session: andere Session als db.session (z.B. AsyncSession), add() ist bei beiden gleich.
+    """
+    job = Job(
+        queue=queue,
+        name=name,
+        payload=payload or {},
+        status=JobStatus.QUEUED,
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts,
+    )
+    (session or db.session).add(job)
+    return job
+
+
+def _backoff_secs(attempts: int) -> float:
+    delay = min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _free_slots() -> Dict[str, int]:
+    """Job-Name → wie viele Jobs dieses Namens noch starten dürfen (nur mit max_concurrency)."""
+    limited = {n: h.max_concurrency for n, h in _handlers.items() if h.max_concurrency}
+    if not limited:
+        return {}
+    running = dict(
+        db.session.execute(
+            select(Job.name, func.count(Job.id))
+            .where(Job.status == JobStatus.RUNNING, Job.name.in_(list(limited)))
+            .group_by(Job.name)
+        ).all()
+    )
+    return {name: max(0, limit - running.get(name, 0)) for name, limit in limited.items()}
+
+
+def claim_jobs(worker_id: str, queues: Iterable[str], limit: int) -> List[int]:
+    """
+    Holt bis zu limit fällige Jobs und markiert sie als RUNNING.
+    SKIP LOCKED: parallele Worker überspringen gesperrte Zeilen statt zu warten.
+    Pro Name höchstens max_concurrency - laufende, auch innerhalb eines Claims.
+    """
+    now = datetime.utcnow()
+    free = _free_slots()
+    stmt = (
+        select(Job)
+        .where(
+            Job.status == JobStatus.QUEUED,
+            Job.queue.in_(list(queues)),
+            Job.run_at <= now,
+        )
+        .order_by(Job.run_at.asc(), Job.id.asc())
+        .limit(limit * CLAIM_OVERFETCH)
+        .with_for_update(skip_locked=True)
+    )
+    saturated = [name for name, slots in free.items() if slots == 0]
+    if saturated:
+        stmt = stmt.where(Job.name.not_in(saturated))
+
+    jobs = []
+    for job in db.session.scalars(stmt):
+        if len(jobs) == limit:
+            break
+        if job.name in free:
+            if free[job.name] == 0:
+                continue
+            free[job.name] -= 1
+        jobs.append(job)
+
+    for job in jobs:
+        job.status = JobStatus.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.started_at = now
+        job.attempts += 1
+    db.session.commit()
+    return [job.id for job in jobs]
+
+
+def heartbeat_jobs(worker_id: str, job_ids: Iterable[int]) -> None:
+    """Lebenszeichen: locked_at laufender Jobs auffrischen, damit recover_stale_jobs sie nicht neu einplant."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    db.session.execute(
+        update(Job)
+        .where(
+            Job.id.in_(job_ids),
+            Job.status == JobStatus.RUNNING,
+            Job.locked_by == worker_id,
+        )
+        .values(locked_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def run_job(job_id: int) -> None:
+    """Führt einen geclaimten Job aus und verbucht Erfolg / Retry / Fehlschlag."""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return
+
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f"Kein Handler für Job {job.name!r} registriert")
+        handler.func(dict(job.payload or {}))
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = f"{type(e).__name__}: {e}"[:2000]
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.FAILED
+            job.finished_at = datetime.utcnow()
+            print(f"❌ Job {job.id} ({job.name}) endgültig fehlgeschlagen: {e}")
+        else:
+            job.status = JobStatus.QUEUED
+            job.run_at = datetime.utcnow() + timedelta(seconds=_backoff_secs(job.attempts))
+            print(f"🔁 Job {job.id} ({job.name}) Versuch {job.attempts} fehlgeschlagen: {e}")
+        db.session.commit()
+        return
+
+    job = db.session.get(Job, job_id)
+    job.status = JobStatus.DONE
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    job.locked_at = None
+    job.last_error = None
+    db.session.commit()
+
+
+def recover_stale_jobs(stale_after_secs: int = STALE_AFTER_SECS) -> int:
+    """
+    Setzt RUNNING-Jobs abgestürzter Worker zurück auf QUEUED. Laufende Jobs
+    frischt ihr Worker alle HEARTBEAT_SECS auf (heartbeat_jobs), lange Jobs
+    gelten also nicht als verwaist.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after_secs)
+    result = db.session.execute(
+        update(Job)
+        .where(Job.status == JobStatus.RUNNING, Job.locked_at < cutoff)
+        .values(status=JobStatus.QUEUED, locked_by=None, locked_at=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _load_handlers() -> None:
+    # Import registriert die Handler per @job_handler
+    import app.services.job_handlers  # noqa: F401
+
+
+def run_worker(
+    app: Flask,
+    queues: Iterable[str] = ("default",),
+    concurrency: int = 4,
+    poll_interval: float = 1.0,
+    burst: bool = False,
+) -> None:
+    """
+    Worker-Loop: claimt so viele Jobs wie Threads frei sind und führt sie
+    parallel aus. burst=True beendet den Worker, sobald die Queue leer ist.
+    SIGTERM / Ctrl+C: keine neuen Jobs mehr, laufende werden fertig gemacht.
+    """
+    _load_handlers()
+    queues = list(queues)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop = threading.Event()
+    inflight: set = set()
+    inflight_lock = threading.Lock()
+
+    def _handle_signal(signum, frame):
+        print(f"🛑 Worker {worker_id}: Stop-Signal erhalten, beende nach laufenden Jobs")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    # eigener Thread: läuft auch weiter, während der Pool nach dem Stop-Signal leerläuft
+    heartbeat_stop = threading.Event()
+
+    def _heartbeat() -> None:
+        while not heartbeat_stop.wait(HEARTBEAT_SECS):
+            with inflight_lock:
+                running = list(inflight)
+            try:
+                with app.app_context():
+                    heartbeat_jobs(worker_id, running)
+            except Exception as e:
+                print(f"⚠️ Worker {worker_id}: Heartbeat fehlgeschlagen: {e}")
+
+    heartbeat = threading.Thread(target=_heartbeat, name="jobs-heartbeat", daemon=True)
+    heartbeat.start()
+
+    def _execute(job_id: int) -> None:
+        try:
+            with app.app_context():
+                run_job(job_id)
+        finally:
+            with inflight_lock:
+                inflight.discard(job_id)
+
+    print(f"👷 Worker {worker_id} gestartet (queues={queues}, concurrency={concurrency})")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        last_recovery = 0.0
+        while not stop.is_set():
+            with app.app_context():
+                if time.monotonic() - last_recovery > 60:
+                    recovered = recover_stale_jobs()
+                    if recovered:
+                        print(f"♻️ {recovered} verwaiste Jobs neu eingeplant")
+                    last_recovery = time.monotonic()
+
+                with inflight_lock:
+                    free = concurrency - len(inflight)
+                job_ids = claim_jobs(worker_id, queues, free) if free > 0 else []
+
+            for job_id in job_ids:
+                with inflight_lock:
+                    inflight.add(job_id)
+                pool.submit(_execute, job_id)
+
+            if not job_ids:
+                with inflight_lock:
+                    idle = not inflight
+                if burst and idle:
+                    break
+                stop.wait(poll_interval)
+
+    heartbeat_stop.set()
+    heartbeat.join()
+    print(f"👋 Worker {worker_id} beendet")
+
+
+def queue_stats() -> dict:
+    """
+    Sichtbarkeit der Queue: Anzahl pro Queue/Status, Alter des ältesten
+    fälligen Jobs und Wartezeit (run_at → started_at) der letzten Stunde.
+    """
+    now = datetime.utcnow()
+
+    counts: Dict[str, Dict[str, int]] = {}
+    for queue, status, count in db.session.execute(
+        select(Job.queue, Job.status, func.count(Job.id)).group_by(Job.queue, Job.status)
+    ):
+        counts.setdefault(queue, {})[status.value] = count
+
+    oldest_due = db.session.scalar(
+        select(func.min(Job.run_at)).where(
+            Job.status == JobStatus.QUEUED, Job.run_at <= now
+        )
+    )
+
+    latency = db.session.execute(
+        select(
+            func.avg(func.extract("epoch", Job.started_at - Job.run_at)),
+            func.max(func.extract("epoch", Job.started_at - Job.run_at)),
+        ).where(Job.started_at >= now - timedelta(hours=1))
+    ).one()
+
+    return {
+        "counts": counts,
+        "oldest_due_age_secs": (now - oldest_due).total_seconds() if oldest_due else 0,
+        "latency_last_hour_avg_secs": float(latency[0]) if latency[0] is not None else None,
+        "latency_last_hour_max_secs": float(latency[1]) if latency[1] is not None else None,
+    }
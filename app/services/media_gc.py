@@ -0,0 +1,98 @@
+# app/services/media_gc.py
+"""
+Garbage Collector für verwaiste Blobs unter events/.
+
+Verwaist ist ein Blob, wenn er von keinem EventMedia referenziert wird
+(weder blob_name noch poster_blob noch ein Eintrag in variants_json) –
+z.B. nach delete_media / delete_event oder bei SAS-Uploads, die nie per
+attach_media_after_upload verknüpft wurden.
+
+Blobs, die jünger als die Grace-Period sind, bleiben immer stehen, damit
+laufende Uploads (SAS ausgestellt, attach noch nicht erfolgt) und frisch
+erzeugte Varianten nicht gelöscht werden.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Set
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.event_media import EventMedia
+from app.services.blob_store import get_blob_store
+
+MEDIA_PREFIX = "events/"
+
+
+def collect_referenced_blobs() -> Set[str]:
+    """Alle Blob-Namen, die noch von EventMedia referenziert werden."""
+    referenced: Set[str] = set()
+    rows = db.session.execute(
+        select(EventMedia.blob_name, EventMedia.poster_blob, EventMedia.variants_json)
+        .execution_options(yield_per=5000)
+    )
+    for blob_name, poster_blob, variants in rows:
+        referenced.add(blob_name)
+        if poster_blob:
+            referenced.add(poster_blob)
+        if variants:
+            referenced.update(v for v in variants.values() if isinstance(v, str))
+    return referenced
+
+
+def run_media_gc(
+    dry_run: bool = True,
+    grace_hours: float = 24,
+    page_size: int = 1000,
+    prefix: str = MEDIA_PREFIX,
+    store=None,
+) -> dict:
+    """
+    Gleicht das Container-Listing seitenweise gegen die DB ab und löscht
+    verwaiste Blobs pro Seite im Batch.
+
+    :param dry_run: nur zählen, nichts löschen
+    :param grace_hours: Blobs jünger als das werden nie gelöscht
+    :param page_size: Blobs pro Listing-Seite (= max. Größe eines Lösch-Batches)
+    :return: Kennzahlen (Zähler, Dauer, Durchsatz)
+    """
+    store = store or get_blob_store()
+    started = time.monotonic()
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+
+    referenced = collect_referenced_blobs()
+
+    stats = {
+        "dry_run": dry_run,
+        "referenced_in_db": len(referenced),
+        "pages": 0,
+        "listed": 0,
+        "referenced": 0,
+        "too_recent": 0,
+        "orphaned": 0,
+        "deleted": 0,
+    }
+
+    for page in store.list_pages(prefix, page_size=page_size):
+        stats["pages"] += 1
+        stats["listed"] += len(page)
+
+        orphans = []
+        for name, last_modified in page:
+            if name in referenced:
+                stats["referenced"] += 1
+            elif last_modified and last_modified > cutoff:
+                stats["too_recent"] += 1
+            else:
+                orphans.append(name)
+
+        stats["orphaned"] += len(orphans)
+        if orphans and not dry_run:
+            stats["deleted"] += store.delete_many(orphans)
+
+    elapsed = time.monotonic() - started
+    stats["elapsed_secs"] = round(elapsed, 3)
+    stats["listed_per_sec"] = round(stats["listed"] / elapsed, 1) if elapsed else None
+    return stats
@@ -0,0 +1,193 @@
+# app/services/media_pipeline.py
+"""
+Server-seitige Media-Pipeline: erzeugt nach dem Upload Bild-Varianten
+(thumb / medium / webp) und Video-Poster und trägt sie in EventMedia ein.
+
+Die eigentliche Bildverarbeitung läuft in einem ProcessPool (CPU-lastig,
+blockiert so keine Web-Worker). Das Zurückschreiben in die DB passiert im
+Hauptprozess im App-Kontext.
+"""
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from flask import Flask
+
+from app.extensions import db
+from app.models.event_media import EventMedia, MediaType
+from app.services.blob_store import get_blob_store
+
+# name → (max. Kantenlänge in px, Pillow-Format, Dateiendung, Content-Type)
+VARIANT_SPECS = {
+    "thumb": (320, "JPEG", "jpg", "image/jpeg"),
+    "medium": (1280, "JPEG", "jpg", "image/jpeg"),
+    "webp": (1280, "WEBP", "webp", "image/webp"),
+}
+
+POSTER_OFFSET_SECS = 1
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def pipeline_enabled() -> bool:
+    return os.getenv("MEDIA_PIPELINE_ENABLED", "true").lower() == "true"
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv("MEDIA_PIPELINE_WORKERS", "2")),
+            # spawn: keine geerbten DB-Verbindungen / Locks im Kindprozess
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _variant_blob_name(blob_name: str, variant: str, ext: str) -> str:
+    base = blob_name.rsplit(".", 1)[0]
+    return f"{base}_{variant}.{ext}"
+
+
+def _render_variants(store, blob_name: str, image_bytes: bytes) -> dict:
+    """Skaliert ein Bild in alle VARIANT_SPECS und lädt die Ergebnisse hoch."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        variants = {}
+
+        for name, (max_edge, fmt, ext, content_type) in VARIANT_SPECS.items():
+            copy = img.copy()
+            copy.thumbnail((max_edge, max_edge))
+            if fmt == "JPEG" and copy.mode not in ("RGB", "L"):
+                copy = copy.convert("RGB")
+
+            out = io.BytesIO()
+            copy.save(out, format=fmt, quality=82)
+
+            variant_blob = _variant_blob_name(blob_name, name, ext)
+            store.write(variant_blob, out.getvalue(), content_type=content_type)
+            variants[name] = variant_blob
+
+    return {"variants": variants, "width": width, "height": height}
+
+
+def _extract_poster(video_bytes: bytes) -> Optional[bytes]:
+    """Zieht per ffmpeg ein Standbild aus dem Video (None, wenn ffmpeg fehlt)."""
+    if not shutil.which("ffmpeg"):
+        print("⚠️ ffmpeg nicht gefunden – kein Video-Poster erzeugt.")
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "src")
+        dst = os.path.join(tmp, "poster.jpg")
+        with open(src, "wb") as f:
+            f.write(video_bytes)
+
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-ss", str(POSTER_OFFSET_SECS), "-i", src,
+                "-frames:v", "1", dst,
+            ],
+            check=True,
+            timeout=120,
+        )
+        if not os.path.exists(dst):
+            return None
+        with open(dst, "rb") as f:
+            return f.read()
+
+
+def process_media(blob_name: str, media_type: str) -> dict:
+    """
+    Läuft im Worker-Prozess: lädt das Original, erzeugt Varianten/Poster.
+
+    :return: {"variants": {...}, "poster_blob": str|None, "width": int|None, "height": int|None}
+    """
+    store = get_blob_store()
+    original = store.read(blob_name)
+    result = {"variants": {}, "poster_blob": None, "width": None, "height": None}
+
+    if media_type == MediaType.image.value:
+        result.update(_render_variants(store, blob_name, original))
+
+    elif media_type == MediaType.video.value:
+        poster = _extract_poster(original)
+        if poster:
+            poster_blob = _variant_blob_name(blob_name, "poster", "jpg")
+            store.write(poster_blob, poster, content_type="image/jpeg")
+            result["poster_blob"] = poster_blob
+            # Varianten vom Poster, damit Listen auch für Videos ein Thumbnail haben
+            rendered = _render_variants(store, poster_blob, poster)
+            result["variants"] = rendered["variants"]
+            result["width"] = rendered["width"]
+            result["height"] = rendered["height"]
+
+    return result
+
+
+def apply_processing_result(media_id: int, result: dict) -> None:
+    """Schreibt das Ergebnis in EventMedia (Client-Werte bleiben, Server-Varianten gewinnen)."""
+    media = db.session.get(EventMedia, media_id)
+    if not media:
+        # Media wurde in der Zwischenzeit gelöscht
+        return
+
+    if result["variants"]:
+        media.variants_json = {**(media.variants_json or {}), **result["variants"]}
+    if result["poster_blob"] and not media.poster_blob:
+        media.poster_blob = result["poster_blob"]
+    if result["width"] and not media.width:
+        media.width = result["width"]
+    if result["height"] and not media.height:
+        media.height = result["height"]
+
+    db.session.commit()
+
+
+def _on_done(app: Flask, media_id: int, future: Future) -> None:
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"⚠️ Media-Pipeline fehlgeschlagen für Media {media_id}: {e}")
+        return
+
+    with app.app_context():
+        try:
+            apply_processing_result(media_id, result)
+            print(f"🖼️ Varianten für Media {media_id} gespeichert: {list(result['variants'])}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Konnte Varianten für Media {media_id} nicht speichern: {e}")
+
+
+def enqueue_media_processing(app: Flask, media_items: Iterable[EventMedia]) -> None:
+    """
+    Schickt Media-Items in den ProcessPool. Kehrt sofort zurück.
+    Nur Bilder und Videos werden verarbeitet.
+    """
+    if not pipeline_enabled():
+        return
+
+    for media in media_items:
+        if media.type not in (MediaType.image, MediaType.video):
+            continue
+        future = _get_executor().submit(process_media, media.blob_name, media.type.value)
+        future.add_done_callback(
+            lambda f, media_id=media.id: _on_done(app, media_id, f)
+        )
+
+
+def process_media_sync(media: EventMedia) -> None:
+    """Verarbeitet ein Media-Item direkt im aktuellen Prozess (CLI / Backfill)."""
+    apply_processing_result(media.id, process_media(media.blob_name, media.type.value))
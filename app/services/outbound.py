@@ -0,0 +1,412 @@
+# app/services/outbound.py
+"""
+Gemeinsame Schicht für ausgehende HTTP-Calls (Clerk, Stripe, Azure Blob).
+
+Pro Abhängigkeit gibt es
+- einen Keep-Alive-Connection-Pool (requests.Session mit HTTPAdapter),
+- feste Connect-/Read-Timeouts (ENV: <NAME>_CONNECT_TIMEOUT_SECS / <NAME>_READ_TIMEOUT_SECS),
+- einen Circuit Breaker: nach OUTBOUND_BREAKER_FAILURES Fehlern in Folge ist
+  er offen und Calls scheitern sofort mit CircuitOpenError, statt Worker
+  sekundenlang zu blockieren; nach OUTBOUND_BREAKER_RESET_SECS lässt er EINEN
+  Probe-Call durch (half-open) – Erfolg schließt ihn, Fehler öffnet ihn wieder,
+- Metriken (Calls, Fehler, abgewiesene Calls, Latenz) für GET /ops/dependencies.
+
+Fehler = Exception oder HTTP 5xx; 4xx sind normale Antworten der Gegenseite.
+
+    with dependency("clerk").track() as call:
+        resp = dependency("clerk").session.get(url, timeout=dependency("clerk").timeout)
+        if resp.status_code >= 500:
+            call.failed(f"HTTP {resp.status_code}")
+
+Stripe und Azure laufen über eigene HTTP-Clients der SDKs (install_stripe_client,
+azure_transport), der Code, der die SDKs aufruft, bleibt unverändert.
+Breaker und Metriken gelten pro Prozess.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Latenz-Buckets in Millisekunden (letzter Bucket: alles darüber)
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+# so viele letzte Latenzen halten wir für p50 / p95
+LATENCY_SAMPLES = 512
+
+BREAKER_FAILURES = int(os.getenv("OUTBOUND_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECS = float(os.getenv("OUTBOUND_BREAKER_RESET_SECS", "30"))
+POOL_SIZE = int(os.getenv("OUTBOUND_POOL_SIZE", "20"))
+# Retry-After bei nicht erreichbarem Stripe ohne bekannte Probe-Zeit
+STRIPE_RETRY_AFTER_SECS = 5
+
+# (connect, read) in Sekunden
+DEFAULT_TIMEOUTS = {
+    "clerk": (2.0, 3.0),
+    "stripe": (3.0, 20.0),
+    "azure": (3.0, 30.0),
+}
+
+
+class CircuitOpenError(Exception):
+    """Abhängigkeit gilt als gestört, der Call wurde gar nicht erst abgesetzt."""
+
+    def __init__(self, name: str, retry_in_secs: float):
+        super().__init__(f"{name} vorübergehend deaktiviert (Circuit offen, Probe in {retry_in_secs:.0f}s)")
+        self.name = name
+        self.retry_in_secs = retry_in_secs
+
+
+class CircuitBreaker:
+    """closed → (n Fehler in Folge) → open → (reset_secs) → half_open → closed / open"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_secs: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_secs = reset_secs
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_secs:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        """Wirft CircuitOpenError, wenn der Call nicht abgesetzt werden darf."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_secs:
+                raise CircuitOpenError(self.name, self.reset_secs - waited)
+            # half-open: genau ein Probe-Call gleichzeitig
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, 0)
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"✅ Circuit {self.name} wieder geschlossen")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"🔌 Circuit {self.name} geöffnet nach {self._failures} Fehlern")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class DependencyMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latency_ms_sum = 0.0
+        self.latency_ms_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+
+    def record(self, latency_ms: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.calls += 1
+            self.latency_ms_sum += latency_ms
+            self.latency_ms_max = max(self.latency_ms_max, latency_ms)
+            self.samples.append(latency_ms)
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if latency_ms <= bound:
+                    self.buckets[i] += 1
+                    break
+            else:
+                self.buckets[-1] += 1
+            if error is not None:
+                self.errors += 1
+                self.last_error = error[:300]
+                self.last_error_at = time.time()
+
+    def record_rejected(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self.samples)
+
+            def percentile(p: float) -> Optional[float]:
+                if not samples:
+                    return None
+                return round(samples[min(len(samples) - 1, int(len(samples) * p))], 1)
+
+            labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+                "latency_ms": {
+                    "avg": round(self.latency_ms_sum / self.calls, 1) if self.calls else None,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "max": round(self.latency_ms_max, 1),
+                    "buckets": dict(zip(labels, self.buckets)),
+                },
+                "last_error": self.last_error,
+                "last_error_at": self.last_error_at,
+            }
+
+
+class _CallOutcome:
+    """Lässt den Aufrufer eine Antwort ohne Exception (z.B. HTTP 5xx) als Fehler melden."""
+
+    __slots__ = ("error",)
+
+    def __init__(self):
+        self.error: Optional[str] = None
+
+    def failed(self, error: str) -> None:
+        self.error = error
+
+
+class Dependency:
+    def __init__(self, name: str, timeout: Tuple[float, float]):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(name, BREAKER_FAILURES, BREAKER_RESET_SECS)
+        self.metrics = DependencyMetrics()
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """Keep-Alive-Pool für diese Abhängigkeit (lazy, prozessweit geteilt)."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # Retries machen die SDKs bzw. der Job-Worker, nicht urllib3
+                    adapter = HTTPAdapter(
+                        pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def available(self) -> bool:
+        """False, solange der Breaker offen ist (für Fallbacks ohne Call)."""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    @contextmanager
+    def track(self) -> Iterator[_CallOutcome]:
+        """Breaker-Prüfung + Latenz/Fehler für genau einen Call."""
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.metrics.record_rejected()
+            raise
+
+        outcome = _CallOutcome()
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except Exception as e:
+            self._finish(started, f"{type(e).__name__}: {e}")
+            raise
+        except BaseException:
+            # abgebrochen (z.B. CancelledError) – weder Erfolg noch Fehler
+            self.breaker.release_probe()
+            raise
+        else:
+            self._finish(started, outcome.error)
+
+    def _finish(self, started: float, error: Optional[str]) -> None:
+        self.metrics.record((time.perf_counter() - started) * 1000, error)
+        if error is None:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def snapshot(self) -> dict:
+        connect, read = self.timeout
+        return {
+            "state": self.breaker.state,
+            "timeouts_secs": {"connect": connect, "read": read},
+            **self.metrics.snapshot(),
+        }
+
+
+def _timeout_from_env(name: str) -> Tuple[float, float]:
+    connect, read = DEFAULT_TIMEOUTS[name]
+    prefix = name.upper()
+    return (
+        float(os.getenv(f"{prefix}_CONNECT_TIMEOUT_SECS", connect)),
+        float(os.getenv(f"{prefix}_READ_TIMEOUT_SECS", read)),
+    )
+
+
+_dependencies: Dict[str, Dependency] = {
+    name: Dependency(name, _timeout_from_env(name)) for name in DEFAULT_TIMEOUTS
+}
+
+
+def dependency(name: str) -> Dependency:
+    return _dependencies[name]
+
+
+def dependencies_snapshot() -> Dict[str, dict]:
+    return {name: dep.snapshot() for name, dep in _dependencies.items()}
+
+
+def httpx_timeout(name: str):
+    """Timeouts einer Abhängigkeit für httpx-Clients (async Pfad)."""
+    import httpx
+
+    connect, read = dependency(name).timeout
+    return httpx.Timeout(read, connect=connect)
+
+
+# ---------------------- STRIPE ----------------------
+
+
+def _is_server_error(status: int) -> bool:
+    return status >= 500
+
+
+def _stripe_circuit_error(e: CircuitOpenError):
+    import stripe
+
+    # SDK-eigener Fehlertyp → bestehende except stripe.error.StripeError greifen,
+    # should_retry=False → das SDK versucht es nicht selbst erneut
+    error = stripe.error.APIConnectionError(str(e), should_retry=False)
+    error.retry_in_secs = e.retry_in_secs
+    return error
+
+
+def stripe_error_response(e) -> Tuple[dict, int, Dict[str, str]]:
+    """
+    (Body, HTTP-Status, Header) für einen StripeError in einer Route.
+    Stripe nicht erreichbar (auch Circuit offen) → 503 mit Retry-After,
+    sonst 400. e.error ist bei Verbindungsfehlern None.
+    """
+    import stripe
+
+    body = {
+        "error": str(e),
+        "type": (getattr(e, "error", None) or {}).get("type", "stripe_error"),
+    }
+    if isinstance(e, stripe.error.APIConnectionError):
+        body["type"] = "api_connection_error"
+        retry_after = max(1, math.ceil(getattr(e, "retry_in_secs", 0) or STRIPE_RETRY_AFTER_SECS))
+        return body, 503, {"Retry-After": str(retry_after)}
+    return body, 400, {}
+
+
+@lru_cache(maxsize=None)
+def _stripe_client_classes():
+    import stripe
+
+    class MeteredRequestsClient(stripe.RequestsClient):
+        """Stripes sync HTTP-Client mit Pool, Timeouts, Breaker und Metriken."""
+
+        def request(self, method, url, headers, post_data=None):
+            dep = dependency("stripe")
+            try:
+                with dep.track() as call:
+                    content, status, response_headers = super().request(
+                        method, url, headers, post_data
+                    )
+                    if _is_server_error(status):
+                        call.failed(f"HTTP {status}")
+                    return content, status, response_headers
+            except CircuitOpenError as e:
+                raise _stripe_circuit_error(e)
+
+    class MeteredHTTPXClient(stripe.HTTPXClient):
+        """Async-Variante (events_async) – ein Client pro Request, Breaker/Metriken geteilt."""
+
+        async def request_async(self, method, url, headers, post_data=None):
+            dep = dependency("stripe")
+            try:
+                with dep.track() as call:
+                    content, status, response_headers = await super().request_async(
+                        method, url, headers, post_data
+                    )
+                    if _is_server_error(status):
+                        call.failed(f"HTTP {status}")
+                    return content, status, response_headers
+            except CircuitOpenError as e:
+                raise _stripe_circuit_error(e)
+
+    return MeteredRequestsClient, MeteredHTTPXClient
+
+
+def install_stripe_client() -> None:
+    """Setzt den globalen HTTP-Client des Stripe-SDK (einmal in create_app)."""
+    import stripe
+
+    requests_client_cls, _ = _stripe_client_classes()
+    dep = dependency("stripe")
+    stripe.default_http_client = requests_client_cls(timeout=dep.timeout, session=dep.session)
+
+
+def stripe_httpx_client():
+    """Neuer async Stripe-HTTP-Client (an den Loop des Requests gebunden) mit Timeouts."""
+    _, httpx_client_cls = _stripe_client_classes()
+    return httpx_client_cls(timeout=httpx_timeout("stripe"))
+
+
+# ---------------------- AZURE BLOB ----------------------
+
+
+def azure_transport():
+    """RequestsTransport für BlobServiceClient: geteilter Pool, Timeouts, Breaker, Metriken."""
+    from azure.core.pipeline.transport import RequestsTransport
+
+    class MeteredRequestsTransport(RequestsTransport):
+        def send(self, request, **kwargs):
+            with dependency("azure").track() as call:
+                response = super().send(request, **kwargs)
+                if _is_server_error(response.status_code):
+                    call.failed(f"HTTP {response.status_code}")
+                return response
+
+    dep = dependency("azure")
+    connect, read = dep.timeout
+    return MeteredRequestsTransport(
+        session=dep.session,
+        session_owner=False,
+        connection_timeout=connect,
+        read_timeout=read,
+    )
@@ -0,0 +1,210 @@
+# app/services/payments.py
+"""
+Stripe-Zahlungen einzelner Buchungen außerhalb des Webhooks.
+
+Alter PaymentIntent bei erneuter Buchung – wird SOFORT gecancelt, bevor der
+neue entsteht (sonst bleiben zwei bezahlbare PaymentIntents offen):
+
+    cancel_open_payment_intent(user_event.stripe_payment_intent_id)
+
+Storno mit Erstattung – die Buchung steht bis zur Bestätigung durch Stripe
+auf REFUND_PENDING, der Job "stripe.refund" setzt sie danach auf REFUNDED:
+
+    queue_booking_refund(user_event, refund_amount)
+    db.session.commit()
+
+Zahlung ohne passende Buchung (PaymentIntent ersetzt, Buchung storniert)
+– der ganze PaymentIntent wird erstattet, die Buchung bleibt unberührt:
+
+    refund_orphaned_payment(payment_intent_id)
+    db.session.commit()
+
+Scheitert der Refund, bleibt die Buchung REFUND_PENDING und der letzte Fehler
+steht in user_event.refund_error (`flask refunds pending` listet sie,
+`flask refunds retry` reiht sie erneut ein).
+"""
+from __future__ import annotations
+
+import os
+from typing import List, Optional
+
+import stripe
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.user_event import UserEvent, BookingStatus
+from app.services.event_stats import booking_state, track_booking_transition
+from app.services.jobs import enqueue
+
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+# Diese PaymentIntent-Status können noch gecancelt werden
+CANCELABLE_PI_STATUSES = [
+    "requires_payment_method",
+    "requires_confirmation",
+    "requires_action",
+    "processing",
+]
+
+# Zahlung ist durch oder unterwegs → kein zweiter PaymentIntent
+PAYMENT_IN_PROGRESS_PI_STATUSES = ["processing", "requires_capture", "succeeded"]
+
+
+class PaymentInProgressError(Exception):
+    """Der alte PaymentIntent ist schon bezahlt (oder in Bearbeitung)."""
+
+    def __init__(self, payment_intent_id: str, status: str):
+        super().__init__(f"PaymentIntent {payment_intent_id} ist {status}")
+        self.payment_intent_id = payment_intent_id
+        self.status = status
+
+
+def _needs_cancel(payment_intent_id: str, status: str) -> bool:
+    if status in PAYMENT_IN_PROGRESS_PI_STATUSES:
+        raise PaymentInProgressError(payment_intent_id, status)
+    return status in CANCELABLE_PI_STATUSES
+
+
+def cancel_open_payment_intent(payment_intent_id: str) -> None:
+    """
+    Cancelt einen offenen PaymentIntent synchron. Bereits gecancelte sind ok,
+    bezahlte / laufende Zahlungen → PaymentInProgressError (der Webhook
+    verbucht sie gleich). Stripe-Fehler gehen an den Aufrufer.
+    """
+    pi = stripe.PaymentIntent.retrieve(payment_intent_id)
+    if not _needs_cancel(payment_intent_id, pi.status):
+        return
+
+    try:
+        stripe.PaymentIntent.cancel(payment_intent_id)
+    except stripe.error.InvalidRequestError:
+        # Status hat sich zwischen retrieve und cancel geändert
+        pi = stripe.PaymentIntent.retrieve(payment_intent_id)
+        if pi.status != "canceled":
+            raise PaymentInProgressError(payment_intent_id, pi.status)
+
+
+async def cancel_open_payment_intent_async(
+    client: stripe.StripeClient, payment_intent_id: str
+) -> None:
+    """Wie cancel_open_payment_intent, über einen StripeClient (httpx, async Views)."""
+    payment_intents = client.v1.payment_intents
+    pi = await payment_intents.retrieve_async(payment_intent_id)
+    if not _needs_cancel(payment_intent_id, pi.status):
+        return
+
+    try:
+        await payment_intents.cancel_async(payment_intent_id)
+    except stripe.error.InvalidRequestError:
+        pi = await payment_intents.retrieve_async(payment_intent_id)
+        if pi.status != "canceled":
+            raise PaymentInProgressError(payment_intent_id, pi.status)
+
+
+def discard_payment_intent(payment_intent_id: str, session=None) -> None:
+    """
+    Cancelt einen gerade erzeugten PaymentIntent, der an keine Buchung kam.
+    Scheitert Stripe, übernimmt der Job "stripe.cancel_payment_intent"
+    (Commit macht der Aufrufer).
+    """
+    try:
+        stripe.PaymentIntent.cancel(payment_intent_id)
+    except stripe.error.StripeError as e:
+        print(f"⚠️ PaymentIntent {payment_intent_id} nicht gecancelt, Job übernimmt: {e}")
+        enqueue("stripe.cancel_payment_intent", {"payment_intent_id": payment_intent_id}, session=session)
+
+
+async def discard_payment_intent_async(
+    client: stripe.StripeClient, payment_intent_id: str, session=None
+) -> None:
+    """Wie discard_payment_intent, über einen StripeClient (httpx, async Views)."""
+    try:
+        await client.v1.payment_intents.cancel_async(payment_intent_id)
+    except stripe.error.StripeError as e:
+        print(f"⚠️ PaymentIntent {payment_intent_id} nicht gecancelt, Job übernimmt: {e}")
+        enqueue("stripe.cancel_payment_intent", {"payment_intent_id": payment_intent_id}, session=session)
+
+
+def queue_booking_refund(user_event: UserEvent, amount: int) -> None:
+    """
+    PAID-Buchung → REFUND_PENDING + Job "stripe.refund". Der Platz ist sofort
+    frei, REFUNDED erst nach erfolgreichem Refund. Commit macht der Aufrufer.
+    """
+    before = booking_state(user_event)
+    user_event.status = BookingStatus.REFUND_PENDING
+    user_event.refund_amount = amount
+    user_event.refund_error = None
+    track_booking_transition(user_event.event_id, before, booking_state(user_event))
+    enqueue(
+        "stripe.refund",
+        {
+            "user_event_id": user_event.id,
+            "payment_intent_id": user_event.stripe_payment_intent_id,
+            "amount": amount,
+        },
+    )
+
+
+def refund_orphaned_payment(payment_intent_id: str) -> None:
+    """
+    Zahlung eingegangen, die zu keiner offenen Buchung mehr gehört → voller
+    Refund per Job "stripe.refund_payment_intent". Commit macht der Aufrufer.
+    """
+    enqueue("stripe.refund_payment_intent", {"payment_intent_id": payment_intent_id})
+
+
+def _locked_booking(user_event_id: int) -> Optional[UserEvent]:
+    return db.session.scalar(
+        select(UserEvent)
+        .where(UserEvent.id == user_event_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+def complete_booking_refund(user_event_id: int) -> bool:
+    """Refund bestätigt: REFUND_PENDING → REFUNDED (idempotent). Commit macht der Aufrufer."""
+    user_event = _locked_booking(user_event_id)
+    if user_event is None or user_event.status != BookingStatus.REFUND_PENDING:
+        return False
+    before = booking_state(user_event)
+    user_event.status = BookingStatus.REFUNDED
+    user_event.refund_error = None
+    track_booking_transition(user_event.event_id, before, booking_state(user_event))
+    return True
+
+
+def record_booking_refund_error(user_event_id: int, error: str) -> None:
+    """Merkt sich den letzten Refund-Fehler an der Buchung (committet selbst)."""
+    db.session.rollback()
+    user_event = db.session.get(UserEvent, user_event_id)
+    if user_event is not None and user_event.status == BookingStatus.REFUND_PENDING:
+        user_event.refund_error = error[:2000]
+        db.session.commit()
+
+
+def pending_refunds(limit: Optional[int] = None) -> List[UserEvent]:
+    """Buchungen, deren Refund noch nicht bestätigt ist (älteste zuerst)."""
+    stmt = (
+        select(UserEvent)
+        .where(UserEvent.status == BookingStatus.REFUND_PENDING)
+        .order_by(UserEvent.updated_at.asc(), UserEvent.id.asc())
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return list(db.session.scalars(stmt))
+
+
+def retry_booking_refund(user_event: UserEvent) -> bool:
+    """Reiht den Refund einer REFUND_PENDING-Buchung erneut ein (gleicher Idempotency-Key)."""
+    if user_event.status != BookingStatus.REFUND_PENDING or not user_event.refund_amount:
+        return False
+    enqueue(
+        "stripe.refund",
+        {
+            "user_event_id": user_event.id,
+            "payment_intent_id": user_event.stripe_payment_intent_id,
+            "amount": user_event.refund_amount,
+        },
+    )
+    return True
@@ -1,9 +1,15 @@
 # app/services/pricing.py
 from __future__ import annotations
 
-from typing import Iterable, Sequence, Tuple, List
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple, List
 
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
 from app.models.event_option import EventOption
+from app.models.user_event import UserEvent
+from app.models.user_event_option import UserEventOption
 
 
 def calculate_event_price(
@@ -30,3 +36,137 @@ def calculate_event_price(
     total = sum(o.price_cents for o in charged_options)
 
     return total, charged_options
+
+
+# ---------------------- BATCH PRICING (VEKTORISIERT) ----------------------
+
+
+class OptionTable(NamedTuple):
+    """
+    Kompakte Options-Tabelle für Batch-Berechnungen.
+
+    ids ist aufsteigend sortiert, prices_cents[i] gehört zu ids[i].
+    """
+
+    ids: np.ndarray
+    prices_cents: np.ndarray
+
+
+class BatchPricingResult(NamedTuple):
+    """Ergebnis von calculate_batch_prices – alles pro Buchung (user_event_id)."""
+
+    booking_ids: np.ndarray
+    totals_cents: np.ndarray
+    snapshot_totals_cents: Optional[np.ndarray]
+    diff_cents: Optional[np.ndarray]
+
+
+def build_option_table(rows: Iterable[Tuple[int, int]]) -> OptionTable:
+    """
+    Baut eine OptionTable aus (option_id, price_cents)-Tupeln.
+    """
+    data = np.fromiter(
+        (v for row in rows for v in row), dtype=np.int64
+    ).reshape(-1, 2)
+    order = np.argsort(data[:, 0], kind="stable")
+    return OptionTable(ids=data[order, 0], prices_cents=data[order, 1])
+
+
+def load_option_table(event_id: Optional[int] = None) -> OptionTable:
+    """
+    Lädt die aktuellen Preise aller EventOptions (optional nur für ein Event).
+    Es werden nur die zwei benötigten Spalten selektiert – keine ORM-Objekte.
+    """
+    stmt = select(EventOption.id, EventOption.price_cents)
+    if event_id is not None:
+        stmt = stmt.where(EventOption.event_id == event_id)
+    return build_option_table(db.session.execute(stmt))
+
+
+def calculate_batch_prices(
+    booking_ids: Sequence[int] | np.ndarray,
+    option_ids: Sequence[int] | np.ndarray,
+    option_table: OptionTable,
+    snapshot_price_cents: Sequence[int] | np.ndarray | None = None,
+) -> BatchPricingResult:
+    """
+    Berechnet Gesamtpreise für viele Buchungen auf einmal.
+
+    Die Eingabe ist "lang": eine Zeile pro (Buchung, Option), also genau die Form
+    von user_event_option. booking_ids[i] und option_ids[i] gehören zusammen.
+
+    :param booking_ids: user_event_id pro Zeile
+    :param option_ids: event_option_id pro Zeile
+    :param option_table: aktuelle Preise (siehe load_option_table)
+    :param snapshot_price_cents: optional, gespeicherter Preis-Snapshot pro Zeile
+    :return: BatchPricingResult mit Totals (und Diff gegen Snapshot) pro Buchung
+    :raises ValueError: bei ungleich langen Arrays oder unbekannten Option-IDs
+    """
+    bookings = np.asarray(booking_ids, dtype=np.int64)
+    options = np.asarray(option_ids, dtype=np.int64)
+
+    if bookings.shape != options.shape:
+        raise ValueError("booking_ids und option_ids müssen gleich lang sein")
+
+    # Option-ID → Index in der Tabelle (binäre Suche, vektorisiert)
+    if len(option_table.ids) == 0:
+        if options.size:
+            raise ValueError("Options-Tabelle ist leer")
+        row_prices = np.zeros(0, dtype=np.int64)
+    else:
+        idx = np.searchsorted(option_table.ids, options)
+        idx = np.minimum(idx, len(option_table.ids) - 1)
+        found = option_table.ids[idx] == options
+        if not found.all():
+            missing = np.unique(options[~found])[:10].tolist()
+            raise ValueError(f"Unbekannte Option-IDs: {missing}")
+        row_prices = option_table.prices_cents[idx]
+
+    # Zeilen pro Buchung aufsummieren
+    unique_bookings, inverse = np.unique(bookings, return_inverse=True)
+    totals = np.bincount(
+        inverse, weights=row_prices, minlength=len(unique_bookings)
+    ).astype(np.int64)
+
+    snapshot_totals = None
+    diff = None
+    if snapshot_price_cents is not None:
+        snapshots = np.asarray(snapshot_price_cents, dtype=np.int64)
+        if snapshots.shape != bookings.shape:
+            raise ValueError("snapshot_price_cents muss gleich lang sein wie booking_ids")
+        snapshot_totals = np.bincount(
+            inverse, weights=snapshots, minlength=len(unique_bookings)
+        ).astype(np.int64)
+        diff = totals - snapshot_totals
+
+    return BatchPricingResult(
+        booking_ids=unique_bookings,
+        totals_cents=totals,
+        snapshot_totals_cents=snapshot_totals,
+        diff_cents=diff,
+    )
+
+
+def audit_price_snapshots(event_id: Optional[int] = None) -> BatchPricingResult:
+    """
+    Vergleicht die Preis-Snapshots in user_event_option mit den aktuellen
+    EventOption-Preisen (optional nur für ein Event).
+    """
+    stmt = select(
+        UserEventOption.user_event_id,
+        UserEventOption.event_option_id,
+        UserEventOption.price_cents,
+    )
+    if event_id is not None:
+        stmt = stmt.join(UserEvent, UserEvent.id == UserEventOption.user_event_id).where(
+            UserEvent.event_id == event_id
+        )
+
+    rows = np.array(db.session.execute(stmt).all(), dtype=np.int64).reshape(-1, 3)
+
+    return calculate_batch_prices(
+        booking_ids=rows[:, 0],
+        option_ids=rows[:, 1],
+        option_table=load_option_table(event_id),
+        snapshot_price_cents=rows[:, 2],
+    )
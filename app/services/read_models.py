@@ -0,0 +1,254 @@
+# app/services/read_models.py
+"""
+Read-Side für Listings, Detail und Exporte: Core-Selects nur der benötigten
+Spalten, hydriert in schlanke Dataclasses mit __slots__ – keine ORM-Instanzen,
+keine Identity-Map, kein Change-Tracking.
+
+Die DTOs tragen dieselben Attributnamen wie die Modelle, _serialize_event /
+_serialize_media in app/routes/events.py funktionieren mit beiden.
+Nur lesen – Schreibzugriffe laufen weiter über die Modelle.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from app.extensions import db
+from app.models.event import Event
+from app.models.event_media import EventMedia, MediaType
+from app.models.event_stats import EventStats
+from app.models.user_event import UserEvent, BookingStatus
+from app.services.waitlist import unpaid_reserved_seats
+
+EXPORT_BATCH_SIZE = 1000
+
+
+@dataclass(slots=True)
+class MediaRow:
+    id: int
+    event_id: int
+    type: MediaType
+    mime: str
+    blob_name: str
+    poster_blob: Optional[str]
+    variants_json: Optional[dict]
+    size_bytes: Optional[int]
+    width: Optional[int]
+    height: Optional[int]
+    duration_secs: Optional[float]
+    sort_order: Optional[int]
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class ParticipantRow:
+    user_id: str
+    timestamp: datetime
+    avatar_url: Optional[str]
+    id: Optional[int] = None
+    seats: int = 1
+
+
+@dataclass(slots=True)
+class ParticipantPreview:
+    """
+    Anzahl PAID-Buchungen, belegte Plätze (Gruppenbuchungen) + die ersten
+    Teilnehmer (event_stats.participant_preview). reserved_seats: laufende
+    Holds + offene Wartelisten-Angebote (zählen für available_spots mit).
+    """
+
+    count: int
+    participants: List[ParticipantRow]
+    seats: int = 0
+    reserved_seats: int = 0
+
+
+@dataclass(slots=True)
+class EventRow:
+    id: int
+    title: str
+    description: Optional[str]
+    location: str
+    start_time: datetime
+    end_time: Optional[datetime]
+    max_participants: Optional[int]
+    creator_id: int
+    host_id: int
+    is_online: bool
+    media_items: List[MediaRow] = field(default_factory=list)
+
+
+EVENT_COLUMNS = (
+    Event.id,
+    Event.title,
+    Event.description,
+    Event.location,
+    Event.start_time,
+    Event.end_time,
+    Event.max_participants,
+    Event.creator_id,
+    Event.host_id,
+    Event.is_online,
+)
+
+MEDIA_COLUMNS = (
+    EventMedia.id,
+    EventMedia.event_id,
+    EventMedia.type,
+    EventMedia.mime,
+    EventMedia.blob_name,
+    EventMedia.poster_blob,
+    EventMedia.variants_json,
+    EventMedia.size_bytes,
+    EventMedia.width,
+    EventMedia.height,
+    EventMedia.duration_secs,
+    EventMedia.sort_order,
+    EventMedia.created_at,
+)
+
+
+def event_select(*where):
+    """
+    Select der Event-Spalten für EventRow; Filter / order_by / limit ergänzt der Aufrufer.
+    Soft-gelöschte Events (deleted_at gesetzt, Purge ausstehend) sind nie dabei.
+    """
+    return select(*EVENT_COLUMNS).where(Event.deleted_at.is_(None), *where)
+
+
+def fetch_events(stmt) -> List[EventRow]:
+    """Führt einen event_select aus und liefert EventRows (Reihenfolge wie stmt)."""
+    return [EventRow(*row) for row in db.session.execute(stmt)]
+
+
+def fetch_event(event_id: int) -> Optional[EventRow]:
+    row = db.session.execute(event_select(Event.id == event_id)).first()
+    return EventRow(*row) if row else None
+
+
+def get_live_event(event_id: int) -> Optional[Event]:
+    """Event-Modell für Schreibzugriffe; None, wenn es nicht existiert oder gelöscht ist."""
+    event = db.session.get(Event, event_id)
+    return event if event is not None and event.deleted_at is None else None
+
+
+def attach_media(events: List[EventRow]) -> List[EventRow]:
+    """Hängt die Media aller Events mit EINER Query an (Sortierung wie Event.media_items)."""
+    if not events:
+        return events
+    by_id = {e.id: e for e in events}
+    rows = db.session.execute(
+        select(*MEDIA_COLUMNS)
+        .where(EventMedia.event_id.in_(list(by_id)))
+        .order_by(EventMedia.sort_order.asc(), EventMedia.created_at.asc())
+    )
+    for row in rows:
+        media = MediaRow(*row)
+        by_id[media.event_id].media_items.append(media)
+    return events
+
+
+def participant_previews_select(event_ids: List[int]):
+    """Select der Vorschau-Spalten aus event_stats (auch für AsyncSession)."""
+    return select(
+        EventStats.event_id,
+        EventStats.paid_count,
+        EventStats.paid_seats,
+        EventStats.participant_preview,
+        unpaid_reserved_seats(EventStats.event_id),
+    ).where(EventStats.event_id.in_(event_ids))
+
+
+def build_participant_previews(event_ids: Iterable[int], rows) -> Dict[int, ParticipantPreview]:
+    """ParticipantPreview pro Event aus den Zeilen von participant_previews_select."""
+    previews = {event_id: ParticipantPreview(0, [], 0) for event_id in event_ids}
+    for event_id, paid_count, paid_seats, preview, reserved_seats in rows:
+        previews[event_id] = ParticipantPreview(
+            paid_count,
+            [
+                ParticipantRow(
+                    p["user_id"],
+                    datetime.fromisoformat(p["registered_at"]),
+                    p.get("url"),
+                    seats=p.get("seats", 1),
+                )
+                for p in preview or []
+            ],
+            paid_seats,
+            reserved_seats or 0,
+        )
+    return previews
+
+
+def participant_previews(event_ids: Iterable[int]) -> Dict[int, ParticipantPreview]:
+    """
+    Teilnehmerzahl + Vorschau (erste PAID-Teilnehmer) aus event_stats, für alle
+    event_ids in EINER Query – unabhängig von der Anzahl Teilnehmer.
+    """
+    event_ids = list(event_ids)
+    if not event_ids:
+        return {}
+    return build_participant_previews(
+        event_ids, db.session.execute(participant_previews_select(event_ids))
+    )
+
+
+def encode_participant_cursor(row: ParticipantRow) -> str:
+    raw = f"{row.timestamp.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_participant_cursor(cursor: str) -> Tuple[datetime, int]:
+    """ValueError bei ungültigem Cursor."""
+    try:
+        raw = base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()).decode()
+        ts, row_id = raw.split("|")
+        return datetime.fromisoformat(ts), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Ungültiger Cursor: {e}")
+
+
+def participants_page(
+    event_id: int, after: Optional[Tuple[datetime, int]], limit: int
+) -> Tuple[List[ParticipantRow], Optional[str]]:
+    """
+    Eine Seite PAID-Teilnehmer nach (timestamp, id), Keyset statt OFFSET.
+    → (Teilnehmer, Cursor der nächsten Seite oder None)
+    """
+    stmt = (
+        select(
+            UserEvent.user_id,
+            UserEvent.timestamp,
+            UserEvent.avatar_url,
+            UserEvent.id,
+            UserEvent.seats,
+        )
+        .where(UserEvent.event_id == event_id, UserEvent.status == BookingStatus.PAID)
+        .order_by(UserEvent.timestamp.asc(), UserEvent.id.asc())
+        .limit(limit + 1)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(UserEvent.timestamp, UserEvent.id) > tuple_(*after))
+
+    rows = [ParticipantRow(*row) for row in db.session.execute(stmt)]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_participant_cursor(rows[-1])
+    return rows, None
+
+
+def iter_events(stmt, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[EventRow]]:
+    """
+    Streamt einen event_select in Batches (Server-Side-Cursor, konstanter
+    Speicher) – für Exporte über alle Events.
+    """
+    result = db.session.execute(
+        stmt.execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        yield [EventRow(*row) for row in partition]
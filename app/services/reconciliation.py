@@ -0,0 +1,342 @@
+# app/services/reconciliation.py
+"""
+Abgleich hängengebliebener PENDING-Buchungen mit Stripe.
+
+Geht ein Webhook verloren, bleibt ein UserEvent für immer PENDING. Dieser Job
+sucht solche Buchungen, holt die Status der PaymentIntents gesammelt über
+die List-API (seitenweise statt ein Retrieve pro Buchung) und setzt die
+Übergänge in Batches durch.
+
+Das Alter einer Buchung zählt ab dem aktuellen Buchungsversuch (Hold-Beginn =
+hold_expires_at - BOOKING_HOLD), nicht ab UserEvent.timestamp: ein Re-Booking
+verwendet die Zeile weiter, timestamp bleibt der erste Buchungszeitpunkt.
+
+Die List-API liest höchstens bis abandon_after (+ CREATED_SLACK) zurück.
+Buchungen, deren PaymentIntent (pi.created) danach immer noch offen ist, gelten als
+abgebrochen: Buchung → CANCELED, PaymentIntent wird per Job gecancelt. So
+wächst das Listen-Fenster nicht mit jeder liegengebliebenen Buchung.
+Ebenso Buchungen, deren Hold (hold_expires_at) abgelaufen ist: ihre Plätze
+zählen nicht mehr, eine späte Zahlung könnte das Event sonst überbuchen
+(außer der PaymentIntent ist schon "processing").
+
+Gearbeitet wird in Runden à ROUND_SIZE Buchungen; mit time_budget_secs hört
+der Lauf nach der Runde auf, in der das Budget abläuft, und meldet
+next_after_id – der Job reiht sich damit selbst wieder ein.
+
+Für Tests gegen einen lokalen Stripe-Stand-in (z.B. stripe-mock):
+STRIPE_API_BASE=http://localhost:12111
+"""
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import stripe
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.user_event import UserEvent, BookingStatus
+from app.models.user_event_option import UserEventOption
+from app.services.availability import publish_availability
+from app.services.booking import BOOKING_HOLD, lock_events, seat_lost
+from app.services.bulk_refund import refund_late_payment
+from app.services.event_stats import booking_state, track_booking_transition
+from app.services.checkout import cancel_checkout, fail_checkout, settle_checkout
+from app.services.jobs import enqueue
+from app.services.payments import queue_booking_refund
+from app.services.waitlist import claim_offer
+
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+if os.getenv("STRIPE_API_BASE"):
+    stripe.api_base = os.getenv("STRIPE_API_BASE")
+
+STRIPE_PAGE_SIZE = 100
+RATE_LIMIT_MAX_RETRIES = 5
+# Puffer für die created-Grenze der PaymentIntent-Liste (Uhrzeit-Abweichungen)
+CREATED_SLACK = timedelta(hours=1)
+# Offene PaymentIntents älter als das gelten als abgebrochen (Default)
+ABANDON_AFTER_HOURS = 24
+# Höchstens so viele Einzel-Retrieves für PIs, die nicht in der Liste auftauchen
+MAX_INDIVIDUAL_RETRIEVES = 50
+# Buchungen pro Runde (Suche + Stripe-Liste + Batches); das Zeitbudget wird zwischen Runden geprüft
+ROUND_SIZE = 1000
+# Zeitbudget eines Jobs "stripe.reconcile_pending", danach Fortsetzung als neuer Job
+RECONCILE_TIME_BUDGET_SECS = 240
+
+
+class _Report(dict):
+    def bump(self, key: str, by: int = 1) -> None:
+        self[key] = self.get(key, 0) + by
+
+
+def _call_stripe(report: _Report, func: Callable, *args, **kwargs):
+    """Stripe-Call mit exponentiellem Backoff bei 429 (RateLimitError)."""
+    delay = 1.0
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        try:
+            report.bump("stripe_calls")
+            return func(*args, **kwargs)
+        except stripe.error.RateLimitError:
+            if attempt == RATE_LIMIT_MAX_RETRIES:
+                raise
+            report.bump("rate_limit_retries")
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def _attempt_started():
+    """Beginn des aktuellen Buchungsversuchs; Altbestand ohne Hold → timestamp."""
+    return func.coalesce(UserEvent.hold_expires_at - BOOKING_HOLD, UserEvent.timestamp)
+
+
+def _find_stale_bookings(
+    cutoff: datetime, batch_size: int, limit: Optional[int], after_id: int = 0
+) -> List[Tuple[int, str, datetime]]:
+    """(id, payment_intent_id, Versuchsbeginn) alter PENDING-Buchungen ab after_id, seitenweise per Keyset."""
+    found: List[Tuple[int, str, datetime]] = []
+    last_id = after_id
+    started = _attempt_started()
+    while limit is None or len(found) < limit:
+        page_size = batch_size if limit is None else min(batch_size, limit - len(found))
+        rows = db.session.execute(
+            select(UserEvent.id, UserEvent.stripe_payment_intent_id, started)
+            .where(
+                UserEvent.status == BookingStatus.PENDING,
+                UserEvent.stripe_payment_intent_id.is_not(None),
+                started < cutoff,
+                UserEvent.id > last_id,
+            )
+            .order_by(UserEvent.id.asc())
+            .limit(page_size)
+        ).all()
+        if not rows:
+            break
+        found.extend((r[0], r[1], r[2]) for r in rows)
+        last_id = rows[-1][0]
+    return found
+
+
+def _fetch_payment_intents(
+    wanted: set, created_gte: datetime, report: _Report
+) -> Dict[str, dict]:
+    """
+    Listet PaymentIntents ab created_gte seitenweise und merkt sich nur die
+    gesuchten. Bricht ab, sobald alle gefunden sind.
+    """
+    found: Dict[str, dict] = {}
+    params = {
+        "limit": STRIPE_PAGE_SIZE,
+        # created_gte ist naive UTC → nicht als lokale Zeit interpretieren
+        "created": {"gte": int(created_gte.replace(tzinfo=timezone.utc).timestamp())},
+    }
+
+    while True:
+        page = _call_stripe(report, stripe.PaymentIntent.list, **params)
+        report.bump("stripe_pages")
+        for pi in page.data:
+            if pi.id in wanted:
+                found[pi.id] = pi
+        if len(found) == len(wanted) or not page.has_more or not page.data:
+            break
+        params["starting_after"] = page.data[-1].id
+
+    report["found_in_list"] = len(found)
+
+    missing = list(wanted - set(found))[:MAX_INDIVIDUAL_RETRIEVES]
+    for pi_id in missing:
+        try:
+            found[pi_id] = _call_stripe(report, stripe.PaymentIntent.retrieve, pi_id)
+            report.bump("retrieved_individually")
+        except stripe.error.InvalidRequestError as e:
+            print(f"⚠️ PaymentIntent {pi_id} nicht gefunden: {e}")
+            report.bump("not_found")
+
+    return found
+
+
+def _target_status(pi) -> Optional[BookingStatus]:
+    if pi.status == "succeeded":
+        return BookingStatus.PAID
+    if pi.status == "canceled":
+        return BookingStatus.CANCELED
+    if pi.status == "requires_payment_method" and pi.get("last_payment_error"):
+        return BookingStatus.FAILED
+    return None
+
+
+def _created_before(pi, moment: datetime) -> bool:
+    """PaymentIntent vor moment (naive UTC) angelegt – Alter des Versuchs, nicht der Buchungszeile."""
+    created = pi.get("created")
+    if created is None:
+        return False
+    return created < int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _apply_batch(
+    batch: List[Tuple[int, str]],
+    intents: Dict[str, dict],
+    abandon_before: datetime,
+    dry_run: bool,
+    report: _Report,
+) -> None:
+    """Setzt die Übergänge eines Batches in EINER Transaktion um."""
+    touched_events = set()
+    batch_ids = [ue_id for ue_id, _ in batch]
+
+    # Events vor den Buchungen sperren (lock_events) – bei Checkout-Buchungen
+    # alle Events des Checkouts, settle_checkout sperrt dieselben
+    checkout_ids = select(UserEvent.checkout_id).where(
+        UserEvent.id.in_(batch_ids), UserEvent.checkout_id.is_not(None)
+    )
+    lock_events(
+        db.session,
+        db.session.scalars(
+            select(UserEvent.event_id).where(
+                UserEvent.id.in_(batch_ids) | UserEvent.checkout_id.in_(checkout_ids)
+            )
+        ),
+    )
+
+    user_events = db.session.scalars(
+        select(UserEvent)
+        .where(UserEvent.id.in_(batch_ids))
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    for user_event in user_events:
+        pi = intents.get(user_event.stripe_payment_intent_id)
+        # Inzwischen per Webhook / Re-Booking geändert → nicht anfassen
+        if user_event.status != BookingStatus.PENDING or pi is None:
+            report.bump("skipped_changed")
+            continue
+
+        target = _target_status(pi)
+        hold_expired = (
+            user_event.hold_expires_at is not None
+            and user_event.hold_expires_at < datetime.utcnow()
+            and pi.status != "processing"
+        )
+        abandoned = target is None and (_created_before(pi, abandon_before) or hold_expired)
+        if abandoned:
+            # offen seit abandon_after bzw. Hold abgelaufen → abbrechen, sonst
+            # liest jeder Lauf sie erneut
+            target = BookingStatus.CANCELED
+            report.bump("abandoned")
+        if target is None:
+            report.bump("still_open")
+            continue
+
+        report.bump(f"to_{target.value}")
+        if dry_run:
+            continue
+
+        # Checkout: alle Buchungen des gemeinsamen PaymentIntents zusammen verbuchen
+        if user_event.checkout_id:
+            if target == BookingStatus.PAID:
+                touched_events.update(
+                    settle_checkout(user_event.checkout_id, pi.get("currency", "chf"))
+                )
+            elif target == BookingStatus.FAILED:
+                touched_events.update(fail_checkout(user_event.checkout_id))
+            else:
+                # cancel_checkout reiht das Canceln des PaymentIntents selbst ein
+                touched_events.update(cancel_checkout(user_event.checkout))
+            continue
+
+        if abandoned:
+            enqueue("stripe.cancel_payment_intent", {"payment_intent_id": pi.id})
+
+        # Hold abgelaufen und Platz vergeben → Zahlung gleich wieder erstatten
+        lost = target == BookingStatus.PAID and seat_lost(db.session, user_event)
+        before = booking_state(user_event)
+        user_event.status = target
+        if target == BookingStatus.PAID:
+            user_event.amount_paid = pi.get("amount_received")
+            user_event.currency = pi.get("currency", "chf")
+            user_event.paid_at = datetime.utcnow()
+            if not lost:
+                claim_offer(user_event.event_id, user_event.user_id)
+        elif target == BookingStatus.CANCELED:
+            UserEventOption.query.filter_by(user_event_id=user_event.id).delete()
+            user_event.amount_paid = None
+            user_event.paid_at = None
+            user_event.stripe_payment_intent_id = None
+        track_booking_transition(user_event.event_id, before, booking_state(user_event))
+        if lost:
+            queue_booking_refund(user_event, user_event.amount_paid)
+        elif target == BookingStatus.PAID:
+            # Event inzwischen abgesagt → sofort erstatten
+            refund_late_payment(user_event)
+        touched_events.add(user_event.event_id)
+
+    db.session.commit()
+
+    for event_id in touched_events:
+        publish_availability(event_id)
+
+
+def reconcile_pending_bookings(
+    stale_after_minutes: int = 30,
+    batch_size: int = 100,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    abandon_after_hours: int = ABANDON_AFTER_HOURS,
+    time_budget_secs: Optional[float] = None,
+    after_id: int = 0,
+) -> dict:
+    """
+    Gleicht PENDING-Buchungen, die älter als stale_after_minutes sind, mit Stripe ab.
+
+    :param batch_size: Buchungen pro DB-Transaktion
+    :param abandon_after_hours: noch offene PaymentIntents älter als das → CANCELED;
+        begrenzt zugleich, wie weit die List-API zurückliest
+    :param limit: max. Anzahl Buchungen pro Lauf (None = alle)
+    :param dry_run: nur berichten, nichts ändern
+    :param time_budget_secs: danach aufhören (zwischen zwei Runden à ROUND_SIZE
+        Buchungen); der Report enthält dann next_after_id zum Fortsetzen
+    :param after_id: erst Buchungen mit größerer id (Fortsetzung)
+    :return: Report mit Zählern (to_paid, to_canceled, to_failed, still_open, ...)
+    """
+    started = time.monotonic()
+    report = _Report(dry_run=dry_run)
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=stale_after_minutes)
+    abandon_before = now - timedelta(hours=abandon_after_hours)
+    report["stale_bookings"] = 0
+
+    while limit is None or report["stale_bookings"] < limit:
+        round_size = ROUND_SIZE if limit is None else min(ROUND_SIZE, limit - report["stale_bookings"])
+        stale = _find_stale_bookings(cutoff, batch_size, round_size, after_id)
+        if not stale:
+            break
+        report.bump("stale_bookings", len(stale))
+        after_id = stale[-1][0]
+
+        # Fenster gedeckelt: ältere PIs kommen per Einzel-Retrieve und werden
+        # dabei als abgebrochen beendet
+        oldest = max(min(ts for _, _, ts in stale), abandon_before)
+        intents = _fetch_payment_intents(
+            {pi_id for _, pi_id, _ in stale}, oldest - CREATED_SLACK, report
+        )
+
+        for i in range(0, len(stale), batch_size):
+            batch = [(ue_id, pi_id) for ue_id, pi_id, _ in stale[i : i + batch_size]]
+            try:
+                _apply_batch(batch, intents, abandon_before, dry_run, report)
+                report.bump("batches")
+            except Exception as e:
+                db.session.rollback()
+                report.bump("failed_batches")
+                print(f"⚠️ Reconciliation-Batch ab Buchung {batch[0][0]} fehlgeschlagen: {e}")
+
+        if len(stale) < round_size:
+            break
+        if time_budget_secs is not None and time.monotonic() - started > time_budget_secs:
+            # Zeitbudget aufgebraucht → der Aufrufer setzt ab next_after_id fort
+            report["next_after_id"] = after_id
+            break
+
+    report["elapsed_secs"] = round(time.monotonic() - started, 3)
+    return dict(report)
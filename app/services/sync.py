@@ -0,0 +1,209 @@
+# app/services/sync.py
+"""
+Delta-Sync für Clients mit lokalem Cache (GET /api/events/sync).
+
+Jede Änderung an event / event_option / event_media / user_event setzt
+updated_at (onupdate), Löschungen hinterlassen einen Tombstone:
+
+    record_deletion("event_media", media.id, event_id=media.event_id)
+    db.session.delete(media)
+    db.session.commit()
+
+Der Cursor ist opak (base64 JSON mit Server-Zeitstempel). updated_at wird beim
+Flush gesetzt, sichtbar wird die Zeile erst mit dem Commit. Der Cursor steht
+deshalb nie nach dem Start der ältesten noch offenen Transaktion
+(pg_stat_activity.xact_start): was sie geschrieben hat, liegt nach ihrem
+Commit noch im nächsten Fenster. SYNC_OVERLAP deckt zusätzlich Uhrzeit-
+Abweichungen zwischen App-Servern und DB ab.
+
+Grenze: Transaktionen, die länger als MAX_CURSOR_LAG offen sind (z.B. eine
+hängende "idle in transaction"-Session), halten den Cursor nicht weiter
+zurück – ihre Änderungen können einem Client entgehen, bis er einen
+kompletten Sync macht. Clients wenden Änderungen als Upsert an, doppelt
+gelieferte Zeilen sind harmlos.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete, select, text
+
+from app.extensions import db
+from app.models.event import Event
+from app.models.event_media import EventMedia
+from app.models.event_option import EventOption
+from app.models.tombstone import Tombstone
+from app.models.user_event import UserEvent
+from app.models.user_event_option import UserEventOption
+
+CURSOR_VERSION = 1
+SYNC_OVERLAP = timedelta(seconds=60)
+# so weit darf eine offene Transaktion den Cursor höchstens zurückhalten
+MAX_CURSOR_LAG = timedelta(minutes=15)
+# Tombstones werden so lange aufbewahrt; ältere Cursor → kompletter Resync
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+DELETED_KEYS = {
+    "event": "events",
+    "event_option": "options",
+    "event_media": "media",
+    "user_event": "my_bookings",
+}
+
+
+class SyncChanges(NamedTuple):
+    full: bool
+    events: List[Event]
+    options: List[EventOption]
+    media: List[EventMedia]
+    bookings: List[UserEvent]
+    # user_event_id → gewählte event_option_ids
+    booking_option_ids: Dict[int, List[int]]
+    deleted: Dict[str, List[int]]
+    cursor: str
+
+
+def encode_cursor(ts: datetime) -> str:
+    raw = json.dumps({"v": CURSOR_VERSION, "t": ts.isoformat()}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """ValueError bei kaputtem oder fremdem Cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data.get("v") != CURSOR_VERSION:
+            raise ValueError("Cursor-Version unbekannt")
+        return datetime.fromisoformat(data["t"])
+    except (binascii.Error, json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Ungültiger Cursor: {e}")
+
+
+def record_deletion(
+    entity: str,
+    entity_id: int,
+    event_id: Optional[int] = None,
+    user_id: Optional[str] = None,
+) -> None:
+    """
+    Legt einen Tombstone an (ohne Commit – gehört in die Transaktion der Löschung).
+    Beim Löschen eines Events reicht der Tombstone des Events: Clients räumen
+    Optionen, Media und Buchungen dieses Events selbst weg (siehe soft_delete_event).
+    """
+    db.session.add(
+        Tombstone(entity=entity, entity_id=entity_id, event_id=event_id, user_id=user_id)
+    )
+
+
+def _oldest_open_transaction() -> Optional[datetime]:
+    """Start (UTC) der ältesten offenen Transaktion einer anderen Session dieser DB."""
+    return db.session.scalar(
+        text(
+            "SELECT min(xact_start) AT TIME ZONE 'utc' FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid() "
+            "AND backend_type = 'client backend' AND xact_start IS NOT NULL"
+        )
+    )
+
+
+def _cursor_time(now: datetime) -> datetime:
+    """
+    Cursor-Zeitpunkt: now, aber nie nach dem Start einer noch offenen
+    Transaktion (deren Zeilen sind noch unsichtbar) – höchstens MAX_CURSOR_LAG zurück.
+    """
+    oldest = _oldest_open_transaction()
+    if oldest is None:
+        return now
+    return max(min(now, oldest), now - MAX_CURSOR_LAG)
+
+
+def collect_changes(user_id: str, since: Optional[datetime]) -> SyncChanges:
+    """
+    Alles, was sich seit since geändert hat (Events, Optionen, Media, eigene
+    Buchungen, Löschungen). since=None oder zu alt → kompletter Stand (full=True).
+    Feste Anzahl Queries, unabhängig von der Menge der Änderungen.
+    """
+    now = datetime.utcnow()
+    # vor den Abfragen: was danach committet, ist im nächsten Fenster
+    cursor_time = _cursor_time(now)
+    full = since is None or since < now - TOMBSTONE_RETENTION
+    window_start = None if full else since - SYNC_OVERLAP
+
+    def changed(model, stmt=None):
+        stmt = stmt if stmt is not None else select(model)
+        if window_start is not None:
+            stmt = stmt.where(model.updated_at > window_start)
+        return stmt
+
+    # soft-gelöschte Events (Purge ausstehend) kennt der Client nur als Tombstone
+    deleted_events = select(Event.id).where(Event.deleted_at.is_not(None))
+
+    events = db.session.scalars(
+        changed(Event, select(Event).where(Event.deleted_at.is_(None))).order_by(
+            Event.start_time.asc(), Event.id.asc()
+        )
+    ).all()
+    options = db.session.scalars(
+        changed(EventOption, select(EventOption).where(~EventOption.event_id.in_(deleted_events)))
+        .order_by(EventOption.event_id.asc(), EventOption.id.asc())
+    ).all()
+    media = db.session.scalars(
+        changed(EventMedia, select(EventMedia).where(~EventMedia.event_id.in_(deleted_events)))
+        .order_by(EventMedia.event_id.asc(), EventMedia.id.asc())
+    ).all()
+    bookings = db.session.scalars(
+        changed(
+            UserEvent,
+            select(UserEvent).where(
+                UserEvent.user_id == user_id, ~UserEvent.event_id.in_(deleted_events)
+            ),
+        ).order_by(UserEvent.id.asc())
+    ).all()
+
+    booking_option_ids: Dict[int, List[int]] = defaultdict(list)
+    if bookings:
+        for ue_id, option_id in db.session.execute(
+            select(UserEventOption.user_event_id, UserEventOption.event_option_id).where(
+                UserEventOption.user_event_id.in_([ue.id for ue in bookings])
+            )
+        ):
+            booking_option_ids[ue_id].append(option_id)
+
+    deleted: Dict[str, List[int]] = {key: [] for key in DELETED_KEYS.values()}
+    if not full:
+        tombstones = db.session.execute(
+            select(Tombstone.entity, Tombstone.entity_id).where(
+                Tombstone.deleted_at > window_start,
+                (Tombstone.user_id.is_(None)) | (Tombstone.user_id == user_id),
+            )
+        ).all()
+        for entity, entity_id in tombstones:
+            key = DELETED_KEYS.get(entity)
+            if key:
+                deleted[key].append(entity_id)
+
+    return SyncChanges(
+        full=full,
+        events=events,
+        options=options,
+        media=media,
+        bookings=bookings,
+        booking_option_ids=dict(booking_option_ids),
+        deleted=deleted,
+        cursor=encode_cursor(cursor_time),
+    )
+
+
+def prune_tombstones(older_than: timedelta = TOMBSTONE_RETENTION) -> int:
+    """Löscht Tombstones, die älter als older_than sind."""
+    result = db.session.execute(
+        delete(Tombstone).where(Tombstone.deleted_at < datetime.utcnow() - older_than)
+    )
+    db.session.commit()
+    return result.rowcount
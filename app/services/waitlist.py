@@ -0,0 +1,238 @@
+# app/services/waitlist.py
+"""
+Warteliste für ausgebuchte Events.
+
+Ablauf:
+- Event voll → Client trägt sich ein (POST /api/events/<id>/waitlist)
+- PAID-Platz wird frei (Storno, Refund) → schedule_promotion(event_id) im
+  selben Commit; der Job "waitlist.promote" bietet den nächsten WAITING-Einträgen
+  einen Platz an (OFFERED, gültig WAITLIST_CLAIM_WINDOW)
+- Angebot bucht normal über /book (angebotene Plätze sind für andere gesperrt),
+  Zahlung → CLAIMED
+- Angebot verfällt → Job "waitlist.expire_offer" → EXPIRED, nächster rückt nach
+
+Nachrücken liest nur den Anfang der Liste (LIMIT über
+ix_waitlist_entry_event_status_id), nie die ganze Warteliste.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models.event import Event
+from app.models.event_refund_run import EventRefundRun
+from app.models.user_event import UserEvent, BookingStatus
+from app.models.waitlist_entry import WaitlistEntry, WaitlistStatus
+from app.services.jobs import enqueue
+
+WAITLIST_CLAIM_WINDOW = timedelta(minutes=int(os.getenv("WAITLIST_CLAIM_MINUTES", "30")))
+
+ACTIVE_STATUSES = (WaitlistStatus.WAITING, WaitlistStatus.OFFERED)
+
+
+def taken_seats_select(event_id: int, user_id: Optional[str] = None):
+    """
+    Belegte Plätze für die Kapazitätsprüfung: PAID + unbezahlte PENDING-Buchungen,
+    deren Hold (hold_expires_at) noch läuft. Die Buchung von user_id zählt nicht
+    mit – sie wird beim Re-Try ersetzt. Als Statement, auch für AsyncSession.
+    """
+    held = (UserEvent.status == BookingStatus.PENDING) & (
+        UserEvent.hold_expires_at > datetime.utcnow()
+    )
+    if user_id is not None:
+        held = held & (UserEvent.user_id != user_id)
+    return select(func.coalesce(func.sum(UserEvent.seats), 0)).where(
+        UserEvent.event_id == event_id,
+        (UserEvent.status == BookingStatus.PAID) | held,
+    )
+
+
+def open_offer_count(event_id: int) -> int:
+    """Noch gültige Angebote – diese Plätze sind für andere Buchungen reserviert."""
+    return db.session.scalar(
+        select(func.count(WaitlistEntry.id)).where(
+            WaitlistEntry.event_id == event_id,
+            WaitlistEntry.status == WaitlistStatus.OFFERED,
+            WaitlistEntry.offer_expires_at > datetime.utcnow(),
+        )
+    )
+
+
+def reserved_seats_select(event_id: int, user_id: str):
+    """
+    Count-Select der Plätze, die für user_id durch offene Angebote gesperrt sind
+    (0, wenn user_id selbst ein offenes Angebot hat). Als Statement, damit es auch
+    mit einer AsyncSession läuft.
+    """
+    now = datetime.utcnow()
+    open_offer = (
+        (WaitlistEntry.event_id == event_id)
+        & (WaitlistEntry.status == WaitlistStatus.OFFERED)
+        & (WaitlistEntry.offer_expires_at > now)
+    )
+    own_offer = select(WaitlistEntry.id).where(open_offer, WaitlistEntry.user_id == user_id)
+    return select(func.count(WaitlistEntry.id)).where(open_offer, ~own_offer.exists())
+
+
+def unpaid_reserved_seats(event_id):
+    """
+    Plätze, die zusätzlich zu event_stats.paid_seats nicht frei sind: laufende
+    Holds unbezahlter Buchungen + offene Wartelisten-Angebote. event_id darf
+    Event.id sein → korrelierte Skalar-Subquery für Listen / Suche.
+    """
+    now = datetime.utcnow()
+    held = select(func.coalesce(func.sum(UserEvent.seats), 0)).where(
+        UserEvent.event_id == event_id,
+        UserEvent.status == BookingStatus.PENDING,
+        UserEvent.hold_expires_at > now,
+    )
+    offered = select(func.count(WaitlistEntry.id)).where(
+        WaitlistEntry.event_id == event_id,
+        WaitlistEntry.status == WaitlistStatus.OFFERED,
+        WaitlistEntry.offer_expires_at > now,
+    )
+    return held.scalar_subquery() + offered.scalar_subquery()
+
+
+def get_entry(event_id: int, user_id: str) -> Optional[WaitlistEntry]:
+    return db.session.scalar(
+        select(WaitlistEntry).where(
+            WaitlistEntry.event_id == event_id, WaitlistEntry.user_id == user_id
+        )
+    )
+
+
+def waitlist_position(entry: WaitlistEntry) -> Optional[int]:
+    """1-basierte Position unter den WAITING-Einträgen (None, wenn nicht WAITING)."""
+    if entry.status != WaitlistStatus.WAITING:
+        return None
+    ahead = db.session.scalar(
+        select(func.count(WaitlistEntry.id)).where(
+            WaitlistEntry.event_id == entry.event_id,
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+            WaitlistEntry.id < entry.id,
+        )
+    )
+    return ahead + 1
+
+
+def join_waitlist(event_id: int, user_id: str) -> WaitlistEntry:
+    """
+    Trägt den User ans Ende der Warteliste ein (idempotent für aktive Einträge).
+    Wer die Liste verlassen hat oder dessen Angebot verfallen ist, bekommt einen
+    neuen Eintrag – und damit eine neue Position. Commit macht der Aufrufer.
+    """
+    entry = get_entry(event_id, user_id)
+    if entry is not None and entry.status in ACTIVE_STATUSES:
+        return entry
+    if entry is not None:
+        db.session.delete(entry)
+        db.session.flush()
+
+    entry = WaitlistEntry(event_id=event_id, user_id=user_id, status=WaitlistStatus.WAITING)
+    db.session.add(entry)
+    db.session.flush()
+    return entry
+
+
+def leave_waitlist(entry: WaitlistEntry) -> None:
+    """Verlässt die Warteliste; ein offenes Angebot geht an den Nächsten. Commit macht der Aufrufer."""
+    had_offer = entry.status == WaitlistStatus.OFFERED
+    entry.status = WaitlistStatus.LEFT
+    if had_offer:
+        schedule_promotion(entry.event_id)
+
+
+def claim_offer(event_id: int, user_id: str) -> None:
+    """Nach erfolgreicher Zahlung: Angebot gilt als eingelöst. Commit macht der Aufrufer."""
+    db.session.execute(
+        update(WaitlistEntry)
+        .where(
+            WaitlistEntry.event_id == event_id,
+            WaitlistEntry.user_id == user_id,
+            WaitlistEntry.status.in_(ACTIVE_STATUSES),
+        )
+        .values(status=WaitlistStatus.CLAIMED)
+    )
+
+
+def schedule_promotion(event_id: int) -> None:
+    """Reiht das Nachrücken ein (ohne Commit – gehört in die Transaktion, die den Platz frei macht)."""
+    enqueue("waitlist.promote", {"event_id": event_id})
+
+
+def promote_waitlist(event_id: int) -> List[WaitlistEntry]:
+    """
+    Bietet so vielen WAITING-Einträgen einen Platz an, wie gerade frei sind
+    (max_participants - belegte Plätze - offene Angebote). Die Event-Zeile wird dabei
+    gesperrt, parallele Promote-Jobs desselben Events laufen nacheinander.
+    Commit macht der Aufrufer.
+    """
+    max_participants = db.session.scalar(
+        select(Event.max_participants)
+        .where(Event.id == event_id, Event.deleted_at.is_(None))
+        .with_for_update()
+    )
+    if not max_participants:
+        return []
+
+    # Event wird / wurde komplett erstattet (abgesagt) → niemand rückt nach
+    if db.session.scalar(
+        select(EventRefundRun.id).where(EventRefundRun.event_id == event_id).limit(1)
+    ):
+        return []
+
+    # gehaltene Plätze laufender Zahlungen sind (noch) nicht frei
+    free = max_participants - db.session.scalar(taken_seats_select(event_id)) - open_offer_count(event_id)
+    if free <= 0:
+        return []
+
+    entries = db.session.scalars(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.event_id == event_id,
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+        )
+        .order_by(WaitlistEntry.id.asc())
+        .limit(free)
+    ).all()
+
+    now = datetime.utcnow()
+    expires_at = now + WAITLIST_CLAIM_WINDOW
+    for entry in entries:
+        entry.status = WaitlistStatus.OFFERED
+        entry.offered_at = now
+        entry.offer_expires_at = expires_at
+        enqueue("waitlist.expire_offer", {"entry_id": entry.id}, run_at=expires_at)
+    return entries
+
+
+def expire_offer(entry_id: int) -> bool:
+    """
+    Lässt ein nicht eingelöstes Angebot verfallen und reiht das Nachrücken ein.
+    False, wenn das Angebot inzwischen eingelöst / verlassen wurde.
+    Commit macht der Aufrufer.
+    """
+    entry = db.session.get(WaitlistEntry, entry_id)
+    if entry is None or entry.status != WaitlistStatus.OFFERED:
+        return False
+
+    # Buchung ist trotzdem bezahlt (z.B. per Reconciliation verbucht) → eingelöst
+    booking_paid = db.session.scalar(
+        select(func.count(UserEvent.id)).where(
+            UserEvent.event_id == entry.event_id,
+            UserEvent.user_id == entry.user_id,
+            UserEvent.status == BookingStatus.PAID,
+        )
+    )
+    if booking_paid:
+        entry.status = WaitlistStatus.CLAIMED
+        return False
+
+    entry.status = WaitlistStatus.EXPIRED
+    schedule_promotion(entry.event_id)
+    return True
@@ -0,0 +1,191 @@
+# app/services/warmup.py
+"""
+Warmup nach dem Start eines Workers, damit nicht die ersten Requests die
+Kaltstart-Kosten zahlen:
+
+- SQLAlchemy-Mapper konfigurieren
+- DB-Pool bis pool_size mit offenen Verbindungen füllen
+- Clerk-JWKS holen (PyJWKClient cached sie) + Google-OIDC-Discovery
+- Keep-Alive-Verbindungen zu Clerk / Stripe / Azure öffnen (Pools aus
+  app/services/outbound.py)
+- Listing-Queries einmal ausführen (SQLAlchemy-Statement-Cache, Postgres-Buffer)
+
+Nur der Prozess, der Requests bedient, startet den Warmup (create_app bleibt
+ohne Seiteneffekte – CLI-Kommandos, Tests und der Reloader-Watcher öffnen
+keine Verbindungen):
+
+- run.py: vor app.run, mit Reloader nur im Kind-Prozess (WERKZEUG_RUN_MAIN)
+- gunicorn: im Hook post_worker_init (gunicorn.conf.py), nach dem fork –
+  Verbindungen dürfen nicht über fork geerbt werden:
+
+      def post_worker_init(worker):
+          from app.services.warmup import start_server_warmup
+          start_server_warmup(worker.wsgi)
+
+start_server_warmup läuft im Hintergrund-Thread (WARMUP_ON_START=false
+schaltet ihn ab). GET /readyz liefert 503, bis er durch ist; ohne
+gestarteten Warmup ist der Prozess sofort bereit. Schritte sind best effort:
+ein Fehler wird im Report vermerkt, der Warmup läuft weiter.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from app.extensions import db, oauth
+
+# Verbindungen, die der Warmup höchstens öffnet (sonst pool_size des Engines)
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "0"))
+# so viele Events lädt das Listing-Priming
+WARMUP_LISTING_LIMIT = 50
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_started = False
+_report: Dict[str, dict] = {}
+_finished_at: Optional[datetime] = None
+
+
+def is_ready() -> bool:
+    # nie gestartet (WARMUP_ON_START=false, flask run, Tests) → nichts abzuwarten
+    return _ready.is_set() or not _started
+
+
+def warmup_report() -> dict:
+    with _lock:
+        return {
+            "ready": is_ready(),
+            "finished_at": _finished_at.isoformat() if _finished_at else None,
+            "steps": dict(_report),
+        }
+
+
+def _step(name: str, func: Callable[[], Optional[str]]) -> None:
+    started = time.perf_counter()
+    try:
+        detail = func()
+        result = {"ok": True}
+        if detail:
+            result["detail"] = detail
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"[:300]}
+        print(f"⚠️ Warmup {name} fehlgeschlagen: {result['error']}")
+    result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    with _lock:
+        _report[name] = result
+
+
+def _fill_db_pool() -> str:
+    pool = db.engine.pool
+    size = WARMUP_DB_CONNECTIONS or getattr(pool, "size", lambda: 1)()
+    connections = []
+    try:
+        # gleichzeitig auschecken → der Pool hält danach `size` offene Verbindungen
+        for _ in range(size):
+            conn = db.engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
+    return f"{len(connections)} Verbindungen"
+
+
+def _prefetch_jwks() -> str:
+    from app.utils.auth import jwk_client
+
+    return f"{len(jwk_client.get_signing_keys())} Keys"
+
+
+def _load_google_metadata() -> None:
+    oauth.google.load_server_metadata()
+
+
+def _open_connections() -> str:
+    """Ein Request pro Host über den Pool der Abhängigkeit → TLS-Handshake erledigt."""
+    import stripe
+    from app.services.clerk import CLERK_API_BASE
+    from app.services.outbound import dependency
+
+    targets = [("clerk", CLERK_API_BASE), ("stripe", stripe.api_base)]
+    if os.getenv("AZURE_BLOB_ACCOUNT_URL"):
+        targets.append(("azure", os.environ["AZURE_BLOB_ACCOUNT_URL"]))
+
+    opened: List[str] = []
+    failed: List[str] = []
+    for name, url in targets:
+        dep = dependency(name)
+        try:
+            # Status egal (meist 401/404), es geht nur um die Verbindung im Pool;
+            # bewusst ohne Breaker, ein Warmup-Fehler soll ihn nicht öffnen
+            dep.session.head(url, timeout=dep.timeout)
+            opened.append(name)
+        except Exception as e:
+            failed.append(f"{name}: {type(e).__name__}")
+    if failed:
+        raise ConnectionError(f"offen: {', '.join(opened) or '-'}; fehlgeschlagen: {', '.join(failed)}")
+    return ", ".join(opened)
+
+
+def _prime_listing_queries() -> str:
+    from app.models.event import Event
+    from app.services.availability import availability_snapshots
+    from app.services.read_models import attach_media, event_select, fetch_events
+
+    events = fetch_events(
+        event_select(Event.start_time >= datetime.utcnow())
+        .order_by(Event.start_time.asc(), Event.id.asc())
+        .limit(WARMUP_LISTING_LIMIT)
+    )
+    attach_media(events)
+    availability_snapshots(e.id for e in events)
+    db.session.remove()
+    return f"{len(events)} Events"
+
+
+def run_warmup(app: Flask) -> dict:
+    """Führt alle Schritte aus und setzt danach ready (auch wenn Schritte scheitern)."""
+    global _finished_at
+    started = time.perf_counter()
+    with app.app_context():
+        _step("mappers", configure_mappers)
+        _step("db_pool", _fill_db_pool)
+        _step("jwks", _prefetch_jwks)
+        _step("google_oidc", _load_google_metadata)
+        _step("http_pools", _open_connections)
+        _step("listing_queries", _prime_listing_queries)
+
+    with _lock:
+        _finished_at = datetime.utcnow()
+    _ready.set()
+    failed = [name for name, step in _report.items() if not step["ok"]]
+    print(
+        f"🔥 Warmup fertig in {time.perf_counter() - started:.2f}s"
+        + (f" (fehlgeschlagen: {', '.join(failed)})" if failed else "")
+    )
+    return warmup_report()
+
+
+def start_warmup(app: Flask) -> None:
+    """Startet den Warmup einmal pro Prozess im Hintergrund, /readyz wartet darauf."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    _ready.clear()
+    threading.Thread(target=run_warmup, args=(app,), name="warmup", daemon=True).start()
+
+
+def start_server_warmup(app: Flask) -> None:
+    """Einstieg für den Server-Prozess (run.py, gunicorn post_worker_init)."""
+    if os.getenv("WARMUP_ON_START", "true").lower() != "true" or app.testing:
+        return
+    start_warmup(app)
@@ -1,13 +1,16 @@
 import requests
 import jwt
 from jwt import PyJWKClient
-from flask import request, jsonify
+import inspect
+from flask import current_app, request, jsonify
 from functools import wraps
+from app.services.outbound import dependency
 
 CLERK_ISSUER = "https://popular-civet-81.clerk.accounts.dev"
 CLERK_JWKS_URL = f"{CLERK_ISSUER}/.well-known/jwks.json"
 
-jwk_client = PyJWKClient(CLERK_JWKS_URL)
+# JWKS werden gecacht (lifespan), ein hängender Abruf darf den Request nicht blockieren
+jwk_client = PyJWKClient(CLERK_JWKS_URL, timeout=dependency("clerk").timeout[1])
 
 def verify_clerk_token(token):
     signing_key = jwk_client.get_signing_key_from_jwt(token).key
@@ -20,7 +23,32 @@ def verify_clerk_token(token):
     )
     return payload
 
+def _clerk_auth_required_async(func):
+    """Variante für async Views: nur die Token-Prüfung läuft im try-Block."""
+    @wraps(func)
+    async def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get("Authorization", "")
+
+        if not auth_header.startswith("Bearer "):
+            print("⛔ Kein gültiger Bearer-Header")
+            return jsonify({'error': 'Authorization header missing or invalid'}), 401
+
+        token = auth_header.split(" ")[1]
+        try:
+            payload = verify_clerk_token(token)
+        except Exception as e:
+            print("❌ JWT Verifizierung fehlgeschlagen:", str(e))
+            return jsonify({'error': 'Invalid or expired token', 'details': str(e)}), 401
+
+        request.clerk_user_id = payload["sub"]
+        return await func(*args, **kwargs)
+
+    return decorated_function
+
 def clerk_auth_required(func):
+    if inspect.iscoroutinefunction(func):
+        return _clerk_auth_required_async(func)
+
     @wraps(func)
     def decorated_function(*args, **kwargs):
         auth_header = request.headers.get("Authorization", "")
@@ -42,3 +70,16 @@ def clerk_auth_required(func):
 
     return decorated_function
 
+def admin_required(func):
+    """
+    Nach clerk_auth_required: nur Clerk-User aus ADMIN_USER_IDS, sonst 403.
+    Gibt die Antwort selbst zurück (ein abort() würde clerk_auth_required zu 401 machen).
+    """
+    @wraps(func)
+    def decorated_function(*args, **kwargs):
+        if request.clerk_user_id not in current_app.config.get("ADMIN_USER_IDS", ()):
+            print(f"⛔ Kein Admin: {request.clerk_user_id}")
+            return jsonify({'error': 'Admin privileges required'}), 403
+        return func(*args, **kwargs)
+
+    return decorated_function
@@ -0,0 +1,184 @@
+import hashlib
+import inspect
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Platzhalter, die länger "laufen", stammen von abgestürzten Requests
+IN_FLIGHT_TIMEOUT = timedelta(minutes=5)
+
+
+def _request_hash() -> str:
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def stripe_idempotency_key(suffix: str) -> str | None:
+    """
+    Stripe-Idempotency-Key, abgeleitet vom Idempotency-Key des aktuellen Requests
+    (None, wenn der Client keinen geschickt hat). suffix unterscheidet mehrere
+    Stripe-Calls innerhalb eines Requests und muss den Versuch enthalten (Buchung
+    + Hold, Checkout-ID): nach einem 5xx wiederholt der Client mit demselben
+    Header, Stripe würde sonst den schon gecancelten PaymentIntent zurückgeben.
+    """
+    key = getattr(request, "idempotency_key", None)
+    if not key:
+        return None
+    raw = f"{request.clerk_user_id}:{key}:{suffix}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _discard(record_id: int) -> None:
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+    db.session.commit()
+
+
+def _begin():
+    """
+    Reserviert den Key des Requests.
+    → (fertige Antwort, None) bei Replay/Konflikt, (None, record_id) zum Ausführen,
+      (None, None) ohne Header.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    request.idempotency_key = key
+    if not key:
+        return None, None
+
+    if len(key) > 255:
+        return (jsonify({"error": f"{IDEMPOTENCY_HEADER} ist zu lang (max. 255)"}), 400), None
+
+    user_id = request.clerk_user_id
+    request_hash = _request_hash()
+
+    record = IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        endpoint=request.path,
+        request_hash=request_hash,
+    )
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        existing = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+        if existing is None:
+            return (jsonify({"error": "Idempotency-Key Konflikt, bitte erneut versuchen"}), 409), None
+
+        if existing.request_hash != request_hash:
+            return (
+                jsonify(
+                    {"error": f"{IDEMPOTENCY_HEADER} wurde bereits für einen anderen Request verwendet"}
+                ),
+                422,
+            ), None
+
+        if existing.status_code is not None:
+            return Response(
+                existing.response_body,
+                status=existing.status_code,
+                mimetype="application/json",
+                headers={"Idempotent-Replayed": "true"},
+            ), None
+
+        if existing.created_at > datetime.utcnow() - IN_FLIGHT_TIMEOUT:
+            return (
+                jsonify({"error": f"Request mit diesem {IDEMPOTENCY_HEADER} läuft noch"}),
+                409,
+            ), None
+
+        # verwaister Platzhalter → übernehmen
+        existing.created_at = datetime.utcnow()
+        db.session.commit()
+        record = existing
+
+    return None, record.id
+
+
+def _finish(record_id: int, rv):
+    """Speichert die Antwort (< 500) zum reservierten Key."""
+    response = current_app.make_response(rv)
+
+    if response.status_code >= 500:
+        _discard(record_id)
+        return response
+
+    db.session.rollback()
+    record = db.session.get(IdempotencyKey, record_id)
+    record.status_code = response.status_code
+    record.response_body = response.get_data(as_text=True)
+    record.completed_at = datetime.utcnow()
+    db.session.commit()
+    return response
+
+
+def idempotent(func):
+    """
+    Unterstützt den Header Idempotency-Key (nach clerk_auth_required verwenden).
+
+    - erster Request: wird ausgeführt, Antwort (< 500) wird pro User + Key gespeichert
+    - Wiederholung: gespeicherte Antwort wird ohne erneute Ausführung zurückgegeben
+      (Header Idempotent-Replayed: true)
+    - gleicher Key, anderer Request → 422; erster Request läuft noch → 409
+    - 5xx und Exceptions werden nicht gespeichert, der Client darf erneut versuchen
+
+    Funktioniert auch für async Views.
+    """
+
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_decorated_function(*args, **kwargs):
+            early, record_id = _begin()
+            if early is not None:
+                return early
+            if record_id is None:
+                return await func(*args, **kwargs)
+
+            try:
+                rv = await func(*args, **kwargs)
+            except Exception:
+                _discard(record_id)
+                raise
+            return _finish(record_id, rv)
+
+        return async_decorated_function
+
+    @wraps(func)
+    def decorated_function(*args, **kwargs):
+        early, record_id = _begin()
+        if early is not None:
+            return early
+        if record_id is None:
+            return func(*args, **kwargs)
+
+        try:
+            rv = func(*args, **kwargs)
+        except Exception:
+            _discard(record_id)
+            raise
+        return _finish(record_id, rv)
+
+    return decorated_function
+
+
+def prune_idempotency_keys(older_than: timedelta = timedelta(hours=24)) -> int:
+    """Löscht gespeicherte Keys, die älter als older_than sind."""
+    result = db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.created_at < datetime.utcnow() - older_than
+        )
+    )
+    db.session.commit()
+    return result.rowcount
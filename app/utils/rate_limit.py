@@ -0,0 +1,235 @@
+import inspect
+import math
+import os
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app, jsonify, request
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.models.rate_limit_bucket import RateLimitBucket
+
+
+# ---------------------- STORES ----------------------
+# consume() → (erlaubt?, verbleibende Tokens, Sekunden bis wieder genug Tokens da sind)
+
+
+class MemoryTokenBucketStore:
+    """In-Process-Buckets – nur für Single-Node (jeder Worker zählt für sich)."""
+
+    # Buckets, die so lange unberührt sind, sind sicher wieder voll → wegräumen
+    IDLE_EVICT_SECS = 3600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._last_evict = time.monotonic()
+
+    def consume(
+        self, key: str, capacity: int, refill_per_sec: float, cost: int = 1
+    ) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_sec)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+
+            if now - self._last_evict > self.IDLE_EVICT_SECS:
+                self._evict(now)
+
+        retry_after = 0.0 if allowed else (cost - tokens) / refill_per_sec
+        return allowed, tokens, retry_after
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.IDLE_EVICT_SECS
+        self._buckets = {k: v for k, v in self._buckets.items() if v[1] >= cutoff}
+        self._last_evict = now
+
+
+class PostgresTokenBucketStore:
+    """Buckets in rate_limit_bucket – ein atomares UPSERT pro Request, eigene Transaktion."""
+
+    def consume(
+        self, key: str, capacity: int, refill_per_sec: float, cost: int = 1
+    ) -> Tuple[bool, float, float]:
+        now = time.time()
+        refilled = func.least(
+            capacity,
+            RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * refill_per_sec,
+        )
+        stmt = pg_insert(RateLimitBucket).values(
+            key=key, tokens=capacity - cost, updated_at=now, allowed=cost <= capacity
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitBucket.key],
+            set_={
+                "tokens": case((refilled >= cost, refilled - cost), else_=refilled),
+                "updated_at": now,
+                "allowed": refilled >= cost,
+            },
+        ).returning(RateLimitBucket.tokens, RateLimitBucket.allowed)
+
+        # eigene Verbindung: unabhängig von der Session des Views
+        with db.engine.begin() as conn:
+            tokens, allowed = conn.execute(stmt).one()
+
+        retry_after = 0.0 if allowed else (cost - tokens) / refill_per_sec
+        return allowed, tokens, retry_after
+
+
+class RedisTokenBucketStore:
+    """Buckets in Redis (oder kompatiblem Server) per Lua-Skript, atomar pro Key."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        import redis  # optional, nur für RATE_LIMIT_STORE=redis nötig
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(
+        self, key: str, capacity: int, refill_per_sec: float, cost: int = 1
+    ) -> Tuple[bool, float, float]:
+        allowed, tokens = self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[capacity, refill_per_sec, cost, time.time()],
+        )
+        allowed, tokens = bool(allowed), float(tokens)
+        retry_after = 0.0 if allowed else (cost - tokens) / refill_per_sec
+        return allowed, tokens, retry_after
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rate_limit_store():
+    """Store laut RATE_LIMIT_STORE (memory | postgres | redis), einmal pro Prozess."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.getenv("RATE_LIMIT_STORE", "memory")
+                if backend == "postgres":
+                    _store = PostgresTokenBucketStore()
+                elif backend == "redis":
+                    _store = RedisTokenBucketStore(
+                        os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+                    )
+                else:
+                    _store = MemoryTokenBucketStore()
+    return _store
+
+
+# ---------------------- DECORATOR ----------------------
+
+
+def _identity() -> str:
+    # remote_addr ist hinter Proxies nur mit PROXY_FIX_X_FOR die echte Client-IP
+    user_id = getattr(request, "clerk_user_id", None)
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limit(
+    capacity: int,
+    per_seconds: float,
+    scope: Optional[str] = None,
+    cost: Optional[Callable[[], int]] = None,
+):
+    """
+    Token-Bucket pro User (bzw. IP ohne Login) und Route.
+
+    capacity Tokens, die sich über per_seconds komplett wieder auffüllen.
+    cost: optionale Funktion, die die Kosten des aktuellen Requests liefert
+    (z.B. teurer mit include_media=true). Nach clerk_auth_required verwenden,
+    damit der User bekannt ist. Bei 429 kommt ein Retry-After-Header mit.
+    RATE_LIMIT_ENABLED=false schaltet alle Limits ab.
+    """
+    refill_per_sec = capacity / per_seconds
+
+    def _check():
+        """(429-Antwort oder None, verbleibende Tokens oder None)"""
+        if os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "true":
+            return None, None
+
+        key = f"{scope or request.endpoint}:{_identity()}"
+        request_cost = cost() if cost else 1
+
+        try:
+            allowed, remaining, retry_after = get_rate_limit_store().consume(
+                key, capacity, refill_per_sec, request_cost
+            )
+        except Exception as e:
+            # Limiter kaputt → lieber durchlassen als die API lahmlegen
+            print(f"⚠️ Rate-Limit-Store nicht erreichbar, lasse Request durch: {e}")
+            return None, None
+
+        if allowed:
+            return None, remaining
+
+        response = jsonify(
+            {"error": "Too many requests", "retry_after": math.ceil(retry_after)}
+        )
+        response.status_code = 429
+        response.headers["Retry-After"] = str(math.ceil(retry_after))
+        response.headers["X-RateLimit-Limit"] = str(capacity)
+        response.headers["X-RateLimit-Remaining"] = "0"
+        return response, None
+
+    def _with_headers(rv, remaining):
+        if remaining is None:
+            return rv
+        response = current_app.make_response(rv)
+        response.headers["X-RateLimit-Limit"] = str(capacity)
+        response.headers["X-RateLimit-Remaining"] = str(int(remaining))
+        return response
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_decorated_function(*args, **kwargs):
+                limited, remaining = _check()
+                if limited is not None:
+                    return limited
+                return _with_headers(await func(*args, **kwargs), remaining)
+
+            return async_decorated_function
+
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            limited, remaining = _check()
+            if limited is not None:
+                return limited
+            return _with_headers(func(*args, **kwargs), remaining)
+
+        return decorated_function
+
+    return decorator
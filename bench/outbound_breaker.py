@@ -0,0 +1,224 @@
+# bench/outbound_breaker.py
+"""
+Circuit Breaker der ausgehenden Calls (app/services/outbound.py) gegen einen langsamen bzw. kaputten Upstream.
+
+Ein lokaler HTTP-Server spielt die Clerk-API; fetch_clerk_user_image läuft
+unverändert über dependency("clerk") (Pool, Timeouts, Breaker, Metriken),
+nur CLERK_API_BASE zeigt auf den Server. --threads Worker rufen parallel ab,
+je Phase --calls Aufrufe:
+
+1. gesund      Upstream antwortet nach --latency-ms → alle mit Avatar
+2. langsam     Upstream hängt länger als --read-timeout, einmal OHNE Breaker
+               (jeder Call wartet den Timeout ab) und einmal MIT: nach
+               --failures Fehlern offen, der Rest ohne Avatar in < 1 ms
+3. HTTP 500    dasselbe mit Fehlerantworten statt Timeouts
+4. half-open   nach --reset-secs, Upstream noch kaputt: genau EIN Probe-Call
+               erreicht ihn, der Breaker ist danach wieder offen
+5. Erholung    nach --reset-secs, Upstream gesund: ein einzelner Probe
+               schließt den Breaker, danach alle Calls wieder mit Avatar
+
+Braucht keine Datenbank:
+
+    python -m bench.outbound_breaker --threads 16 --calls 400
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.common import summarize
+
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_bench")
+
+
+class FakeUpstream:
+    """Clerk-Stand-in: mode "ok" (Latenz), "slow" (hängt) oder "error" (HTTP 500)."""
+
+    def __init__(self, latency: float, hang: float):
+        self.latency = latency
+        self.hang = hang
+        self.mode = "ok"
+        self.hits = 0
+        self._lock = threading.Lock()
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-Alive wie bei der echten API
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with upstream._lock:
+                    upstream.hits += 1
+                mode = upstream.mode
+                if mode == "slow":
+                    time.sleep(upstream.hang)
+                elif upstream.latency:
+                    time.sleep(upstream.latency)
+                status = 500 if mode == "error" else 200
+                body = json.dumps(
+                    {"image_url": f"https://img.example.com{self.path}.png"}
+                    if status == 200
+                    else {"errors": [{"message": "internal"}]}
+                ).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client hat nach dem Read-Timeout schon aufgegeben
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def take_hits(self) -> int:
+        with self._lock:
+            hits, self.hits = self.hits, 0
+        return hits
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+def _fresh_clerk(failures: int, reset_secs: float, read_timeout: float):
+    """Neuer Breaker + leere Metriken für dependency("clerk"), Pool bleibt."""
+    from app.services.outbound import CircuitBreaker, DependencyMetrics, dependency
+
+    clerk = dependency("clerk")
+    clerk.breaker = CircuitBreaker("clerk", failures, reset_secs)
+    clerk.metrics = DependencyMetrics()
+    clerk.timeout = (0.5, read_timeout)
+    return clerk
+
+
+def _fetch_all(calls: int, threads: int) -> tuple:
+    """calls × fetch_clerk_user_image über threads Worker → (Latenzen, Avatare, Wandzeit)."""
+    from app.services.clerk import fetch_clerk_user_image
+
+    def fetch(n: int):
+        t0 = time.perf_counter()
+        image_url = fetch_clerk_user_image(f"user_bench_{n}")
+        return time.perf_counter() - t0, image_url
+
+    started = time.perf_counter()
+    # fetch_clerk_user_image loggt jeden Call – hier nur die Zusammenfassung
+    with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(fetch, range(calls)))
+    wall = time.perf_counter() - started
+    return [latency for latency, _ in results], sum(1 for _, url in results if url), wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=400, help="Aufrufe pro Phase")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Antwortzeit des gesunden Upstreams")
+    parser.add_argument("--read-timeout", type=float, default=0.5)
+    parser.add_argument("--failures", type=int, default=5, help="Fehler in Folge bis der Breaker öffnet")
+    parser.add_argument("--reset-secs", type=float, default=1.0, help="Wartezeit bis zum Probe-Call")
+    args = parser.parse_args()
+
+    import app.services.clerk as clerk_module
+    from app.services.outbound import CircuitBreaker
+
+    upstream = FakeUpstream(args.latency_ms / 1000, hang=args.read_timeout * 4)
+    clerk_module.CLERK_API_BASE = upstream.url
+
+    failures = []
+
+    def check(label: str, ok: bool, detail: str) -> None:
+        print(f"{'✅' if ok else '❌'} {label}: {detail}")
+        if not ok:
+            failures.append(label)
+
+    def phase(label: str, mode: str, breaker_failures: int) -> tuple:
+        upstream.mode = mode
+        clerk = _fresh_clerk(breaker_failures, args.reset_secs, args.read_timeout)
+        latencies, avatars, wall = _fetch_all(args.calls, args.threads)
+        summarize(label, latencies, wall)
+        return clerk, latencies, avatars, upstream.take_hits(), wall
+
+    print("── 1. gesund")
+    clerk, _, avatars, hits, _ = phase("gesund", "ok", args.failures)
+    check("alle mit Avatar", avatars == args.calls, f"{avatars}/{args.calls}, {hits} Upstream-Calls")
+    check("Breaker geschlossen", clerk.breaker.state == CircuitBreaker.CLOSED, clerk.breaker.state)
+
+    print(f"── 2. langsam (hängt {upstream.hang:.1f}s, Read-Timeout {args.read_timeout}s)")
+    # ohne Breaker: Schwelle unerreichbar, jeder Call wartet den Timeout ab
+    _, _, _, hits_without, wall_without = phase("langsam, ohne Breaker", "slow", 10**9)
+    clerk, latencies, avatars, hits, wall = phase("langsam, mit Breaker", "slow", args.failures)
+    # vor dem Öffnen können höchstens failures + threads Calls unterwegs sein
+    check(
+        "Breaker offen",
+        clerk.breaker.state == CircuitBreaker.OPEN and hits <= args.failures + args.threads,
+        f"{clerk.breaker.state}, {hits} Upstream-Calls (ohne Breaker {hits_without})",
+    )
+    fast = sorted(latencies)[: args.calls - hits]
+    check(
+        "abgewiesene Calls sofort ohne Avatar",
+        avatars == 0 and max(fast, default=0) < 0.05,
+        f"max {max(fast, default=0) * 1000:.2f} ms, Wandzeit {wall:.2f}s statt {wall_without:.2f}s",
+    )
+    print(f"📈 Metriken: {json.dumps(clerk.snapshot())}")
+
+    print("── 3. HTTP 500")
+    clerk, _, avatars, hits, _ = phase("HTTP 500, mit Breaker", "error", args.failures)
+    check(
+        "Breaker offen",
+        clerk.breaker.state == CircuitBreaker.OPEN and hits <= args.failures + args.threads,
+        f"{clerk.breaker.state}, {hits} Upstream-Calls, abgewiesen {clerk.metrics.rejected}",
+    )
+
+    print(f"── 4. half-open, Upstream noch kaputt (warte {args.reset_secs}s)")
+    time.sleep(args.reset_secs)
+    check("Zustand vor dem Probe", clerk.breaker.state == CircuitBreaker.HALF_OPEN, clerk.breaker.state)
+    _, avatars, _ = _fetch_all(args.calls, args.threads)
+    hits = upstream.take_hits()
+    check(
+        "genau ein Probe-Call, danach wieder offen",
+        hits == 1 and avatars == 0 and clerk.breaker.state == CircuitBreaker.OPEN,
+        f"{hits} Upstream-Calls, {clerk.breaker.state}",
+    )
+
+    print(f"── 5. Erholung (warte {args.reset_secs}s)")
+    upstream.mode = "ok"
+    time.sleep(args.reset_secs)
+    # solange der Probe läuft, werden alle anderen abgewiesen → erst er allein
+    _, avatars, _ = _fetch_all(1, 1)
+    check(
+        "Probe erfolgreich, Breaker geschlossen",
+        avatars == 1 and clerk.breaker.state == CircuitBreaker.CLOSED,
+        f"{upstream.take_hits()} Upstream-Call, {clerk.breaker.state}",
+    )
+    latencies, avatars, wall = _fetch_all(args.calls, args.threads)
+    summarize("Erholung", latencies, wall)
+    hits = upstream.take_hits()
+    check(
+        "Calls wieder durch",
+        avatars == args.calls and hits == args.calls,
+        f"{avatars}/{args.calls} mit Avatar, {hits} Upstream-Calls",
+    )
+    print(f"📈 Metriken: {json.dumps(clerk.snapshot())}")
+
+    upstream.close()
+    if failures:
+        raise SystemExit(f"❌ {len(failures)} Prüfungen fehlgeschlagen")
+    print("✅ Circuit Breaker ok")
+
+
+if __name__ == "__main__":
+    main()
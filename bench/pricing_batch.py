@@ -0,0 +1,122 @@
+# bench/pricing_batch.py
+"""
+Batch-Pricing (calculate_batch_prices, NumPy) gegen die Schleife über
+calculate_event_price pro Buchung – Preis-Audit von --bookings Buchungen.
+
+Rein in-memory, keine DB nötig: synthetische Events mit je --options-per-event
+Optionen, jede Buchung hat 1–3 Optionen ihres Events und einen Preis-Snapshot,
+--drift-pct der Optionen haben seit der Buchung einen neuen Preis.
+
+    python -m bench.pricing_batch --bookings 1000000
+
+Beide Pfade müssen dieselben Totals und Diffs liefern (wird geprüft).
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.pricing import build_option_table, calculate_batch_prices, calculate_event_price
+
+
+def _synthetic_rows(bookings: int, events: int, options_per_event: int, drift_pct: float, seed: int):
+    """Lange Form wie user_event_option: (booking_id, option_id, snapshot_price) pro Zeile."""
+    rng = np.random.default_rng(seed)
+    option_count = events * options_per_event
+    option_ids = np.arange(1, option_count + 1, dtype=np.int64)
+    snapshot_prices = rng.integers(500, 20000, size=option_count, dtype=np.int64)
+
+    current_prices = snapshot_prices.copy()
+    drifted = rng.random(option_count) < drift_pct / 100
+    current_prices[drifted] += rng.integers(-300, 300, size=int(drifted.sum()), dtype=np.int64)
+
+    per_booking = rng.integers(1, 4, size=bookings)
+    booking_ids = np.repeat(np.arange(1, bookings + 1, dtype=np.int64), per_booking)
+    booking_events = rng.integers(0, events, size=bookings)
+    # Option 0 des Events ist Pflicht, dazu 0–2 weitere (ohne Duplikate pro Buchung)
+    slot = np.concatenate([np.arange(n) for n in per_booking])
+    row_options = np.repeat(booking_events, per_booking) * options_per_event + slot + 1
+
+    return (
+        booking_ids,
+        row_options,
+        snapshot_prices[row_options - 1],
+        option_ids,
+        current_prices,
+    )
+
+
+def _loop(booking_ids, row_options, row_snapshots, options_by_id):
+    """Bisheriger Weg: pro Buchung Optionen sammeln und calculate_event_price aufrufen."""
+    totals = {}
+    snapshots = {}
+    grouped = {}
+    for booking_id, option_id, snapshot in zip(
+        booking_ids.tolist(), row_options.tolist(), row_snapshots.tolist()
+    ):
+        grouped.setdefault(booking_id, []).append(options_by_id[option_id])
+        snapshots[booking_id] = snapshots.get(booking_id, 0) + snapshot
+    for booking_id, options in grouped.items():
+        totals[booking_id], _ = calculate_event_price(options, [])
+    return totals, snapshots
+
+
+def _measure(label: str, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"📊 {label}: {elapsed:.3f}s")
+    return result, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=2_000)
+    parser.add_argument("--options-per-event", type=int, default=5)
+    parser.add_argument("--drift-pct", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-loop", action="store_true", help="Nur den Batch-Pfad messen")
+    args = parser.parse_args()
+
+    booking_ids, row_options, row_snapshots, option_ids, current_prices = _synthetic_rows(
+        args.bookings, args.events, args.options_per_event, args.drift_pct, args.seed
+    )
+    print(f"➡️ {args.bookings:,} Buchungen, {len(booking_ids):,} Options-Zeilen, {len(option_ids):,} Optionen")
+
+    table = build_option_table(zip(option_ids.tolist(), current_prices.tolist()))
+    batch, batch_secs = _measure(
+        "batch (NumPy)",
+        lambda: calculate_batch_prices(booking_ids, row_options, table, row_snapshots),
+    )
+    print(f"   Buchungen mit Preisänderung: {int(np.count_nonzero(batch.diff_cents)):,}")
+
+    if args.skip_loop:
+        return
+
+    # calculate_event_price erwartet Options-Objekte; alle hier gebuchten sind "berechnet"
+    options_by_id = {
+        option_id: SimpleNamespace(id=option_id, price_cents=price, is_required=True, is_selectable=True)
+        for option_id, price in zip(option_ids.tolist(), current_prices.tolist())
+    }
+    (loop_totals, loop_snapshots), loop_secs = _measure(
+        "loop (calculate_event_price)",
+        lambda: _loop(booking_ids, row_options, row_snapshots, options_by_id),
+    )
+
+    expected_totals = np.array([loop_totals[b] for b in batch.booking_ids.tolist()], dtype=np.int64)
+    expected_snapshots = np.array([loop_snapshots[b] for b in batch.booking_ids.tolist()], dtype=np.int64)
+    identical = np.array_equal(expected_totals, batch.totals_cents) and np.array_equal(
+        expected_totals - expected_snapshots, batch.diff_cents
+    )
+    print(f"   identische Ergebnisse: {identical}")
+    print(f"➡️ Speedup batch vs. loop: {loop_secs / batch_secs:.1f}x")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
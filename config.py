@@ -4,4 +4,12 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "postgresql+psycopg2://postgres:postgres@db:5432/eventapp_db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-    SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret")
\ No newline at end of file
+    SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret")
+    # Anzahl vertrauenswürdiger Reverse-Proxies vor der App (X-Forwarded-For/-Proto).
+    # 0 = direkt erreichbar → remote_addr ist die Client-IP (Rate-Limit pro IP)
+    PROXY_FIX_X_FOR = int(os.getenv("PROXY_FIX_X_FOR", "0"))
+    # Clerk-User-IDs (kommagetrennt) mit Admin-Rechten, z.B. Massen-Erstattungen.
+    # Leer = keine Admin-Endpoints über die API (nur per CLI)
+    ADMIN_USER_IDS = frozenset(
+        user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()
+    )
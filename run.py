@@ -12,4 +12,11 @@ app = create_app()
 if __name__ == "__main__":
     print("📦 DB-URL:", app.config["SQLALCHEMY_DATABASE_URI"])
     port = int(os.getenv("PORT", 5050))
+
+    # Warmup nur im Prozess, der Requests bedient: mit Reloader (debug=True)
+    # ist das der Kind-Prozess, nicht der Watcher
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from app.services.warmup import start_server_warmup
+        start_server_warmup(app)
+
     app.run(debug=True, host="0.0.0.0", port=port)